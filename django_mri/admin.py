@@ -445,6 +445,12 @@ class SessionAdmin(admin.ModelAdmin):
     class Media:
         css = {"all": ("django_mri/css/hide_admin_original.css",)}
 
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return queryset.select_related(
+            "subject", "measurement", "irb"
+        ).with_scan_count()
+
     @admin.action(description="Export CSV")
     def export_csv(self, request, queryset):
         df = queryset.to_dataframe()
@@ -462,8 +468,10 @@ class SessionAdmin(admin.ModelAdmin):
             request, extra_context=extra_context
         )
         if hasattr(response, "context_data"):
-            queryset = response.context_data["cl"].queryset
-            if queryset.count() > 10:
+            changelist = response.context_data["cl"]
+            if changelist.result_count > 10:
+                queryset = changelist.queryset
+                # Monthly counts are aggregated in the database and cached.
                 month_distribution_plot = queryset.plot_measurement_by_month()
                 figure_layout = [month_distribution_plot]
                 figure = layout(figure_layout)
@@ -517,10 +525,11 @@ class SessionAdmin(admin.ModelAdmin):
             return Html.admin_link(model_name, pk, text)
 
     def scan_count(self, instance: Session) -> int:
-        return instance.scan_set.count()
+        return instance.scan_count
 
     measurement_link.short_description = "Measurement Definition"
     subject_link.short_description = "Subject"
+    scan_count.admin_order_field = "scan_count"
 
 
 class NiftiAdmin(admin.ModelAdmin):
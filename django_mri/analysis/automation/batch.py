@@ -0,0 +1,187 @@
+"""
+Definition of the :class:`BatchRunnerMixin` class.
+"""
+import logging
+import shutil
+from pathlib import Path
+from typing import List
+from uuid import uuid4
+
+from django.db.models import Model, QuerySet
+from django_analyses.models.analysis_version import AnalysisVersion
+from django_analyses.models.pipeline.node import Node
+from django_analyses.tasks import execute_node
+from django_mri.analysis.automation import messages
+from django_mri.analysis.interfaces.batch import (
+    BATCH_DATABASE_DIR,
+    BATCH_KEY,
+    BATCH_WORK_DIR,
+)
+from django_mri.utils.utils import get_bids_manager
+
+#: Default number of subjects per batch.
+DEFAULT_BATCH_SIZE: int = 8
+
+#: Name of the directory (relative to the analysis root) containing batches.
+BATCHES_DIR: str = "batches"
+
+
+class BatchRunnerMixin:
+    """
+    Adds a batching mode to subject-level
+    :class:`~django_analyses.runner.queryset_runner.QuerySetRunner`
+    subclasses. Pending subjects are grouped into batches, each executed by a
+    single pipeline invocation sharing a working directory and a PyBIDS
+    database, and the outputs are then split into per-subject runs.
+    """
+
+    #: Interface class executing the pipeline.
+    INTERFACE = None
+
+    #: Number of subjects per batch.
+    BATCH_SIZE: int = DEFAULT_BATCH_SIZE
+
+    #: Working directory configuration key.
+    WORK_DIR_KEY: str = "work-dir"
+
+    #: PyBIDS database directory configuration key (None if unsupported).
+    DATABASE_DIR_KEY: str = "bids-database-dir"
+
+    #: Path of the analysis root directory within the container.
+    CONTAINER_OUTPUT_ROOT: str = "/output"
+
+    _logger = logging.getLogger("data.mri.automation")
+
+    def get_node(self) -> Node:
+        """
+        Returns the node used to create per-subject runs.
+
+        Returns
+        -------
+        Node
+            Analysis version node
+        """
+        analysis_version = AnalysisVersion.objects.get(
+            analysis__title=self.ANALYSIS_TITLE,
+            title=self.ANALYSIS_VERSION_TITLE,
+        )
+        return Node.objects.get_or_create(
+            analysis_version=analysis_version,
+            configuration=self.ANALYSIS_CONFIGURATION,
+        )[0]
+
+    def get_batch_configuration(
+        self, batch_dir: Path, subject_ids: List[str]
+    ) -> dict:
+        """
+        Returns the interface configuration of a batched execution.
+
+        Parameters
+        ----------
+        batch_dir : Path
+            Batch directory, relative to the analysis root
+        subject_ids : List[str]
+            Subject IDs
+
+        Returns
+        -------
+        dict
+            Interface configuration
+        """
+        container_dir = Path(self.CONTAINER_OUTPUT_ROOT) / batch_dir.name
+        configuration = {
+            "analysis_level": "participant",
+            **self.ANALYSIS_CONFIGURATION,
+            "destination": str(batch_dir),
+            self.INPUT_KEY: subject_ids,
+            self.WORK_DIR_KEY: str(container_dir / BATCH_WORK_DIR),
+        }
+        # The full dataset's layout database is preferred if up to date.
+        layout_database = get_bids_manager().get_layout_database()
+        if self.DATABASE_DIR_KEY and layout_database is None:
+            database_dir = container_dir / BATCH_DATABASE_DIR
+            configuration[self.DATABASE_DIR_KEY] = str(database_dir)
+        return configuration
+
+    def run_batch(self, instances: List[Model]):
+        """
+        Executes the pipeline once over the provided subjects and creates
+        their runs from the batch's outputs. If the batched execution fails,
+        subjects are executed separately.
+
+        Parameters
+        ----------
+        instances : List[Model]
+            Subjects to execute
+        """
+        inputs = [
+            self.create_input_specification(instance)
+            for instance in instances
+        ]
+        subject_ids = [
+            subject_id
+            for specification in inputs
+            for subject_id in specification[self.INPUT_KEY]
+        ]
+        batch_dir = Path(BATCHES_DIR) / f"batch-{uuid4().hex[:8]}"
+        configuration = self.get_batch_configuration(batch_dir, subject_ids)
+        interface = self.INTERFACE(**configuration)
+        message = messages.BATCH_START.format(
+            analysis_version=self.ANALYSIS_VERSION_TITLE,
+            n_subjects=len(subject_ids),
+            batch_dir=interface.destination,
+        )
+        self._logger.info(message)
+        try:
+            interface.run()
+        except RuntimeError as exception:
+            message = messages.BATCH_FAILURE.format(
+                analysis_version=self.ANALYSIS_VERSION_TITLE,
+                batch_dir=interface.destination,
+                exception=exception,
+            )
+            self._logger.warning(message)
+        else:
+            for specification in inputs:
+                specification[BATCH_KEY] = str(batch_dir)
+        node = self.get_node()
+        execute_node(node_id=node.id, inputs=inputs)
+        shutil.rmtree(interface.destination, ignore_errors=True)
+
+    def run_batches(
+        self,
+        queryset: QuerySet = None,
+        batch_size: int = None,
+        log_level: int = logging.INFO,
+    ) -> None:
+        """
+        Executes the pipeline over any pending subjects in batches.
+
+        Parameters
+        ----------
+        queryset : QuerySet, optional
+            Subjects to execute, by default the base queryset
+        batch_size : int, optional
+            Number of subjects per batch, by default :attr:`BATCH_SIZE`
+        log_level : int, optional
+            Logging level to use, by default 20 (INFO)
+        """
+        queryset = self.get_base_queryset() if queryset is None else queryset
+        queryset = self.filter_queryset(queryset, log_level)
+        pending = [
+            instance for instance in queryset if not self.has_run(instance)
+        ]
+        batch_size = batch_size or self.BATCH_SIZE
+        batches = [
+            pending[i : i + batch_size]
+            for i in range(0, len(pending), batch_size)
+        ]
+        message = messages.BATCHES_PENDING.format(
+            n_pending=len(pending),
+            analysis_version=self.ANALYSIS_VERSION_TITLE,
+            n_batches=len(batches),
+            batch_size=batch_size,
+        )
+        self._logger.log(log_level, message)
+        for batch in batches:
+            self.run_batch(batch)
@@ -1,29 +1,68 @@
 """
 Export CAT12 segmentation results as an xarray dataset.
+
+Requires the *export* extra (``pip install django_mri[export]``).
 """
+from pathlib import Path
 from typing import Dict, List
 
 import dask.array as da
 import nibabel as nib
+import numpy as np
 import pandas as pd
 import xarray as xr
+from dask import delayed
 from django.db.models import QuerySet
 
+from django_analyses.models.run import Run
 from django_mri.analysis.automation.cat12_segmentation.utils import (
     get_node, get_run_set, read_nifti)
 
 OUTPUT_KEYS = "modulated_grey_matter", "modulated_white_matter", "warped_image"
 OUTPUT_DIMS = "Run ID", "x", "y", "z"
 
+#: Number of runs written to a Zarr store at a time.
+DEFAULT_BATCH_SIZE = 32
+
+#: Zarr store attribute tracking the number of runs written.
+COMPLETED_RUNS_ATTR = "completed_runs"
+
+
+def get_coords(runs: List[Run]) -> Dict[str, List[int]]:
+    return {"Run ID": [run.id for run in runs]}
 
-def get_coords(runs: QuerySet) -> Dict[str, List[int]]:
-    run_ids = list(runs.values_list("id", flat=True))
-    return {"Run ID": run_ids}
 
+def read_volume(path: Path, dtype: np.dtype) -> np.ndarray:
+    return read_nifti(path).astype(dtype, copy=False)
 
-def create_output_array(runs: QuerySet, key: str) -> da:
-    paths = (run.get_output(key) for run in runs)
-    arrays = (da.from_array(read_nifti(path)) for path in paths)
+
+def create_output_array(runs: List[Run], key: str) -> xr.DataArray:
+    """
+    Returns a lazy array of the provided runs' *key* output. Each volume is a
+    single chunk, read from disk only when computed.
+
+    Parameters
+    ----------
+    runs : List[Run]
+        CAT12 segmentation runs
+    key : str
+        Output key
+
+    Returns
+    -------
+    xr.DataArray
+        Output volumes
+    """
+    paths = [run.get_output(key) for run in runs]
+    sample = read_nifti(paths[0])
+    arrays = [
+        da.from_delayed(
+            delayed(read_volume)(path, sample.dtype),
+            shape=sample.shape,
+            dtype=sample.dtype,
+        )
+        for path in paths
+    ]
     all_data = da.stack(arrays)
     coords = get_coords(runs)
     return xr.DataArray(all_data, coords=coords, dims=OUTPUT_DIMS, name=key)
@@ -38,31 +77,64 @@ INFO_COLUMNS = (
 )
 
 
-def extract_run_info(runs: QuerySet) -> pd.DataFrame:
-    from django_mri.models.scan import Scan
+def extract_run_info(runs: List[Run]) -> pd.DataFrame:
+    """
+    Returns the scan information of the provided runs, indexed by run ID in
+    the order of *runs*. Runs without an input scan are kept (with missing
+    values), so that the information is aligned with the runs' outputs.
 
-    info = {}
-    for run in runs:
-        input_path = run.get_input("path")
-        scan = Scan.objects.get(_nifti__path=input_path)
-        run_info = {
-            "Subject ID": scan.session.subject.id,
-            "Session ID": scan.session.id,
-            "Scan ID": scan.id,
-            "Scan Description": scan.description,
-            "Acquisition Time": scan.time.strftime("%Y-%m-%d"),
-        }
-        info[run.id] = run_info
-    return pd.DataFrame.from_dict(info, orient="index")
+    Parameters
+    ----------
+    runs : List[Run]
+        CAT12 segmentation runs
 
+    Returns
+    -------
+    pd.DataFrame
+        Run information
+    """
+    from django_mri.models.scan import Scan
 
-def export_cat_results(runs: QuerySet = None) -> xr.Dataset:
-    runs = runs or get_run_set()
+    scans = Scan.objects.values_by_run(
+        runs, "session__subject_id", "session_id", "description", "time"
+    )
+    info = {
+        run_id: {
+            "Subject ID": scan["session__subject_id"],
+            "Session ID": scan["session_id"],
+            "Scan ID": scan["id"],
+            "Scan Description": scan["description"],
+            "Acquisition Time": scan["time"].strftime("%Y-%m-%d")
+            if scan["time"]
+            else None,
+        }
+        for run_id, scan in scans.items()
+    }
+    info_df = pd.DataFrame.from_dict(
+        info, orient="index", columns=list(INFO_COLUMNS)
+    )
+    return info_df.reindex([run.id for run in runs])
+
+
+def create_dataset(runs: List[Run]) -> xr.Dataset:
+    """
+    Returns a lazy dataset of the provided runs' outputs and information.
+
+    Parameters
+    ----------
+    runs : List[Run]
+        CAT12 segmentation runs
+
+    Returns
+    -------
+    xr.Dataset
+        CAT12 segmentation results
+    """
     info_df = extract_run_info(runs)
     ds = xr.Dataset.from_dataframe(info_df)
     ds = ds.rename({"index": "Run ID"})
 
-    affine = nib.load(runs[0].get_output(OUTPUT_KEYS[0])).affine
+    affine = nib.load(str(runs[0].get_output(OUTPUT_KEYS[0]))).affine
     node = get_node()
     str_configuration = {
         key: str(value) for key, value in node.configuration.items()
@@ -76,3 +148,92 @@ def export_cat_results(runs: QuerySet = None) -> xr.Dataset:
 
     data_vars = {key: create_output_array(runs, key) for key in OUTPUT_KEYS}
     return ds.assign(data_vars)
+
+
+def write_cat_results(
+    runs: List[Run],
+    destination: Path,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> xr.Dataset:
+    """
+    Writes CAT12 segmentation results to a chunked Zarr store in batches of
+    runs. If the store already exists, the export is resumed from the last
+    completed batch (the store's runs take precedence over *runs*). Requires
+    the *zarr* package.
+
+    Parameters
+    ----------
+    runs : List[Run]
+        CAT12 segmentation runs
+    destination : Path
+        Zarr store path
+    batch_size : int, optional
+        Number of runs to write at a time, by default
+        :data:`DEFAULT_BATCH_SIZE`
+
+    Returns
+    -------
+    xr.Dataset
+        Exported results
+    """
+    import zarr
+
+    store = str(destination)
+    if Path(destination).exists():
+        ds = xr.open_zarr(store)
+        run_ids = ds["Run ID"].values.tolist()
+        runs_by_id = Run.objects.in_bulk(run_ids)
+    else:
+        ds = create_dataset(runs)
+        ds.attrs["affine"] = ds.attrs["affine"].tolist()
+        ds.attrs[COMPLETED_RUNS_ATTR] = 0
+        # Writes the metadata, leaving outputs to be written by region.
+        ds.to_zarr(store, compute=False, consolidated=True)
+        run_ids = ds["Run ID"].values.tolist()
+        runs_by_id = {run.id: run for run in runs}
+    # Regions follow the store's run order.
+    runs = [runs_by_id[run_id] for run_id in run_ids]
+    completed = ds.attrs.get(COMPLETED_RUNS_ATTR, 0)
+    for start in range(completed, len(runs), batch_size):
+        batch = runs[start : start + batch_size]
+        data_vars = {
+            key: create_output_array(batch, key) for key in OUTPUT_KEYS
+        }
+        region = {"Run ID": slice(start, start + len(batch))}
+        batch_ds = xr.Dataset(data_vars).drop_vars("Run ID")
+        batch_ds.to_zarr(store, region=region)
+        group = zarr.open_group(store)
+        group.attrs[COMPLETED_RUNS_ATTR] = start + len(batch)
+        zarr.consolidate_metadata(store)
+    return xr.open_zarr(store)
+
+
+def export_cat_results(
+    runs: QuerySet = None,
+    destination: Path = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> xr.Dataset:
+    """
+    Exports CAT12 segmentation results. Output volumes are loaded lazily, and
+    if a *destination* is provided the results are written incrementally to
+    a resumable Zarr store (see :func:`write_cat_results`).
+
+    Parameters
+    ----------
+    runs : QuerySet, optional
+        CAT12 segmentation runs, by default all successful runs
+    destination : Path, optional
+        Zarr store path, by default None (returns a lazy dataset)
+    batch_size : int, optional
+        Number of runs to write at a time, by default
+        :data:`DEFAULT_BATCH_SIZE`
+
+    Returns
+    -------
+    xr.Dataset
+        CAT12 segmentation results
+    """
+    runs = list(runs or get_run_set())
+    if destination is None:
+        return create_dataset(runs)
+    return write_cat_results(runs, destination, batch_size=batch_size)
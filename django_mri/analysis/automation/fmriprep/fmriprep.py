@@ -5,6 +5,7 @@ from typing import List
 
 from django.db.models import Q, QuerySet
 from django_analyses.runner.queryset_runner import QuerySetRunner
+from django_mri.analysis.automation.batch import BatchRunnerMixin
 from django_mri.analysis.interfaces.fmriprep.fmriprep import FmriPrep2101
 from django_mri.analysis.utils.bids_filters import FMRIPREP_FILTERS
 from django_mri.utils.utils import get_subject_model
@@ -13,7 +14,7 @@ from django_mri.utils.utils import get_subject_model
 Subject = get_subject_model()
 
 
-class fMRIPrepRunner(QuerySetRunner):
+class fMRIPrepRunner(BatchRunnerMixin, QuerySetRunner):
     """
     Automates the execution of fMRIPrep over a queryset of subjects.
     """
@@ -33,6 +34,9 @@ class fMRIPrepRunner(QuerySetRunner):
         "bids-filter-file": str(FMRIPREP_FILTERS),
     }
 
+    #: Interface class used for batched execution.
+    INTERFACE = FmriPrep2101
+
     #: Input definition key.
     INPUT_KEY = "participant_label"
 
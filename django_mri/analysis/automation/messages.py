@@ -0,0 +1,19 @@
+"""
+Messages for batched execution of subject-level pipelines.
+"""
+from django_mri.analysis.utils import bcolors
+
+#: Report the number of pending subjects and batches.
+BATCHES_PENDING = "{n_pending} subjects are pending {analysis_version} execution, running in {n_batches} batches of up to {batch_size} subjects."
+
+#: Report starting a batched execution.
+BATCH_START = "Executing {analysis_version} over {n_subjects} subjects in {batch_dir}..."
+
+#: Report a batched execution failure, falling back to per-subject runs.
+BATCH_FAILURE = (
+    bcolors.WARNING
+    + "Batched {analysis_version} execution in {batch_dir} failed with the following exception:\n{exception}\nFalling back to per-subject execution..."
+    + bcolors.ENDC
+)
+
+# flake8: noqa: E501
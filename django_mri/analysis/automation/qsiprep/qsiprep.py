@@ -5,6 +5,7 @@ from typing import List
 
 from django.db.models import Q, QuerySet
 from django_analyses.runner.queryset_runner import QuerySetRunner
+from django_mri.analysis.automation.batch import BatchRunnerMixin
 from django_mri.analysis.interfaces.qsiprep.qsiprep import QsiPrep0160RC3
 from django_mri.analysis.utils.bids_filters import QSIPREP_FILTERS
 from django_mri.utils.utils import get_subject_model
@@ -13,7 +14,7 @@ from django_mri.utils.utils import get_subject_model
 Subject = get_subject_model()
 
 
-class QSIPrepRunner(QuerySetRunner):
+class QSIPrepRunner(BatchRunnerMixin, QuerySetRunner):
     """
     Automates the execution of QSIPrep over a queryset of subjects.
     """
@@ -33,6 +34,15 @@ class QSIPrepRunner(QuerySetRunner):
         "bids-filter-file": str(QSIPREP_FILTERS),
     }
 
+    #: Interface class used for batched execution.
+    INTERFACE = QsiPrep0160RC3
+
+    #: Batched execution working directory configuration key.
+    WORK_DIR_KEY = "work_dir"
+
+    #: Batched execution PyBIDS database directory configuration key.
+    DATABASE_DIR_KEY = "bids_database_dir"
+
     #: Input definition key.
     INPUT_KEY = "participant_label"
 
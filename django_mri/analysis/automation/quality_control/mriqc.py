@@ -5,6 +5,7 @@ from typing import List
 
 from django.db.models import Q, QuerySet
 from django_analyses.runner.queryset_runner import QuerySetRunner
+from django_mri.analysis.automation.batch import BatchRunnerMixin
 from django_mri.analysis.interfaces.mriqc.mriqc import MRIQC2100rc2
 from django_mri.utils.utils import get_subject_model
 
@@ -12,7 +13,7 @@ from django_mri.utils.utils import get_subject_model
 Subject = get_subject_model()
 
 
-class MriqcRunner(QuerySetRunner):
+class MriqcRunner(BatchRunnerMixin, QuerySetRunner):
     """
     Automates the execution of Mriqc over a queryset of subjects.
     """
@@ -31,6 +32,12 @@ class MriqcRunner(QuerySetRunner):
         "float32": True,
     }
 
+    #: Interface class used for batched execution.
+    INTERFACE = MRIQC2100rc2
+
+    #: Path of the analysis root directory within the container.
+    CONTAINER_OUTPUT_ROOT = "/out"
+
     #: Input definition key.
     INPUT_KEY = "participant_label"
 
@@ -0,0 +1,106 @@
+"""
+Utilities used by pipeline interfaces to collect a single participant's
+outputs from a batched, multi-participant execution.
+"""
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable
+
+#: Batch directory (relative to the analysis root) configuration key.
+BATCH_KEY: str = "batch_dir"
+
+#: Name of the shared working directory within a batch directory.
+BATCH_WORK_DIR: str = "work"
+
+#: Name of the shared PyBIDS database directory within a batch directory.
+BATCH_DATABASE_DIR: str = "bids_db"
+
+
+def is_subject_entry(name: str, subject_id: str) -> bool:
+    """
+    Returns whether a file or directory name belongs to the provided subject.
+
+    Parameters
+    ----------
+    name : str
+        File or directory name
+    subject_id : str
+        Subject ID (without the "sub-" prefix)
+
+    Returns
+    -------
+    bool
+        Whether the entry belongs to the subject
+    """
+    label = f"sub-{subject_id}"
+    return name == label or name.startswith((f"{label}_", f"{label}."))
+
+
+def split_batch_outputs(
+    source: Path,
+    destination: Path,
+    subject_id: str,
+    exclude: Iterable[str] = (BATCH_WORK_DIR, BATCH_DATABASE_DIR),
+) -> None:
+    """
+    Moves a subject's outputs from a batch directory to the provided
+    destination, preserving their relative paths. Shared files (e.g.
+    *dataset_description.json*) are copied, and other subjects' outputs are
+    skipped.
+
+    Parameters
+    ----------
+    source : Path
+        Batch directory
+    destination : Path
+        Subject's destination directory
+    subject_id : str
+        Subject ID (without the "sub-" prefix)
+    exclude : Iterable[str], optional
+        Names of top-level entries to skip, by default the shared working and
+        PyBIDS database directories
+    """
+    destination = Path(destination)
+    with os.scandir(source) as entries:
+        for entry in entries:
+            if entry.name in exclude:
+                continue
+            target = destination / entry.name
+            if is_subject_entry(entry.name, subject_id):
+                destination.mkdir(parents=True, exist_ok=True)
+                shutil.move(entry.path, target)
+            elif entry.name.startswith("sub-"):
+                continue
+            elif entry.is_dir():
+                split_batch_outputs(entry.path, target, subject_id, ())
+            else:
+                destination.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(entry.path, target)
+
+
+class BatchOutputsMixin:
+    """
+    Allows an interface to collect its outputs from a batched execution
+    instead of running the pipeline. Expects a *batch_dir* configuration
+    value, relative to the analysis root.
+    """
+
+    def collect_batch_outputs(self) -> bool:
+        """
+        Moves the configured participants' outputs from the batch directory
+        to the interface's destination, if a batch directory was provided.
+
+        Returns
+        -------
+        bool
+            Whether outputs were collected from a batch directory
+        """
+        batch_dir = self.configuration.pop(BATCH_KEY, None)
+        if not batch_dir:
+            return False
+        for subject_id in self.configuration.get("participant_label"):
+            split_batch_outputs(
+                self.analysis_root / batch_dir, self.destination, subject_id
+            )
+        return True
@@ -0,0 +1,48 @@
+"""
+Definition of the :class:`BidsInputMixin` class, used by BIDS app interfaces
+to prepare their input dataset.
+"""
+from pathlib import Path
+
+from django_mri.utils.bids_view import BidsView
+from django_mri.utils.utils import get_bids_dir, get_bids_manager
+
+
+class BidsInputMixin:
+    """
+    Prepares the BIDS dataset an interface is executed over. If the app
+    supports PyBIDS layout databases and the full dataset's database is up
+    to date, it is passed to the app and the full dataset is used. Otherwise,
+    a :class:`~django_mri.utils.bids_view.BidsView` of the configured
+    participants is created. Other (e.g. study-specific) datasets are used as
+    is.
+    """
+
+    #: PyBIDS layout database configuration key (None if unsupported).
+    BIDS_DATABASE_KEY: str = None
+
+    def get_bids_view(self, bids_dir: Path) -> BidsView:
+        """
+        Returns the view to be used as the interface's input dataset.
+
+        Parameters
+        ----------
+        bids_dir : Path
+            Full BIDS dataset
+
+        Returns
+        -------
+        BidsView
+            Input dataset view
+        """
+        subject_ids = self.configuration.get("participant_label")
+        view = BidsView(subject_ids, bids_dir=bids_dir)
+        if Path(bids_dir) != get_bids_dir():
+            view.enabled = False
+            return view
+        database_dir = get_bids_manager().get_layout_database()
+        key = self.BIDS_DATABASE_KEY
+        if key and database_dir and key not in self.configuration:
+            self.configuration[key] = str(database_dir)
+            view.enabled = False
+        return view
@@ -6,6 +6,11 @@ from pathlib import Path
 from typing import Iterable, Tuple
 
 from django.conf import settings
+from django_mri.analysis.interfaces.bids_input import BidsInputMixin
+from django_mri.analysis.interfaces.local_scheduler import (
+    LocalExecutionMixin,
+)
+from django_mri.analysis.interfaces.output_index import OutputIndexMixin
 from django_mri.analysis.interfaces.dmriprep.messages import (
     FS_LICENSE_MISSING,
     RUN_FAILURE,
@@ -18,7 +23,7 @@ from django_mri.analysis.interfaces.dmriprep.utils import (
 )
 
 
-class DmriPrep:
+class DmriPrep(BidsInputMixin, LocalExecutionMixin, OutputIndexMixin):
     """
     An interface for the *dmriprep* preprocessing pipeline.
 
@@ -171,7 +176,7 @@ class DmriPrep:
         pattern = self.FS_OUTPUT_PATTERN.format(
             main_dir=main_dir, output_id=output_id
         )
-        return self.destination.rglob(pattern)
+        return self.output_index.rglob(pattern)
 
     def generate_dmriprep_outputs(
         self,
@@ -202,14 +207,14 @@ class DmriPrep:
         Path
             Output paths
         """
-        pattern = self.dmriprep_OUTPUT_PATTERN.format(
+        pattern = self.DMRIPREP_OUTPUT_PATTERN.format(
             main_dir=main_dir,
             sub_dir=sub_dir,
             subject_id=subject_id,
             session_id=session_id,
             output_id=output_id,
         )
-        return self.destination.rglob(pattern)
+        return self.output_index.rglob(pattern)
 
     def find_output(
         self, partial_output: str, subject_id: str, session_id: str
@@ -252,6 +257,7 @@ class DmriPrep:
         dict
             Output files by key
         """
+        self.reset_output_index()
         output_dict = {}
         subject_ids = self.configuration.get("participant_label")
         for subject_id in subject_ids:
@@ -284,8 +290,11 @@ class DmriPrep:
         RuntimeError
             In case of failed execution, raises an appropriate error
         """
-        command = self.generate_command()
-        raised_exception = os.system(command)
+        budget = self.allocate_resources()
+        with self.get_bids_view(self.nifti_root) as bids_dir:
+            self.nifti_root = bids_dir
+            command = self.generate_command()
+            raised_exception = self.execute(command, budget)
         if raised_exception:
             message = RUN_FAILURE.format(
                 command=command, exception=raised_exception
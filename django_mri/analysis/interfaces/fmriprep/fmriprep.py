@@ -6,6 +6,12 @@ from pathlib import Path
 from typing import Iterable, Tuple
 
 from django.conf import settings
+from django_mri.analysis.interfaces.batch import BatchOutputsMixin
+from django_mri.analysis.interfaces.bids_input import BidsInputMixin
+from django_mri.analysis.interfaces.local_scheduler import (
+    LocalExecutionMixin,
+)
+from django_mri.analysis.interfaces.output_index import OutputIndexMixin
 from django_mri.analysis.interfaces.fmriprep.messages import (
     FS_LICENSE_MISSING,
     RUN_FAILURE,
@@ -16,10 +22,12 @@ from django_mri.analysis.interfaces.fmriprep.utils import (
     FREESURFER_HOME,
     OUTPUTS,
 )
-from django_mri.utils import get_singularity_root
+from django_mri.utils import get_mri_root, get_singularity_root
 
 
-class FmriPrep:
+class FmriPrep(
+    BatchOutputsMixin, BidsInputMixin, LocalExecutionMixin, OutputIndexMixin
+):
     """
     An interface for the *fmriprep* preprocessing pipeline.
 
@@ -45,6 +53,9 @@ class FmriPrep:
         "{main_dir}/**/{sub_dir}/sub-{subject_id}_{session_id}_{output_id}"
     )
 
+    #: PyBIDS layout database configuration key.
+    BIDS_DATABASE_KEY = "bids-database-dir"
+
     #: FreeSurfer output pattern.
     FS_OUTPUT_PATTERN: str = "{main_dir}/**/*{output_id}"
 
@@ -137,9 +148,9 @@ class FmriPrep:
         analysis_level = self.configuration.pop("analysis_level")
         singularity_image_root = get_singularity_root()
         command = COMMAND.format(
-            bids_parent=self.nifti_root.parent,
+            mri_root=get_mri_root(),
+            bids_dir=self.nifti_root,
             destination_parent=self.destination.parent,
-            bids_name=self.nifti_root.name,
             destination_name=self.destination.name,
             analysis_level=analysis_level,
             freesurfer_license=fs_license,
@@ -176,7 +187,7 @@ class FmriPrep:
         pattern = self.FS_OUTPUT_PATTERN.format(
             main_dir=main_dir, output_id=output_id
         )
-        return self.destination.rglob(pattern)
+        return self.output_index.rglob(pattern)
 
     def generate_fmriprep_outputs(
         self,
@@ -214,7 +225,7 @@ class FmriPrep:
             session_id=session_id,
             output_id=output_id,
         )
-        return self.destination.rglob(pattern)
+        return self.output_index.rglob(pattern)
 
     def find_output(
         self, partial_output: str, subject_id: str, session_id: str
@@ -257,6 +268,7 @@ class FmriPrep:
         dict
             Output files by key
         """
+        self.reset_output_index()
         output_dict = {}
         subject_ids = self.configuration.get("participant_label")
         for subject_id in subject_ids:
@@ -289,8 +301,13 @@ class FmriPrep:
         RuntimeError
             In case of failed execution, raises an appropriate error
         """
-        command = self.generate_command()
-        raised_exception = os.system(command)
+        if self.collect_batch_outputs():
+            return self.generate_output_dict()
+        budget = self.allocate_resources()
+        with self.get_bids_view(self.nifti_root) as bids_dir:
+            self.nifti_root = bids_dir
+            command = self.generate_command()
+            raised_exception = self.execute(command, budget)
         if raised_exception:
             message = RUN_FAILURE.format(
                 command=command, exception=raised_exception
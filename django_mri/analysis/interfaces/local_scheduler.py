@@ -0,0 +1,512 @@
+"""
+Definition of the :class:`LocalScheduler` class, used to execute
+resource-intensive pipelines (e.g. containerized *fmriprep* runs) on the local
+node within CPU and memory budgets.
+
+Reservations are recorded as files under a shared scheduler directory, so
+that concurrent jobs started by different worker processes on the same node
+are accounted for.
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import signal
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+from uuid import uuid4
+
+from django.conf import settings
+from django_mri.analysis.interfaces.messages import (
+    JOB_FINISHED,
+    JOB_QUEUED,
+    JOB_STARTED,
+    JOB_TERMINATED,
+)
+
+#: Default number of concurrent jobs a node is divided between.
+DEFAULT_JOBS_PER_NODE: int = 2
+
+#: Fraction of the node's physical memory available to jobs.
+MEMORY_FRACTION: float = 0.9
+
+#: Maximal default number of threads per process.
+MAX_OMP_NTHREADS: int = 8
+
+#: Seconds between resource availability checks of queued jobs.
+POLL_INTERVAL: float = 30
+
+#: Seconds interrupted jobs are given to exit before they are killed.
+TERMINATION_TIMEOUT: float = 30
+
+#: Default scheduler directory, used to record resource reservations.
+DEFAULT_SCHEDULER_ROOT: Path = (
+    Path(tempfile.gettempdir()) / "django_mri_scheduler"
+)
+
+#: Name of the lock file used to synchronize reservations.
+LOCK_FILE_NAME: str = ".lock"
+
+
+class ResourceBudget(NamedTuple):
+    """
+    CPU and memory resources allocated to a single job.
+    """
+
+    n_cpus: int
+    memory_mb: int
+    omp_nthreads: int = 1
+
+
+class Job(NamedTuple):
+    """
+    A shell command to be executed within a resource budget. Standard output
+    and error streams are written to *log_dir*.
+    """
+
+    command: str
+    budget: ResourceBudget
+    log_dir: Path
+    name: str = "job"
+
+
+def get_node_capacity() -> ResourceBudget:
+    """
+    Returns the resources available to jobs on the local node. The number of
+    CPUs and amount of memory may be overridden using the
+    *LOCAL_SCHEDULER_CPUS* and *LOCAL_SCHEDULER_MEMORY_MB* settings.
+
+    Returns
+    -------
+    ResourceBudget
+        Node capacity
+    """
+    try:
+        n_cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        n_cpus = os.cpu_count() or 1
+    physical_memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    memory_mb = int(physical_memory * MEMORY_FRACTION / 1024 ** 2)
+    n_cpus = getattr(settings, "LOCAL_SCHEDULER_CPUS", n_cpus)
+    memory_mb = getattr(settings, "LOCAL_SCHEDULER_MEMORY_MB", memory_mb)
+    return ResourceBudget(
+        n_cpus=n_cpus,
+        memory_mb=memory_mb,
+        omp_nthreads=min(n_cpus, MAX_OMP_NTHREADS),
+    )
+
+
+def get_default_budget(
+    capacity: ResourceBudget = None, jobs_per_node: int = None
+) -> ResourceBudget:
+    """
+    Returns the default budget of a single job, dividing the node's capacity
+    between *jobs_per_node* jobs (by default the *LOCAL_SCHEDULER_JOBS*
+    setting or DEFAULT_JOBS_PER_NODE).
+
+    Parameters
+    ----------
+    capacity : ResourceBudget, optional
+        Node capacity, by default None
+    jobs_per_node : int, optional
+        Number of concurrent jobs, by default None
+
+    Returns
+    -------
+    ResourceBudget
+        Default job budget
+    """
+    capacity = capacity or get_node_capacity()
+    if jobs_per_node is None:
+        jobs_per_node = getattr(
+            settings, "LOCAL_SCHEDULER_JOBS", DEFAULT_JOBS_PER_NODE
+        )
+    n_cpus = max(capacity.n_cpus // jobs_per_node, 1)
+    return ResourceBudget(
+        n_cpus=n_cpus,
+        memory_mb=max(capacity.memory_mb // jobs_per_node, 1),
+        omp_nthreads=min(n_cpus, MAX_OMP_NTHREADS),
+    )
+
+
+def is_alive(pid: int) -> bool:
+    """
+    Returns whether a process with the provided ID is running.
+
+    Parameters
+    ----------
+    pid : int
+        Process ID
+
+    Returns
+    -------
+    bool
+        Whether the process is running
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class LocalScheduler:
+    """
+    Executes jobs as supervised subprocesses, starting each job only once the
+    node has enough free CPUs and memory for its budget. Jobs that do not fit
+    are queued until running jobs finish.
+    """
+
+    _logger = logging.getLogger("data.mri.scheduler")
+
+    def __init__(
+        self,
+        root: Path = None,
+        capacity: ResourceBudget = None,
+        poll_interval: float = POLL_INTERVAL,
+    ):
+        """
+        Initializes a new :class:`LocalScheduler` instance.
+
+        Parameters
+        ----------
+        root : Path, optional
+            Directory used to record reservations, by default the
+            *LOCAL_SCHEDULER_ROOT* setting or DEFAULT_SCHEDULER_ROOT
+        capacity : ResourceBudget, optional
+            Node capacity, by default None
+        poll_interval : float, optional
+            Seconds between resource availability checks, by default
+            POLL_INTERVAL
+        """
+        root = root or getattr(
+            settings, "LOCAL_SCHEDULER_ROOT", DEFAULT_SCHEDULER_ROOT
+        )
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.capacity = capacity or get_node_capacity()
+        self.poll_interval = poll_interval
+
+    @contextmanager
+    def lock(self):
+        """
+        Acquires an exclusive lock over the scheduler's reservations.
+        """
+        with open(self.root / LOCK_FILE_NAME, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_reservations(self) -> Dict[Path, dict]:
+        """
+        Returns current reservations, removing any reservations of processes
+        that are no longer running. Should be called while holding the
+        scheduler's lock.
+
+        Returns
+        -------
+        Dict[Path, dict]
+            Reservations by file path
+        """
+        reservations = {}
+        for path in self.root.glob("*.json"):
+            try:
+                reservation = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if is_alive(reservation["pid"]):
+                reservations[path] = reservation
+            else:
+                path.unlink()
+        return reservations
+
+    def try_reserve(self, job_id: str, budget: ResourceBudget) -> bool:
+        """
+        Reserves the provided budget if the node has enough free resources.
+        Budgets exceeding the node's capacity are reserved only when no other
+        job is running.
+
+        Parameters
+        ----------
+        job_id : str
+            Job identifier
+        budget : ResourceBudget
+            Requested resources
+
+        Returns
+        -------
+        bool
+            Whether the resources were reserved
+        """
+        with self.lock():
+            reservations = self.get_reservations().values()
+            n_cpus = sum(reservation["n_cpus"] for reservation in reservations)
+            memory_mb = sum(
+                reservation["memory_mb"] for reservation in reservations
+            )
+            fits = (
+                n_cpus + budget.n_cpus <= self.capacity.n_cpus
+                and memory_mb + budget.memory_mb <= self.capacity.memory_mb
+            )
+            if reservations and not fits:
+                return False
+            reservation = {
+                "pid": os.getpid(),
+                "n_cpus": budget.n_cpus,
+                "memory_mb": budget.memory_mb,
+                "created": time.time(),
+            }
+            path = self.root / f"{job_id}.json"
+            path.write_text(json.dumps(reservation))
+        return True
+
+    def release(self, job_id: str) -> None:
+        """
+        Releases a job's reservation.
+
+        Parameters
+        ----------
+        job_id : str
+            Job identifier
+        """
+        with self.lock():
+            path = self.root / f"{job_id}.json"
+            if path.exists():
+                path.unlink()
+
+    async def acquire(self, job_id: str, budget: ResourceBudget) -> None:
+        """
+        Waits until the provided budget is reserved.
+
+        Parameters
+        ----------
+        job_id : str
+            Job identifier
+        budget : ResourceBudget
+            Requested resources
+        """
+        queued = False
+        while not self.try_reserve(job_id, budget):
+            if not queued:
+                message = JOB_QUEUED.format(
+                    job_id=job_id,
+                    n_cpus=budget.n_cpus,
+                    memory_mb=budget.memory_mb,
+                )
+                self._logger.info(message)
+                queued = True
+            await asyncio.sleep(self.poll_interval)
+
+    async def stop(self, process: asyncio.subprocess.Process) -> int:
+        """
+        Terminates a job's process group, killing it if it does not exit
+        within TERMINATION_TIMEOUT seconds.
+
+        Parameters
+        ----------
+        process : asyncio.subprocess.Process
+            Job process
+
+        Returns
+        -------
+        int
+            Exit status
+        """
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            return await asyncio.wait_for(process.wait(), TERMINATION_TIMEOUT)
+        except ProcessLookupError:
+            pass
+        except asyncio.TimeoutError:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+        return await process.wait()
+
+    async def submit(self, job: Job) -> int:
+        """
+        Executes the provided job once its budget is reserved, writing its
+        standard output and error streams to log files. If interrupted (e.g.
+        cancelled), the job's processes are stopped before its reservation is
+        released.
+
+        Parameters
+        ----------
+        job : Job
+            Job to execute
+
+        Returns
+        -------
+        int
+            Exit status
+        """
+        job_id = f"{job.name}-{uuid4().hex[:8]}"
+        await self.acquire(job_id, job.budget)
+        try:
+            log_dir = Path(job.log_dir)
+            log_dir.mkdir(parents=True, exist_ok=True)
+            message = JOB_STARTED.format(
+                job_id=job_id,
+                n_cpus=job.budget.n_cpus,
+                memory_mb=job.budget.memory_mb,
+                command=job.command,
+                log_dir=log_dir,
+            )
+            self._logger.info(message)
+            with open(log_dir / f"{job_id}.out", "wb") as stdout, open(
+                log_dir / f"{job_id}.err", "wb"
+            ) as stderr:
+                # The job runs in a new session, so that its whole process
+                # group may be stopped.
+                process = await asyncio.create_subprocess_shell(
+                    job.command,
+                    stdout=stdout,
+                    stderr=stderr,
+                    start_new_session=True,
+                )
+                try:
+                    returncode = await process.wait()
+                except (asyncio.CancelledError, Exception):
+                    returncode = await self.stop(process)
+                    message = JOB_TERMINATED.format(
+                        job_id=job_id, returncode=returncode
+                    )
+                    self._logger.warning(message)
+                    raise
+        finally:
+            self.release(job_id)
+        message = JOB_FINISHED.format(job_id=job_id, returncode=returncode)
+        self._logger.info(message)
+        return returncode
+
+    async def gather(self, jobs: Iterable[Job]) -> List[int]:
+        """
+        Executes the provided jobs concurrently, within the node's capacity.
+        If any job fails, the remaining jobs are cancelled.
+
+        Parameters
+        ----------
+        jobs : Iterable[Job]
+            Jobs to execute
+
+        Returns
+        -------
+        List[int]
+            Exit statuses
+        """
+        tasks = [asyncio.ensure_future(self.submit(job)) for job in jobs]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+    def run(self, job: Job) -> int:
+        """
+        Executes the provided job and waits for it to finish.
+
+        Parameters
+        ----------
+        job : Job
+            Job to execute
+
+        Returns
+        -------
+        int
+            Exit status
+        """
+        return asyncio.run(self.submit(job))
+
+    def run_all(self, jobs: Iterable[Job]) -> List[int]:
+        """
+        Executes the provided jobs concurrently and waits for all of them to
+        finish.
+
+        Parameters
+        ----------
+        jobs : Iterable[Job]
+            Jobs to execute
+
+        Returns
+        -------
+        List[int]
+            Exit statuses
+        """
+        return asyncio.run(self.gather(jobs))
+
+
+class LocalExecutionMixin:
+    """
+    Executes an interface's command using the :class:`LocalScheduler`,
+    passing the job's resource budget to the executed pipeline as
+    configuration arguments.
+    """
+
+    #: Configuration keys of the pipeline's CPU, memory (in MB), and
+    #: per-process thread limits.
+    RESOURCE_ARGUMENTS: Tuple[str, str, str] = (
+        "nprocs",
+        "mem",
+        "omp-nthreads",
+    )
+
+    def allocate_resources(self) -> ResourceBudget:
+        """
+        Returns the resource budget of the interface's job, and adds it to
+        the configuration unless the limits were configured explicitly.
+
+        Returns
+        -------
+        ResourceBudget
+            Job budget
+        """
+        n_cpus_key, memory_key, omp_key = self.RESOURCE_ARGUMENTS
+        default = get_default_budget()
+        n_cpus = self.configuration.setdefault(n_cpus_key, default.n_cpus)
+        memory_mb = self.configuration.setdefault(
+            memory_key, default.memory_mb
+        )
+        omp_nthreads = self.configuration.setdefault(
+            omp_key, min(default.omp_nthreads, int(n_cpus))
+        )
+        return ResourceBudget(
+            n_cpus=int(n_cpus),
+            memory_mb=int(memory_mb),
+            omp_nthreads=int(omp_nthreads),
+        )
+
+    def execute(self, command: str, budget: ResourceBudget) -> int:
+        """
+        Executes the provided command within the provided budget, writing
+        logs to the destination's *logs* directory.
+
+        Parameters
+        ----------
+        command : str
+            Command to execute
+        budget : ResourceBudget
+            Job budget
+
+        Returns
+        -------
+        int
+            Exit status
+        """
+        job = Job(
+            command=command,
+            budget=budget,
+            log_dir=self.destination / "logs",
+            name=self.__class__.__name__.lower(),
+        )
+        return LocalScheduler().run(job)
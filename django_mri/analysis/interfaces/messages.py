@@ -5,5 +5,9 @@ A module storing strings used to display messages.
 NO_DCM2NIIX = "Could not call dcm2niix! Please check settings configuration."
 DCM2NIIX_FAILURE = "Failed to create NIfTI file using dcm2niix! Please check application configuration.\nDICOM directory:\t{path}\nDestination:\t{destination}\nDCM2NIIX return value:\t{returned}"
 DCM2NIIX_PATH_MISMATCH = "Returned NIfTI path does not match expected destination.\nThis could indicate a problem with the conversion.\nExpected:{expected_path}\nReturned:{returned_path}"
+JOB_QUEUED = "Insufficient resources for job {job_id} ({n_cpus} CPUs, {memory_mb} MB), waiting for running jobs to finish..."
+JOB_STARTED = "Starting job {job_id} ({n_cpus} CPUs, {memory_mb} MB):\n{command}\nLogs:\t{log_dir}"
+JOB_FINISHED = "Job {job_id} finished with exit status {returncode}."
+JOB_TERMINATED = "Job {job_id} was interrupted, its processes were stopped with exit status {returncode}."
 
 # flake8: noqa: E501
@@ -5,12 +5,14 @@ import os
 from pathlib import Path
 from typing import Tuple
 
+from django_mri.analysis.interfaces.batch import BatchOutputsMixin
+from django_mri.analysis.interfaces.bids_input import BidsInputMixin
 from django_mri.analysis.interfaces.mriqc.messages import RUN_FAILURE
 from django_mri.analysis.interfaces.mriqc.utils import COMMAND, FLAGS
-from django_mri.utils import get_singularity_root
+from django_mri.utils import get_mri_root, get_singularity_root
 
 
-class MRIQC:
+class MRIQC(BatchOutputsMixin, BidsInputMixin):
     """
     An interface for the *mriqc* quality-control pipeline.
     """
@@ -18,6 +20,9 @@ class MRIQC:
     #: Binary configurations.
     FLAGS = FLAGS
 
+    #: PyBIDS layout database configuration key.
+    BIDS_DATABASE_KEY = "bids-database-dir"
+
     __version__ = None
 
     def __init__(self, **kwargs):
@@ -37,8 +42,6 @@ class MRIQC:
         Tuple[Path, Path]
             Paths to input and output directories, accordingly
         """
-        from django_mri.utils import get_mri_root
-
         mri_root = get_mri_root()
         return mri_root / "rawdata", mri_root.parent / "analysis"
 
@@ -77,9 +80,9 @@ class MRIQC:
         analysis_level = self.configuration.pop("analysis_level")
         singularity_image_root = get_singularity_root()
         command = COMMAND.format(
-            bids_parent=self.nifti_root.parent,
+            mri_root=get_mri_root(),
+            bids_dir=self.nifti_root,
             destination_parent=self.destination.parent,
-            bids_name=self.nifti_root.name,
             destination_name=self.destination.name,
             analysis_level=analysis_level,
             version=self.__version__,
@@ -125,8 +128,12 @@ class MRIQC:
         RuntimeError
             In case of failed execution, raises an appropriate error
         """
-        command = self.generate_command()
-        raised_exception = os.system(command)
+        if self.collect_batch_outputs():
+            return self.generate_output_dict()
+        with self.get_bids_view(self.nifti_root) as bids_dir:
+            self.nifti_root = bids_dir
+            command = self.generate_command()
+            raised_exception = os.system(command)
         if raised_exception:
             message = RUN_FAILURE.format(
                 command=command, exception=raised_exception
@@ -0,0 +1,129 @@
+"""
+Definition of the :class:`OutputIndex` class and the
+:class:`OutputIndexMixin` used by preprocessing pipeline interfaces to
+locate their outputs.
+"""
+import os
+import re
+from pathlib import Path
+from typing import List, Pattern
+
+
+def translate_pattern(pattern: str) -> Pattern:
+    """
+    Translates a :meth:`pathlib.Path.rglob` pattern into a regular expression
+    matching relative POSIX paths.
+
+    Parameters
+    ----------
+    pattern : str
+        Recursive glob pattern
+
+    Returns
+    -------
+    Pattern
+        Compiled regular expression
+    """
+    parts = pattern.strip("/").split("/")
+    regex = "(?:.*/)?"
+    for i, part in enumerate(parts):
+        if part == "**":
+            regex += "(?:[^/]+/)*"
+            continue
+        for character in part:
+            if character == "*":
+                regex += "[^/]*"
+            elif character == "?":
+                regex += "[^/]"
+            else:
+                regex += re.escape(character)
+        if i + 1 < len(parts):
+            regex += "/"
+    return re.compile(regex + r"\Z")
+
+
+class OutputIndex:
+    """
+    Index of all the paths under some root directory, created by walking the
+    directory tree once. Used to resolve many glob patterns without repeated
+    recursive directory walks.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.relative_paths = self.walk()
+
+    def walk(self) -> List[str]:
+        """
+        Walks the root directory and returns all file and directory paths
+        relative to it.
+
+        Returns
+        -------
+        List[str]
+            Relative POSIX paths
+        """
+        relative_paths = []
+        if not self.root.is_dir():
+            return relative_paths
+        directories = [(str(self.root), "")]
+        while directories:
+            path, prefix = directories.pop()
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    relative_path = prefix + entry.name
+                    relative_paths.append(relative_path)
+                    if entry.is_dir():
+                        directories.append((entry.path, relative_path + "/"))
+        return sorted(relative_paths, key=lambda path: path.split("/"))
+
+    def rglob(self, pattern: str) -> List[Path]:
+        """
+        Returns indexed paths matching the provided pattern at any depth,
+        equivalent to :meth:`pathlib.Path.rglob`.
+
+        Parameters
+        ----------
+        pattern : str
+            Recursive glob pattern
+
+        Returns
+        -------
+        List[Path]
+            Matching paths
+        """
+        regex = translate_pattern(pattern)
+        return [
+            self.root / relative_path
+            for relative_path in self.relative_paths
+            if regex.match(relative_path)
+        ]
+
+
+class OutputIndexMixin:
+    """
+    Provides a lazily created :class:`OutputIndex` of an interface's
+    *destination* directory.
+    """
+
+    _output_index: OutputIndex = None
+
+    def reset_output_index(self) -> None:
+        """
+        Clears the current index, to be recreated on the next query.
+        """
+        self._output_index = None
+
+    @property
+    def output_index(self) -> OutputIndex:
+        """
+        Returns an index of the interface's destination directory.
+
+        Returns
+        -------
+        OutputIndex
+            Destination directory index
+        """
+        if self._output_index is None:
+            self._output_index = OutputIndex(self.destination)
+        return self._output_index
@@ -6,16 +6,24 @@ from pathlib import Path
 from typing import Iterable, Tuple, Union
 
 from django.conf import settings
+from django_mri.analysis.interfaces.batch import BatchOutputsMixin
+from django_mri.analysis.interfaces.bids_input import BidsInputMixin
+from django_mri.analysis.interfaces.local_scheduler import (
+    LocalExecutionMixin,
+)
+from django_mri.analysis.interfaces.output_index import OutputIndexMixin
 from django_mri.analysis.interfaces.qsiprep.messages import (
     FS_LICENSE_MISSING, RUN_FAILURE)
 from django_mri.analysis.interfaces.qsiprep.utils import (COMMAND, FLAGS,
                                                           FREESURFER_HOME,
                                                           OUTPUTS)
-from django_mri.utils import get_singularity_root
+from django_mri.utils import get_mri_root, get_singularity_root
 from django_mri.utils.utils import get_bids_dir
 
 
-class QsiPrep:
+class QsiPrep(
+    BatchOutputsMixin, BidsInputMixin, LocalExecutionMixin, OutputIndexMixin
+):
     """
     An interface for the *qsiprep* preprocessing pipeline.
 
@@ -41,6 +49,12 @@ class QsiPrep:
         "{main_dir}/**/{sub_dir}/sub-{subject_id}_{session_id}_{output_id}"
     )
 
+    #: PyBIDS layout database configuration key.
+    BIDS_DATABASE_KEY = "bids_database_dir"
+
+    #: CPU, memory, and per-process thread limit configuration keys.
+    RESOURCE_ARGUMENTS = ("nthreads", "mem_mb", "omp_nthreads")
+
     #: FreeSurfer output pattern.
     FS_OUTPUT_PATTERN: str = "{main_dir}/**/*{output_id}"
 
@@ -163,7 +177,7 @@ class QsiPrep:
 
         singularity_image_root = get_singularity_root()
         command = COMMAND.format(
-            bids_origin=str(get_bids_dir()),
+            mri_root=get_mri_root(),
             bids_root=self.bids_root,
             destination_parent=self.destination.parent,
             destination_name=self.destination.name,
@@ -198,7 +212,7 @@ class QsiPrep:
 
         """
         pattern = self.FS_OUTPUT_PATTERN.format(main_dir=main_dir, output_id=output_id)
-        return self.destination.rglob(pattern)
+        return self.output_index.rglob(pattern)
 
     def generate_qsiprep_outputs(
         self,
@@ -236,7 +250,7 @@ class QsiPrep:
             session_id=session_id,
             output_id=output_id,
         )
-        return self.destination.rglob(pattern)
+        return self.output_index.rglob(pattern)
 
     def find_output(self, partial_output: str, subject_id: str, session_id: str):
         """
@@ -277,6 +291,7 @@ class QsiPrep:
         dict
             Output files by key
         """
+        self.reset_output_index()
         output_dict = {}
         subject_ids = self.configuration.get("participant_label")
         for subject_id in subject_ids:
@@ -307,8 +322,13 @@ class QsiPrep:
         RuntimeError
             In case of failed execution, raises an appropriate error
         """
-        command = self.generate_command()
-        raised_exception = os.system(command)
+        if self.collect_batch_outputs():
+            return self.generate_output_dict()
+        budget = self.allocate_resources()
+        with self.get_bids_view(self.bids_root) as bids_root:
+            self.bids_root = bids_root
+            command = self.generate_command()
+            raised_exception = self.execute(command, budget)
         if raised_exception:
             message = RUN_FAILURE.format(command=command, exception=raised_exception)
             raise RuntimeError(message)
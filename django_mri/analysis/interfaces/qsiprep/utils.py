@@ -4,7 +4,7 @@ Utilities for the
 """
 
 #: Command line template to format for execution.
-COMMAND = "singularity run -e {security_options} -B {bids_origin},{bids_root}:/bids_root,{destination_parent}:/output,{freesurfer_license}:/fs_license {singularity_image_root}/qsiprep-{version}.sif /bids_root /output/{destination_name} {analysis_level} --fs-license-file /fs_license"  # noqa: E501
+COMMAND = "singularity run -e {security_options} -B {mri_root},{bids_root},{destination_parent}:/output,{freesurfer_license}:/fs_license {singularity_image_root}/qsiprep-{version}.sif {bids_root} /output/{destination_name} {analysis_level} --fs-license-file /fs_license"  # noqa: E501
 
 #: Default FreeSurfer home directory.
 FREESURFER_HOME: str = "/usr/local/freesurfer"
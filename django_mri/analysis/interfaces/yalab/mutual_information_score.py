@@ -1,16 +1,18 @@
 """
 Definition of the :class:`MutualInformationScore` class.
 """
-from itertools import combinations
+import logging
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Iterable, Union
+from typing import Dict, Iterable, List, Tuple, Union
 
 import nibabel as nib
 import numpy as np
 import pandas as pd
-# from dask.dataframe import from_pandas
+from django.apps import apps
 from django.db.models import QuerySet
-from sklearn.metrics import mutual_info_score
 
 from django_mri.analysis.interfaces.yalab import messages
 from django_mri.analysis.interfaces.yalab.utils import \
@@ -18,11 +20,130 @@ from django_mri.analysis.interfaces.yalab.utils import \
 
 SECONDS_IN_DAY = 60 * 60 * 24
 
+#: Name of the quantized volumes cache file (per compared output).
+CACHE_FILE_TEMPLATE = "{output}.npy"
+
+#: Number of pairs counted by a single vectorized *bincount* call.
+PAIRS_PER_BINCOUNT = 8
+
+#: Number of pairs computed by a single worker task.
+PAIRS_PER_TASK = 256
+
+#: Memory-mapped caches opened by the current (worker) process.
+_CACHES: Dict[str, np.ndarray] = {}
+
+
+def quantize(data: np.ndarray, bins: int) -> np.ndarray:
+    """
+    Returns the bin index of each value, using *bins* equal-width bins over
+    the data's range. Binning is identical to :func:`numpy.histogram2d`'s
+    along a single axis, so joint histograms of quantized volumes reproduce
+    the histograms of the original pair.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        One-dimensional data
+    bins : int
+        Number of bins
+
+    Returns
+    -------
+    np.ndarray
+        Bin indices
+    """
+    dtype = np.uint8 if bins <= np.iinfo(np.uint8).max + 1 else np.uint16
+    first_edge, last_edge = data.min(), data.max()
+    if first_edge == last_edge:
+        first_edge, last_edge = first_edge - 0.5, last_edge + 0.5
+    edges = np.linspace(first_edge, last_edge, bins + 1)
+    indices = np.searchsorted(edges, data, side="right") - 1
+    indices[data == last_edge] = bins - 1
+    return indices.astype(dtype)
+
+
+def mutual_information(joint: np.ndarray) -> np.ndarray:
+    """
+    Returns the mutual information score of each of the provided joint
+    histograms (equivalent to :func:`sklearn.metrics.mutual_info_score`
+    given the histogram as the contingency matrix).
+
+    Parameters
+    ----------
+    joint : np.ndarray
+        Joint histograms (*n_pairs* x *bins* x *bins*)
+
+    Returns
+    -------
+    np.ndarray
+        Mutual information scores
+    """
+    joint = joint.astype(np.float64)
+    total = joint.sum(axis=(1, 2), keepdims=True)
+    marginal_1 = joint.sum(axis=2, keepdims=True)
+    marginal_2 = joint.sum(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        terms = (joint / total) * np.log(
+            joint * total / (marginal_1 * marginal_2)
+        )
+    scores = np.where(joint > 0, terms, 0).sum(axis=(1, 2))
+    return np.clip(scores, 0, None)
+
+
+def _get_cache(path: str) -> np.ndarray:
+    if path not in _CACHES:
+        _CACHES[path] = np.load(path, mmap_mode="r")
+    return _CACHES[path]
+
+
+def _score_pairs(
+    path: str, bins: int, rows: np.ndarray, columns: np.ndarray
+) -> np.ndarray:
+    """
+    Computes the mutual information scores of the provided pairs of
+    quantized volumes.
+
+    Parameters
+    ----------
+    path : str
+        Quantized volumes cache path
+    bins : int
+        Number of bins
+    rows : np.ndarray
+        First volume index of each pair
+    columns : np.ndarray
+        Second volume index of each pair
+
+    Returns
+    -------
+    np.ndarray
+        Mutual information scores
+    """
+    data = _get_cache(path)
+    n_bins = bins * bins
+    scores = np.empty(len(rows))
+    for start in range(0, len(rows), PAIRS_PER_BINCOUNT):
+        stop = start + PAIRS_PER_BINCOUNT
+        chunk_rows, chunk_columns = rows[start:stop], columns[start:stop]
+        n_pairs = len(chunk_rows)
+        offsets = np.arange(n_pairs, dtype=np.int64)[:, None] * n_bins
+        codes = data[chunk_rows].astype(np.int64) * bins
+        codes += data[chunk_columns]
+        codes += offsets
+        joint = np.bincount(codes.ravel(), minlength=n_pairs * n_bins)
+        joint = joint.reshape(n_pairs, bins, bins)
+        scores[start:stop] = mutual_information(joint)
+    return scores
+
 
 class MutualInformationScore:
     """
     Calculates the mutual information score of the contingency matrix for each
     combination of the 2D histograms generated by CAT12 segmentation outputs.
+
+    Each output volume is read and quantized once into a memory-mapped cache
+    of bin indices, and joint histograms are computed for blocks of pairs
+    using vectorized counting over a process pool.
     """
 
     NIFTI_SUFFIXES = [".nii"], [".nii", ".gz"]
@@ -51,8 +172,14 @@ class MutualInformationScore:
         # "jacobian_determinant",
     )
 
-    def __init__(self, bins: int = 10):
+    _logger = logging.getLogger("data.mri.analysis")
+
+    def __init__(
+        self, bins: int = 10, workers: int = None, cache_dir: Path = None
+    ):
         self.bins = bins
+        self.workers = workers
+        self.cache_dir = cache_dir
 
     @staticmethod
     def _fix_output_name(output_name: str) -> str:
@@ -64,15 +191,26 @@ class MutualInformationScore:
         return np.nan_to_num(data.flatten())
 
     @staticmethod
-    def _query_scan(run):
-        from django_mri.models.scan import Scan
+    def _query_scans(runs: List) -> List[dict]:
+        """
+        Returns the scan information of each run, using a single query for
+        all of the runs' scans.
 
-        return Scan.objects.get(_nifti__path=run.get_input("path"))
+        Parameters
+        ----------
+        runs : List[Run]
+            CAT12 segmentation runs
 
-    @staticmethod
-    def _calculate_days_delta(scan_1, scan_2) -> int:
-        seconds_delta = np.abs((scan_1.time - scan_2.time).total_seconds())
-        return int(seconds_delta / SECONDS_IN_DAY)
+        Returns
+        -------
+        List[dict]
+            Scan information by run (None if no scan was found)
+        """
+        Scan = apps.get_model("django_mri", "Scan")
+        scans = Scan.objects.values_by_run(
+            runs, "description", "time", "session_id", "session__subject_id"
+        )
+        return [scans.get(run.id) for run in runs]
 
     @classmethod
     def _get_column_names(cls) -> list:
@@ -91,69 +229,144 @@ class MutualInformationScore:
             return np.stack([cls._read_data(p) for p in path], axis=0)
 
     def _calculate_mi(self, data_1: np.ndarray, data_2: np.ndarray) -> float:
-        try:
-            histogram = np.histogram2d(data_1, data_2, self.bins)[0]
-        except ValueError:
-            pass
-        else:
-            return mutual_info_score(None, None, contingency=histogram)
+        if data_1.size == 0 or data_1.size != data_2.size:
+            return None
+        codes = quantize(data_1, self.bins).astype(np.int64) * self.bins
+        codes += quantize(data_2, self.bins)
+        joint = np.bincount(codes, minlength=self.bins * self.bins)
+        joint = joint.reshape(1, self.bins, self.bins)
+        return float(mutual_information(joint)[0])
+
+    def _cache_output(
+        self, runs: List, output: str, cache_dir: Path
+    ) -> Tuple[Path, np.ndarray]:
+        """
+        Reads and quantizes each run's output once into a memory-mapped
+        cache of bin indices.
+
+        Parameters
+        ----------
+        runs : List[Run]
+            CAT12 segmentation runs
+        output : str
+            Compared output key
+        cache_dir : Path
+            Cache directory
+
+        Returns
+        -------
+        Path, np.ndarray
+            Cache path and validity mask (volumes that could not be read or
+            do not match the first volume's size are invalid)
+        """
+        path = cache_dir / CACHE_FILE_TEMPLATE.format(output=output)
+        valid = np.zeros(len(runs), dtype=bool)
+        cache = None
+        for index, run in enumerate(runs):
+            try:
+                data = self._read_data(run.get_output(output))
+            except (ValueError, FileNotFoundError):
+                continue
+            if cache is None:
+                if data.size == 0:
+                    continue
+                cache = np.lib.format.open_memmap(
+                    path,
+                    mode="w+",
+                    dtype=quantize(data[:1], self.bins).dtype,
+                    shape=(len(runs), data.size),
+                )
+            if data.shape != cache.shape[1:]:
+                continue
+            cache[index] = quantize(data, self.bins)
+            valid[index] = True
+        if cache is not None:
+            cache.flush()
+            del cache
+        return path, valid
+
+    def _score_output(
+        self,
+        path: Path,
+        valid: np.ndarray,
+        rows: np.ndarray,
+        columns: np.ndarray,
+        executor: ProcessPoolExecutor,
+    ) -> np.ndarray:
+        scores = np.full(len(rows), np.nan)
+        pairs = np.flatnonzero(valid[rows] & valid[columns])
+        tasks = [
+            pairs[start : start + PAIRS_PER_TASK]
+            for start in range(0, len(pairs), PAIRS_PER_TASK)
+        ]
+        futures = [
+            executor.submit(
+                _score_pairs, str(path), self.bins, rows[task], columns[task]
+            )
+            for task in tasks
+        ]
+        for task, future in zip(tasks, futures):
+            scores[task] = future.result()
+        return scores
+
+    def _get_info_columns(
+        self, scans: List[dict], rows: np.ndarray, columns: np.ndarray
+    ) -> dict:
+        info = {}
+        empty = {key: None for key in ("id", "session_id", "description")}
+        empty.update({"time": pd.NaT, "session__subject_id": None})
+        scans = [scan or empty for scan in scans]
+        for key, name in (
+            ("session__subject_id", "Subject"),
+            ("session_id", "Session"),
+            ("id", "Scan"),
+            ("description", "Scan Description"),
+            ("time", "Scan Time"),
+        ):
+            values = pd.Series([scan[key] for scan in scans])
+            info[f"{name} 1"] = values.values[rows]
+            info[f"{name} 2"] = values.values[columns]
+        subjects = pd.Series([scan["session__subject_id"] for scan in scans])
+        subject_known = subjects.notna().values
+        same_subject = (info["Subject 1"] == info["Subject 2"]) & (
+            subject_known[rows] & subject_known[columns]
+        )
+        info["Same Subject"] = same_subject
+        same_session = info["Session 1"] == info["Session 2"]
+        info["Same Session"] = np.where(same_subject, same_session, None)
+        times = pd.to_datetime(pd.Series([scan["time"] for scan in scans]))
+        delta = (times.values[rows] - times.values[columns]).astype(
+            "timedelta64[s]"
+        )
+        days = np.abs(delta.astype(np.float64)) // SECONDS_IN_DAY
+        known_delta = same_subject & ~np.isnat(delta)
+        info["Time Delta"] = np.where(known_delta, days, np.nan)
+        return info
 
     def run(self, runs: QuerySet = None) -> pd.DataFrame:
         node = get_cat12_segmentation_node()
         runs = runs or node.get_run_set().filter(status="SUCCESS")
-        indices = pd.MultiIndex.from_tuples(
-            combinations(range(runs.count()), 2)
+        runs = list(runs)
+        rows, columns = np.triu_indices(len(runs), k=1)
+        scores = self._get_info_columns(
+            self._query_scans(runs), rows, columns
         )
-        scores = pd.DataFrame(index=indices, columns=self.column_names)
-        # scores = from_pandas(scores, chunksize=25000)
-        for i_output, output in enumerate(self.COMPARED_OUTPUTS):
-            output_name = self._fix_output_name(output)
-            print(output_name)
-            previous_index_1 = previous_index_2 = None
-            data_1 = data_2 = None
-            for index, *_ in scores.itertuples():
-                index_1, index_2 = index
-                run_1, run_2 = runs[index_1], runs[index_2]
-                if previous_index_1 != index_1:
-                    path_1 = run_1.get_output(output)
-                    data_1 = self._read_data(path_1)
-                if previous_index_2 != index_2:
-                    path_2 = run_2.get_output(output)
-                    data_2 = self._read_data(path_2)
-                score = self._calculate_mi(data_1, data_2)
-                scores.loc[index, output_name] = score
-                previous_index_1 = index_1
-                previous_index_2 = index_2
-                if i_output == 0:
-                    scan_1 = self._query_scan(run_1)
-                    scan_2 = self._query_scan(run_2)
-                    session_1 = scan_1.session
-                    session_2 = scan_2.session
-                    subject_1 = session_1.subject
-                    subject_2 = session_2.subject
-                    same_subject = subject_1 == subject_2
-                    scores.loc[index, "Subject 1"] = subject_1.id
-                    scores.loc[index, "Subject 2"] = subject_2.id
-                    scores.loc[index, "Same Subject"] = same_subject
-                    scores.loc[index, "Session 1"] = session_1.id
-                    scores.loc[index, "Session 2"] = session_2.id
-                    if same_subject:
-                        same_session = session_1 == session_2
-                        scores.loc[index, "Same Session"] = same_session
-                    scores.loc[index, "Scan 1"] = scan_1.id
-                    scores.loc[index, "Scan 2"] = scan_2.id
-                    scores.loc[
-                        index, "Scan Description 1"
-                    ] = scan_1.description
-                    scores.loc[
-                        index, "Scan Description 2"
-                    ] = scan_2.description
-                    scores.loc[index, "Scan Time 1"] = scan_1.time
-                    scores.loc[index, "Scan Time 2"] = scan_2.time
-                    if same_subject:
-                        delta = self._calculate_days_delta(scan_1, scan_2)
-                        scores.loc[index, "Time Delta"] = delta
-        return scores
+        cache_dir = Path(self.cache_dir or tempfile.mkdtemp())
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                for output in self.COMPARED_OUTPUTS:
+                    output_name = self._fix_output_name(output)
+                    self._logger.info(f"Calculating {output_name} scores...")
+                    path, valid = self._cache_output(runs, output, cache_dir)
+                    scores[output_name] = self._score_output(
+                        path, valid, rows, columns, executor
+                    )
+        finally:
+            if self.cache_dir is None:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+        index = pd.MultiIndex.from_arrays([rows, columns])
+        return pd.DataFrame(scores, index=index, columns=self.column_names)
 
     @property
     def column_names(self) -> list:
@@ -1,8 +1,34 @@
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Union
 
 import pandas as pd
-from django_mri.analysis.parsers.recon_all.stats import ReconAllStats
+from django_mri.analysis.parsers.recon_all.stats import (
+    COLUMN_TYPES,
+    START_COLUMNS,
+    ReconAllStats,
+)
+
+
+def parse_run_stats(stats_path: Path) -> pd.DataFrame:
+    """
+    Parses a single run's stats directory, adding the run's subject ID to the
+    returned DataFrame. Defined at module level to be usable by a process
+    pool.
+
+    Parameters
+    ----------
+    stats_path : Path
+        Run stats directory
+
+    Returns
+    -------
+    pd.DataFrame
+        Parsed stats
+    """
+    stats = ReconAllStats(stats_path).to_dataframe()
+    stats["Subject ID"] = stats_path.parent.name
+    return stats
 
 
 class ReconAllOutputParser:
@@ -13,22 +39,40 @@ class ReconAllOutputParser:
         self.stats = ReconAllStats(path / self.STATS_DIR)
 
     @classmethod
-    def extract_stats(cls, path: Union[Path, List[Path]]) -> pd.DataFrame:
+    def extract_stats(
+        cls, path: Union[Path, List[Path]], max_workers: int = None
+    ) -> pd.DataFrame:
+        """
+        Parses the stats of a single run, or concatenates the stats of
+        multiple runs.
+
+        Parameters
+        ----------
+        path : Union[Path, List[Path]]
+            Stats directory or run directories
+        max_workers : int, optional
+            If provided, the number of processes used to parse multiple runs,
+            by default None (parse sequentially)
+
+        Returns
+        -------
+        pd.DataFrame
+            Parsed stats
+        """
         if isinstance(path, Path):
             return ReconAllStats(path).to_dataframe()
+        stats_paths = [run_path / cls.STATS_DIR for run_path in path]
+        if max_workers:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                frames = list(executor.map(parse_run_stats, stats_paths))
         else:
-            all_stats = None
-            for run_path in path:
-                stats_path = run_path / cls.STATS_DIR
-                stats = ReconAllStats(stats_path).to_dataframe()
-                if not stats.empty:
-                    stats["Subject ID"] = stats_path.parent.name
-                    if all_stats is None:
-                        all_stats = stats.copy()
-                    else:
-                        all_stats = all_stats.append(stats)
-            indices = ["Subject ID"] + ReconAllStats.INDICES
-            return all_stats.reset_index().set_index(indices)
+            frames = [parse_run_stats(path) for path in stats_paths]
+        frames = [stats for stats in frames if not stats.empty]
+        indices = ["Subject ID"] + ReconAllStats.INDICES
+        if not frames:
+            empty = pd.DataFrame(columns=["Subject ID"] + START_COLUMNS)
+            return empty.astype(COLUMN_TYPES).set_index(indices)
+        return pd.concat(frames).reset_index().set_index(indices)
 
     def parse(self) -> pd.DataFrame:
         return self.stats.to_dataframe()
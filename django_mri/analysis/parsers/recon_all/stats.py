@@ -1,6 +1,22 @@
+import hashlib
 from pathlib import Path
+from typing import Dict, Tuple
 
 import pandas as pd
+from django.conf import settings
+from django_mri.utils.utils import get_mri_root
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    # Fall back to pickle if pyarrow (required for Parquet) is unavailable.
+    CACHE_SUFFIX = ".pkl"
+    READ_CACHE = pd.read_pickle
+    WRITE_CACHE = pd.DataFrame.to_pickle
+else:
+    CACHE_SUFFIX = ".parquet"
+    READ_CACHE = pd.read_parquet
+    WRITE_CACHE = pd.DataFrame.to_parquet
 
 COLUMNS_TO_INT = [
     "Number of Vertices",
@@ -28,6 +44,61 @@ MEASUREMENTS = [
 COLUMN_NAMES = ["Region Name", "Number of Vertices"] + MEASUREMENTS
 START_COLUMNS = ["Hemisphere", "Atlas"] + COLUMN_NAMES
 FILE_NAME = "{hemisphere_code}.{atlas_code}.stats"
+COLUMN_TYPES = {
+    "Number of Vertices": "int64",
+    **{measurement: "float64" for measurement in MEASUREMENTS},
+    **{column_name: "int64" for column_name in COLUMNS_TO_INT},
+}
+
+#: The name of the subdirectory under the MRI data root in which parsed stats
+#: will be cached.
+DEFAULT_CACHE_DIR_NAME: str = "stats_cache"
+CACHE_FILE_PREFIX = "stats_"
+
+
+def get_cache_root() -> Path:
+    """
+    Returns the path of the directory in which parsed stats are cached, set
+    by the *STATS_CACHE_ROOT* setting (by default a *stats_cache* directory
+    under the MRI data root).
+
+    Returns
+    -------
+    Path
+        Stats cache root
+    """
+    default = get_mri_root() / DEFAULT_CACHE_DIR_NAME
+    return Path(getattr(settings, "STATS_CACHE_ROOT", default))
+
+
+def read_stats_file(path: Path) -> Dict[str, list]:
+    """
+    Tokenizes a FreeSurfer *.stats* table into columns.
+
+    Parameters
+    ----------
+    path : Path
+        *.stats* file path
+
+    Returns
+    -------
+    Dict[str, list]
+        Column values by column name
+    """
+    columns = {name: [] for name in COLUMN_NAMES}
+    with open(path, "r") as stats_file:
+        for line in stats_file:
+            if line.startswith("#"):
+                continue
+            values = line.split()
+            if len(values) != len(COLUMN_NAMES):
+                continue
+            for name, value in zip(COLUMN_NAMES, values):
+                columns[name].append(value)
+    columns["Region Name"] = [
+        name.replace("_and_", "&") for name in columns["Region Name"]
+    ]
+    return columns
 
 
 class ReconAllStats:
@@ -36,8 +107,16 @@ class ReconAllStats:
     def __init__(self, path: Path) -> None:
         self.path = Path(path)
 
-    def to_dataframe(self) -> pd.DataFrame:
-        stats = pd.DataFrame(columns=START_COLUMNS)
+    def get_stats_files(self) -> Dict[Tuple[str, str], Path]:
+        """
+        Returns the existing *.stats* files by atlas and hemisphere names.
+
+        Returns
+        -------
+        Dict[Tuple[str, str], Path]
+            Stats files by atlas and hemisphere names
+        """
+        stats_files = {}
         for atlas_name, atlas_code in ATLASES.items():
             for hemisphere_name, hemisphere_code in HEMISPHERES.items():
                 name = FILE_NAME.format(
@@ -45,21 +124,108 @@ class ReconAllStats:
                 )
                 partial_stats_path = self.path / name
                 if partial_stats_path.is_file():
-                    data = pd.read_csv(
-                        partial_stats_path,
-                        comment="#",
-                        names=COLUMN_NAMES,
-                        delim_whitespace=True,
+                    stats_files[atlas_name, hemisphere_name] = (
+                        partial_stats_path
                     )
-                    data["Hemisphere"] = hemisphere_name
-                    data["Atlas"] = atlas_name
-                    stats = stats.append(data)
-        stats.set_index(self.INDICES, inplace=True)
-        # Fix `object` columns
-        for column_name in COLUMNS_TO_INT:
-            stats[column_name] = stats[column_name].astype("int64")
-        stats.index = stats.index.set_levels(
-            stats.index.levels[-1].str.replace("_and_", "&"),
-            level="Region Name",
-        )
+        return stats_files
+
+    def get_cache_dir(self) -> Path:
+        """
+        Returns the directory in which this stats directory's parsed results
+        are cached, under the cache root (see :func:`get_cache_root`).
+
+        Returns
+        -------
+        Path
+            Cache directory
+        """
+        path_key = hashlib.md5(str(self.path.resolve()).encode())
+        return get_cache_root() / path_key.hexdigest()
+
+    def get_cache_path(self, stats_files: Dict[Tuple[str, str], Path]) -> Path:
+        """
+        Returns the path of the cached results for the current state of the
+        provided *.stats* files, keyed by their modification times and sizes.
+
+        Parameters
+        ----------
+        stats_files : Dict[Tuple[str, str], Path]
+            Stats files by atlas and hemisphere names
+
+        Returns
+        -------
+        Path
+            Cache file path
+        """
+        key = hashlib.md5()
+        for path in stats_files.values():
+            stat = path.stat()
+            state = f"{path.name}:{stat.st_mtime_ns}:{stat.st_size};"
+            key.update(state.encode())
+        name = f"{CACHE_FILE_PREFIX}{key.hexdigest()}{CACHE_SUFFIX}"
+        return self.get_cache_dir() / name
+
+    def read_cache(self, cache_path: Path) -> pd.DataFrame:
+        if cache_path.is_file():
+            try:
+                return READ_CACHE(cache_path)
+            except Exception:
+                return None
+
+    def write_cache(self, stats: pd.DataFrame, cache_path: Path) -> None:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            for stale in cache_path.parent.glob(f"{CACHE_FILE_PREFIX}*"):
+                stale.unlink()
+            WRITE_CACHE(stats, cache_path)
+        except OSError:
+            pass
+
+    def parse(self) -> pd.DataFrame:
+        """
+        Parses the *.stats* files into a single DataFrame.
+
+        Returns
+        -------
+        pd.DataFrame
+            Parsed stats
+        """
+        frames = []
+        for (atlas, hemisphere), path in self.get_stats_files().items():
+            data = pd.DataFrame(read_stats_file(path))
+            data.insert(0, "Atlas", atlas)
+            data.insert(0, "Hemisphere", hemisphere)
+            frames.append(data)
+        if frames:
+            stats = pd.concat(frames, ignore_index=True)
+        else:
+            stats = pd.DataFrame(columns=START_COLUMNS)
+        stats = stats.astype(COLUMN_TYPES)
+        return stats.set_index(self.INDICES)
+
+    def to_dataframe(self, cache: bool = True) -> pd.DataFrame:
+        """
+        Returns the parsed *.stats* files, reading cached results if the
+        files haven't changed since they were last parsed.
+
+        Parameters
+        ----------
+        cache : bool, optional
+            Whether to read and write cached results, by default True
+
+        Returns
+        -------
+        pd.DataFrame
+            Parsed stats
+        """
+        if not cache:
+            return self.parse()
+        stats_files = self.get_stats_files()
+        if not stats_files:
+            return self.parse()
+        cache_path = self.get_cache_path(stats_files)
+        stats = self.read_cache(cache_path)
+        if stats is None:
+            stats = self.parse()
+            self.write_cache(stats, cache_path)
         return stats
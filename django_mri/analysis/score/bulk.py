@@ -0,0 +1,221 @@
+"""
+Bulk :class:`~django_mri.models.score.Score` ingestion utilities, used to
+create all of a run's scores with a fixed number of queries.
+"""
+from typing import Dict, Iterable, List, NamedTuple, Tuple
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import QuerySet
+from django_analyses.models.run import Run
+from django_mri.models.atlas import Atlas
+from django_mri.models.metric import Metric
+from django_mri.models.region import Region
+
+#: Number of rows per bulk insert query.
+BATCH_SIZE: int = 1000
+
+
+class ScoreRecord(NamedTuple):
+    """
+    A single score to be ingested. Region-less scores (e.g. image quality
+    metrics) should leave the *atlas*, *hemisphere*, and *region* fields
+    empty. If *origin* (scan IDs) is not provided, the origin passed to
+    :func:`bulk_create_scores` is used.
+    """
+
+    metric: str
+    value: float
+    atlas: str = None
+    hemisphere: str = None
+    region: str = None
+    origin: Tuple[int, ...] = None
+
+
+def get_metric_map(
+    titles: Iterable[str], definitions: List[dict] = None
+) -> Dict[str, Metric]:
+    """
+    Returns a dictionary of :class:`~django_mri.models.metric.Metric`
+    instances by title, creating any missing metrics included in the
+    provided *definitions*. Titles that are neither registered nor defined
+    are omitted.
+
+    Parameters
+    ----------
+    titles : Iterable[str]
+        Metric titles
+    definitions : List[dict], optional
+        Metric definitions to create missing metrics from, by default None
+
+    Returns
+    -------
+    Dict[str, Metric]
+        Metrics by title
+    """
+    titles = set(titles)
+    metrics = {}
+    for metric in Metric.objects.filter(title__in=titles).order_by("id"):
+        metrics.setdefault(metric.title, metric)
+    missing = [
+        Metric(**definition)
+        for definition in definitions or []
+        if definition["title"] in titles - set(metrics)
+    ]
+    for metric in Metric.objects.bulk_create(missing):
+        metrics[metric.title] = metric
+    return metrics
+
+
+def get_atlas_map(titles: Iterable[str]) -> Dict[str, Atlas]:
+    """
+    Returns a dictionary of :class:`~django_mri.models.atlas.Atlas`
+    instances by title, creating any missing atlases.
+
+    Parameters
+    ----------
+    titles : Iterable[str]
+        Atlas titles
+
+    Returns
+    -------
+    Dict[str, Atlas]
+        Atlases by title
+    """
+    titles = set(titles)
+    atlases = {
+        atlas.title: atlas for atlas in Atlas.objects.filter(title__in=titles)
+    }
+    missing = [Atlas(title=title) for title in titles - set(atlases)]
+    for atlas in Atlas.objects.bulk_create(missing):
+        atlases[atlas.title] = atlas
+    return atlases
+
+
+def get_region_map(
+    keys: Iterable[Tuple[str, str, str]], atlases: Dict[str, Atlas]
+) -> Dict[Tuple[str, str, str], Region]:
+    """
+    Returns a dictionary of :class:`~django_mri.models.region.Region`
+    instances by atlas title, hemisphere, and region title, creating any
+    missing regions.
+
+    Parameters
+    ----------
+    keys : Iterable[Tuple[str, str, str]]
+        Atlas title, hemisphere, and region title
+    atlases : Dict[str, Atlas]
+        Atlases by title
+
+    Returns
+    -------
+    Dict[Tuple[str, str, str], Region]
+        Regions by atlas title, hemisphere, and region title
+    """
+    keys = set(keys)
+    existing = Region.objects.filter(
+        atlas__in=atlases.values(), title__in={key[2] for key in keys}
+    ).select_related("atlas")
+    regions = {}
+    for region in existing.order_by("id"):
+        key = region.atlas.title, region.hemisphere, region.title
+        regions.setdefault(key, region)
+    missing = [
+        Region(atlas=atlases[atlas], hemisphere=hemisphere, title=title)
+        for atlas, hemisphere, title in keys - set(regions)
+    ]
+    for region in Region.objects.bulk_create(missing, batch_size=BATCH_SIZE):
+        regions[region.atlas.title, region.hemisphere, region.title] = region
+    return regions
+
+
+def bulk_create_scores(
+    run: Run,
+    records: Iterable[ScoreRecord],
+    origin: Iterable = None,
+    metric_definitions: List[dict] = None,
+) -> QuerySet:
+    """
+    Creates :class:`~django_mri.models.score.Score` instances for the
+    provided *run* in a single transaction. Metrics, atlases, and regions are
+    resolved once, and scores (as well as their origin relations) are
+    inserted in bulk. Existing scores with identical values are reused.
+
+    Parameters
+    ----------
+    run : Run
+        The run from which the scores were derived
+    records : Iterable[ScoreRecord]
+        Scores to create
+    origin : Iterable, optional
+        :class:`~django_mri.models.scan.Scan` instances from which the scores
+        were derived, unless specified by the record, by default None
+    metric_definitions : List[dict], optional
+        Definitions used to create unregistered metrics, by default None
+
+    Returns
+    -------
+    QuerySet
+        Created or existing score instances
+    """
+    Score = apps.get_model("django_mri", "Score")
+    OriginRelation = Score.origin.through
+    records = list(records)
+    default_origin = tuple(scan.id for scan in origin or [])
+    with transaction.atomic():
+        metrics = get_metric_map(
+            {record.metric for record in records}, metric_definitions
+        )
+        atlases = get_atlas_map(
+            {record.atlas for record in records if record.atlas}
+        )
+        regions = get_region_map(
+            {
+                (record.atlas, record.hemisphere, record.region)
+                for record in records
+                if record.atlas
+            },
+            atlases,
+        )
+        score_ids = {
+            (score.region_id, score.metric_id, score.value): score.id
+            for score in Score.objects.filter(run=run)
+        }
+        origins = {}
+        new_scores = []
+        for record in records:
+            metric = metrics.get(record.metric)
+            if metric is None:
+                continue
+            region = (
+                regions[record.atlas, record.hemisphere, record.region]
+                if record.atlas
+                else None
+            )
+            key = region.id if region else None, metric.id, record.value
+            if key in origins:
+                continue
+            origins[key] = record.origin or default_origin
+            if key not in score_ids:
+                score = Score(
+                    run=run, region=region, metric=metric, value=record.value
+                )
+                new_scores.append(score)
+        for score in Score.objects.bulk_create(
+            new_scores, batch_size=BATCH_SIZE
+        ):
+            score_ids[score.region_id, score.metric_id, score.value] = score.id
+        score_ids = {key: score_ids[key] for key in origins}
+        with_origin = set(
+            OriginRelation.objects.filter(
+                score_id__in=score_ids.values()
+            ).values_list("score_id", flat=True)
+        )
+        relations = [
+            OriginRelation(score_id=score_id, scan_id=scan_id)
+            for key, score_id in score_ids.items()
+            if score_id not in with_origin
+            for scan_id in origins[key]
+        ]
+        OriginRelation.objects.bulk_create(relations, batch_size=BATCH_SIZE)
+    return Score.objects.filter(id__in=score_ids.values())
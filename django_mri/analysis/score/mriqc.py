@@ -1,35 +1,62 @@
-from django.apps import apps
-from django.db.models import QuerySet
+from typing import Dict, Iterable
+
+from django.db.models import Q, QuerySet
 from django_analyses.models.run import Run
 from django_mri.analysis.metric.mriqc import MRIQC_METRICS
-from django_mri.models.metric import Metric
+from django_mri.analysis.score.bulk import ScoreRecord, bulk_create_scores
 from django_mri.models.scan import Scan
+from django_mri.utils.bids_entities import parse_bids_entities
+from django_mri.utils.utils import get_bids_manager
+
+#: NIfTI fields matched against each IQM row's name and its BIDS entities.
+MATCHED_FIELDS = "stem", "bids_subject", "bids_session", "bids_run"
+
+
+def get_scan_ids(names: Iterable[str]) -> Dict[str, int]:
+    """
+    Returns the IDs of the scans evaluated in MRIQC's IQM rows, matching each
+    row's name (a BIDS file name without extensions) and its parsed BIDS
+    entities against the NIfTI files in the BIDS directory.
+
+    Parameters
+    ----------
+    names : Iterable[str]
+        IQM row names
+
+    Returns
+    -------
+    Dict[str, int]
+        Scan ID by row name
+    """
+    names_by_key = {}
+    query = Q()
+    for name in names:
+        entities = parse_bids_entities(name)
+        key = tuple(entities[field] for field in MATCHED_FIELDS)
+        names_by_key[key] = name
+        lookups = {
+            f"_nifti__{field}": value
+            for field, value in zip(MATCHED_FIELDS, key)
+        }
+        query |= Q(**lookups)
+    if not names_by_key:
+        return {}
+    bids_dir = get_bids_manager().bids_dir
+    fields = [f"_nifti__{field}" for field in MATCHED_FIELDS]
+    scans = Scan.objects.filter(
+        query, _nifti__path__startswith=f"{bids_dir}/"
+    ).values_list(*fields, "id")
+    return {names_by_key[tuple(key)]: scan_id for *key, scan_id in scans}
 
 
 def create_mriqc_scores(run: Run) -> QuerySet:
-    Score = apps.get_model("django_mri", "Score")
     df = run.parse_output()
-    score_ids = []
-    for nii_stem, scores in df.iterrows():
-        origin = Scan.objects.get(_nifti__path__endswith=f"{nii_stem}.nii.gz")
-        for metric_title, value in scores.iteritems():
-            try:
-                metric = Metric.objects.get(title=metric_title)
-            except Metric.DoesNotExist:
-                for metric_definition in MRIQC_METRICS:
-                    Metric.objects.get_or_create(**metric_definition)
-                try:
-                    metric = Metric.objects.get(title=metric_title)
-                except Metric.DoesNotExist:
-                    print(f"Metric {metric_title} not registered, skipping.")
-                    continue
-            except Metric.MultipleObjectsReturned:
-                print(f"{metric_title} return multiple!")
-                metric = Metric.objects.filter(title=metric_title).first()
-            score, _ = Score.objects.get_or_create(
-                run=run, metric=metric, value=value
-            )
-            if not score.origin.exists():
-                score.origin.set([origin])
-            score_ids.append(score.id)
-    return Score.objects.filter(id__in=score_ids)
+    scan_ids = get_scan_ids(df.index)
+    records = [
+        ScoreRecord(
+            metric=metric_title, value=value, origin=(scan_ids[nii_stem],)
+        )
+        for nii_stem, scores in df.iterrows()
+        for metric_title, value in scores.iteritems()
+    ]
+    return bulk_create_scores(run, records, metric_definitions=MRIQC_METRICS)
@@ -34,6 +34,12 @@ MRIQC_INPUT_SPECIFICATION = {
         "description": "a space delimited list of participant identifiers or a single identifier (the sub- prefix can be removed)",  # noqa: E501
         "is_configuration": False,
     },
+    "batch_dir": {
+        "type": StringInputDefinition,
+        "required": False,
+        "description": "Directory of a batched multi-participant execution (relative to the analysis root) to collect the participant's outputs from instead of running the pipeline.",  # noqa: E501
+        "is_configuration": False,
+    },
     "task-id": {
         "type": StringInputDefinition,
         "description": "Filter input dataset by task ID.",
@@ -133,6 +139,10 @@ MRIQC_INPUT_SPECIFICATION = {
         "description": "Path where intermediate results should be stored.",
         "default": "/out/work",
     },
+    "bids-database-dir": {
+        "type": DirectoryInputDefinition,
+        "description": "Path to an existing PyBIDS database folder, for faster indexing (especially useful for large datasets).",
+    },
 }
 #: *MRIQC* output specification.
 MRIQC_OUTPUT_SPECIFICATION = {
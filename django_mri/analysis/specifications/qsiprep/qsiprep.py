@@ -56,6 +56,12 @@ QSIPREP_INPUT_SPECIFICATION = {
         "description": "a space delimited list of participant identifiers or a single identifier (the sub- prefix can be removed)",  # noqa: E501
         "is_configuration": False,
     },
+    "batch_dir": {
+        "type": StringInputDefinition,
+        "required": False,
+        "description": "Directory of a batched multi-participant execution (relative to the analysis root) to collect the participant's outputs from instead of running the pipeline.",  # noqa: E501
+        "is_configuration": False,
+    },
     "acquisition_type": {
         "type": StringInputDefinition,
         "description": "select a specific acquisition type to be processed",
@@ -10,7 +10,7 @@ from django_mri.models.scan import Scan
 def dwi_preprocessing_wrapper(AP: Scan, PA: Scan):
     bvec_file = AP.nifti.b_vector_file
     bval_file = AP.nifti.b_value_file
-    n_dwi_volumes = int(AP.nifti.get_data().shape[-1])
+    n_dwi_volumes = AP.nifti.n_volumes
     dwi_json_file = AP.nifti.json_file
     fmap_json_file = PA.nifti.json_file
     dwi_convert_inputs = {
@@ -0,0 +1,356 @@
+"""
+Streaming voxelwise statistics, used to summarize large cohorts of
+spatially normalized volumes (e.g. CAT12 segmentation outputs) one volume at
+a time.
+"""
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Hashable, Iterable, List, Sequence, Tuple
+
+import nibabel as nib
+import numpy as np
+from django.apps import apps
+
+#: Default number of histogram bins used for quantile estimation.
+DEFAULT_HISTOGRAM_BINS: int = 64
+
+#: Default number of volumes accumulated by a single worker task.
+DEFAULT_CHUNK_SIZE: int = 32
+
+#: Supported run grouping keys.
+GROUP_BY_STUDY_GROUP: str = "study_group"
+GROUP_BY_AGE: str = "age"
+
+
+def read_volume(path: Path) -> np.ndarray:
+    """
+    Reads a NIfTI volume as single precision, replacing NaNs with zeros.
+
+    Parameters
+    ----------
+    path : Path
+        NIfTI file path
+
+    Returns
+    -------
+    np.ndarray
+        Volume data
+    """
+    data = nib.load(str(path)).get_fdata(dtype=np.float32)
+    return np.nan_to_num(data, copy=False)
+
+
+class VoxelwiseStatistics:
+    """
+    Accumulates the voxelwise count, mean and variance (using Welford's
+    online algorithm), minimum and maximum of a stream of volumes. If a
+    *histogram_range* is provided, a fixed-range histogram is accumulated
+    per voxel as a quantile sketch (requiring *n_voxels* x *bins* counters).
+    Instances accumulated over separate chunks of volumes may be combined
+    with :meth:`merge`.
+    """
+
+    def __init__(
+        self,
+        histogram_range: Tuple[float, float] = None,
+        bins: int = DEFAULT_HISTOGRAM_BINS,
+    ):
+        """
+        Initializes a new :class:`VoxelwiseStatistics` instance.
+
+        Parameters
+        ----------
+        histogram_range : Tuple[float, float], optional
+            Value range of the quantile sketch, by default None (quantiles
+            are not estimated)
+        bins : int, optional
+            Number of quantile sketch bins, by default
+            :data:`DEFAULT_HISTOGRAM_BINS`
+        """
+        self.histogram_range = histogram_range
+        self.bins = bins
+        self.count = 0
+        self.shape = None
+        self._mean = self._m2 = None
+        self.minimum = self.maximum = None
+        self.histogram = None
+
+    def _initialize(self, shape: Tuple[int]) -> None:
+        self.shape = shape
+        self._mean = np.zeros(shape, dtype=np.float64)
+        self._m2 = np.zeros(shape, dtype=np.float64)
+        self.minimum = np.full(shape, np.inf, dtype=np.float32)
+        self.maximum = np.full(shape, -np.inf, dtype=np.float32)
+        if self.histogram_range is not None:
+            self.histogram = np.zeros(
+                (int(np.prod(shape)), self.bins), dtype=np.uint32
+            )
+
+    def _bin_indices(self, volume: np.ndarray) -> np.ndarray:
+        low, high = self.histogram_range
+        scaled = (volume.ravel() - low) * (self.bins / (high - low))
+        return np.clip(scaled, 0, self.bins - 1).astype(np.intp)
+
+    def update(self, volume: np.ndarray) -> None:
+        """
+        Adds a volume to the accumulated statistics.
+
+        Parameters
+        ----------
+        volume : np.ndarray
+            Volume data
+        """
+        if self.shape is None:
+            self._initialize(volume.shape)
+        elif volume.shape != self.shape:
+            raise ValueError(
+                f"Volume shape {volume.shape} does not match {self.shape}!"
+            )
+        self.count += 1
+        delta = volume - self._mean
+        self._mean += delta / self.count
+        self._m2 += delta * (volume - self._mean)
+        np.minimum(self.minimum, volume, out=self.minimum)
+        np.maximum(self.maximum, volume, out=self.maximum)
+        if self.histogram is not None:
+            voxels = np.arange(self.histogram.shape[0])
+            self.histogram[voxels, self._bin_indices(volume)] += 1
+
+    def update_from_paths(self, paths: Iterable[Path]) -> None:
+        """
+        Adds the provided NIfTI volumes, reading one volume at a time.
+
+        Parameters
+        ----------
+        paths : Iterable[Path]
+            NIfTI file paths
+        """
+        for path in paths:
+            self.update(read_volume(path))
+
+    def merge(self, other: "VoxelwiseStatistics") -> "VoxelwiseStatistics":
+        """
+        Combines another instance's statistics into this one (see Chan et
+        al.'s parallel variance algorithm).
+
+        Parameters
+        ----------
+        other : VoxelwiseStatistics
+            Statistics accumulated over other volumes
+
+        Returns
+        -------
+        VoxelwiseStatistics
+            This instance
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        count = self.count + other.count
+        delta = other._mean - self._mean
+        self._mean += delta * (other.count / count)
+        self._m2 += other._m2 + delta ** 2 * (self.count * other.count / count)
+        self.count = count
+        np.minimum(self.minimum, other.minimum, out=self.minimum)
+        np.maximum(self.maximum, other.maximum, out=self.maximum)
+        if self.histogram is not None and other.histogram is not None:
+            self.histogram += other.histogram
+        return self
+
+    def quantile(self, q: float) -> np.ndarray:
+        """
+        Estimates a voxelwise quantile from the histogram sketch, assuming
+        values are uniformly distributed within each bin.
+
+        Parameters
+        ----------
+        q : float
+            Quantile to estimate (between 0 and 1)
+
+        Returns
+        -------
+        np.ndarray
+            Estimated quantile
+        """
+        if self.histogram is None:
+            raise ValueError("Quantiles require a histogram range!")
+        low, high = self.histogram_range
+        width = (high - low) / self.bins
+        cumulative = np.cumsum(self.histogram, axis=1, dtype=np.float64)
+        target = q * self.count
+        bin_index = (cumulative < target).sum(axis=1)
+        bin_index = np.minimum(bin_index, self.bins - 1)
+        voxels = np.arange(cumulative.shape[0])
+        in_bin = self.histogram[voxels, bin_index]
+        below = cumulative[voxels, bin_index] - in_bin
+        with np.errstate(divide="ignore", invalid="ignore"):
+            fraction = np.where(in_bin > 0, (target - below) / in_bin, 0)
+        estimate = low + (bin_index + np.clip(fraction, 0, 1)) * width
+        return estimate.reshape(self.shape)
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self._mean
+
+    @property
+    def variance(self) -> np.ndarray:
+        if self.count < 2:
+            return np.full(self.shape, np.nan)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.variance)
+
+
+def _accumulate(
+    paths: List[str], histogram_range: Tuple[float, float], bins: int
+) -> VoxelwiseStatistics:
+    statistics = VoxelwiseStatistics(
+        histogram_range=histogram_range, bins=bins
+    )
+    statistics.update_from_paths(paths)
+    return statistics
+
+
+def get_run_groups(
+    runs: Sequence, group_by: str = None, age_bins: Sequence[float] = None
+) -> Dict[Hashable, List]:
+    """
+    Groups runs by their input scan's study groups (scans in multiple groups
+    are included in each) or by the subject's age at the time of the scan.
+    All scan information is queried at once.
+
+    Parameters
+    ----------
+    runs : Sequence[Run]
+        Runs to group
+    group_by : str, optional
+        Grouping key ("study_group" or "age"), by default None (a single
+        group)
+    age_bins : Sequence[float], optional
+        Age bin edges in years, required to group by age
+
+    Returns
+    -------
+    Dict[Hashable, List]
+        Runs by group (study group ID or age bin index)
+
+    Raises
+    ------
+    ValueError
+        If the grouping key is invalid, or if grouping by age without age
+        bins
+    """
+    if group_by is None:
+        return {None: list(runs)}
+    if group_by == GROUP_BY_AGE and not age_bins:
+        raise ValueError("Grouping by age requires age bins!")
+    Scan = apps.get_model("django_mri", "Scan")
+    groups = defaultdict(list)
+    if group_by == GROUP_BY_STUDY_GROUP:
+        scans = Scan.objects.values_by_run(runs)
+        memberships = Scan.objects.filter(
+            id__in=[scan["id"] for scan in scans.values()],
+            study_groups__isnull=False,
+        ).values_list("id", "study_groups")
+        scan_groups = defaultdict(list)
+        for scan_id, group_id in memberships:
+            scan_groups[scan_id].append(group_id)
+        for run in runs:
+            scan = scans.get(run.id)
+            for group_id in scan_groups.get(scan and scan["id"], []):
+                groups[group_id].append(run)
+    elif group_by == GROUP_BY_AGE:
+        scans = Scan.objects.values_by_run(
+            runs, "time", "session__subject__date_of_birth"
+        )
+        for run in runs:
+            scan = scans.get(run.id)
+            born = scan and scan["session__subject__date_of_birth"]
+            if not born or not scan["time"]:
+                continue
+            delta = scan["time"].date() - born
+            age = delta.total_seconds() / (60 * 60 * 24 * 365)
+            groups[int(np.digitize(age, age_bins))].append(run)
+    else:
+        raise ValueError(f"Invalid grouping key: {group_by}!")
+    return dict(groups)
+
+
+def compute_voxelwise_statistics(
+    runs: Sequence,
+    output_key: str,
+    group_by: str = None,
+    age_bins: Sequence[float] = None,
+    histogram_range: Tuple[float, float] = None,
+    bins: int = DEFAULT_HISTOGRAM_BINS,
+    workers: int = 1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Dict[Hashable, VoxelwiseStatistics]:
+    """
+    Computes streaming voxelwise statistics of the runs' *output_key* output,
+    optionally grouped (see :func:`get_run_groups`). Volumes are read one at
+    a time, and if *workers* is greater than 1, chunks of volumes are
+    accumulated in parallel and merged.
+
+    Parameters
+    ----------
+    runs : Sequence[Run]
+        Runs to summarize
+    output_key : str
+        Summarized output key
+    group_by : str, optional
+        Grouping key ("study_group" or "age"), by default None
+    age_bins : Sequence[float], optional
+        Age bin edges in years, required to group by age
+    histogram_range : Tuple[float, float], optional
+        Value range of the quantile sketch, by default None
+    bins : int, optional
+        Number of quantile sketch bins, by default
+        :data:`DEFAULT_HISTOGRAM_BINS`
+    workers : int, optional
+        Number of worker processes, by default 1
+    chunk_size : int, optional
+        Number of volumes per worker task, by default
+        :data:`DEFAULT_CHUNK_SIZE`
+
+    Returns
+    -------
+    Dict[Hashable, VoxelwiseStatistics]
+        Statistics by group (None if not grouped)
+    """
+    groups = get_run_groups(runs, group_by=group_by, age_bins=age_bins)
+    paths = {
+        group: [str(run.get_output(output_key)) for run in group_runs]
+        for group, group_runs in groups.items()
+    }
+    if workers <= 1:
+        return {
+            group: _accumulate(group_paths, histogram_range, bins)
+            for group, group_paths in paths.items()
+        }
+    results = {
+        group: VoxelwiseStatistics(histogram_range=histogram_range, bins=bins)
+        for group in paths
+    }
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            (
+                group,
+                executor.submit(
+                    _accumulate,
+                    group_paths[start : start + chunk_size],
+                    histogram_range,
+                    bins,
+                ),
+            )
+            for group, group_paths in paths.items()
+            for start in range(0, len(group_paths), chunk_size)
+        ]
+        for group, future in futures:
+            results[group].merge(future.result())
+    return results
@@ -1,10 +1,10 @@
 from typing import Iterable
 
 import nibabel as nib
-import numpy as np
 from nilearn.plotting import view_img
 
 from django_analyses.models.run import Run
+from django_mri.analysis.utils.voxelwise import compute_voxelwise_statistics
 from django_mri.analysis.visualizers.segmentation import SegmentationVisualizer
 
 
@@ -16,14 +16,14 @@ class CatSegmentationVisualizer(SegmentationVisualizer):
 
 
 def plot_mean_results(
-    runs: Iterable[Run], output_key: str = "modulated_grey_matter"
+    runs: Iterable[Run],
+    output_key: str = "modulated_grey_matter",
+    workers: int = 1,
 ):
-    results = [
-        np.nan_to_num(nib.load(run.get_output(output_key)).get_fdata())
-        for run in runs
-    ]
-    stacked = np.stack(results, axis=0)
-    mean_modulated_gm_data = np.mean(stacked, axis=0)
-    affine = nib.load(runs[0].get_output(output_key)).affine
-    mean_image = nib.Nifti1Image(mean_modulated_gm_data, affine=affine)
+    runs = list(runs)
+    statistics = compute_voxelwise_statistics(
+        runs, output_key, workers=workers
+    )[None]
+    affine = nib.load(str(runs[0].get_output(output_key))).affine
+    mean_image = nib.Nifti1Image(statistics.mean, affine=affine)
     return view_img(mean_image)
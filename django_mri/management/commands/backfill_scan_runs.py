@@ -0,0 +1,34 @@
+"""
+Definition of the :class:`Command` class, used to create any missing
+:class:`~django_mri.models.scan_run.ScanRun` links.
+"""
+from django.core.management.base import BaseCommand
+from django_mri.models.scan import Scan
+from django_mri.models.scan_run import ScanRun
+
+
+class Command(BaseCommand):
+    help = "Links existing runs to the scans included in their inputs."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scan_ids",
+            nargs="*",
+            type=int,
+            help="Scans to link (by default all scans).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of links to create per query.",
+        )
+
+    def handle(self, *args, **options):
+        scans = Scan.objects.all()
+        if options["scan_ids"]:
+            scans = scans.filter(id__in=options["scan_ids"])
+        n_created = ScanRun.objects.backfill(
+            scans, batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"Created {n_created} scan-run links.")
@@ -0,0 +1,86 @@
+from django.db import migrations, models
+
+from django_mri.utils.bids_entities import parse_bids_entities
+
+BATCH_SIZE = 1000
+
+
+def populate_bids_entities(apps, schema_editor):
+    NIfTI = apps.get_model("django_mri", "NIfTI")
+    instances = []
+    fields = None
+    for nifti in NIfTI.objects.only("id", "path").iterator():
+        entities = parse_bids_entities(nifti.path)
+        for field, value in entities.items():
+            setattr(nifti, field, value)
+        fields = list(entities)
+        instances.append(nifti)
+        if len(instances) == BATCH_SIZE:
+            NIfTI.objects.bulk_update(instances, fields)
+            instances = []
+    if instances:
+        NIfTI.objects.bulk_update(instances, fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_mri', '0023_auto_20220313_1457'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nifti',
+            name='stem',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='nifti',
+            name='bids_subject',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='nifti',
+            name='bids_session',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='nifti',
+            name='bids_datatype',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='nifti',
+            name='bids_suffix',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='nifti',
+            name='bids_task',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='nifti',
+            name='bids_acquisition',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='nifti',
+            name='bids_direction',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='nifti',
+            name='bids_run',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='nifti',
+            index=models.Index(fields=['stem'], name='nifti_stem_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='nifti',
+            index=models.Index(fields=['bids_subject', 'bids_session', 'bids_datatype', 'bids_suffix'], name='nifti_bids_entities_idx'),
+        ),
+        migrations.RunPython(populate_bids_entities, migrations.RunPython.noop),
+    ]
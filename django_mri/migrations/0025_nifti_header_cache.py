@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_mri', '0024_nifti_bids_entities'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='nifti',
+            name='header_cache',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_mri', '0025_nifti_header_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='datadirectory',
+            name='subdirectory_fingerprints',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('django_analyses', '0014_auto_20220130_1027'),
+        ('django_mri', '0026_datadirectory_subdirectory_fingerprints'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScanRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('run', models.ForeignKey(help_text='The run in which the scan was included in the inputs.', on_delete=django.db.models.deletion.CASCADE, related_name='scan_links', to='django_analyses.run')),
+                ('scan', models.ForeignKey(help_text="The scan included in the run's inputs.", on_delete=django.db.models.deletion.CASCADE, related_name='run_links', to='django_mri.scan')),
+            ],
+            options={
+                'unique_together': {('scan', 'run')},
+            },
+        ),
+    ]
@@ -22,6 +22,7 @@ from django_mri.models.outputs.nifti_output_definition import (
 )
 from django_mri.models.region import Region
 from django_mri.models.scan import Scan
+from django_mri.models.scan_run import ScanRun
 from django_mri.models.score import Score
 from django_mri.models.session import Session
 
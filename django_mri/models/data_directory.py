@@ -1,7 +1,10 @@
 """
 Definition of the :class:`DataDirectory` model.
 """
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, List
 
 from django.db import models
 from django.urls import reverse
@@ -10,6 +13,42 @@ from django_extensions.db.models import TimeStampedModel, TitleDescriptionModel
 from django_mri.models.scan import Scan
 from django_mri.utils.utils import get_data_share_root
 
+#: Default number of concurrent directory walks.
+DEFAULT_WALK_WORKERS: int = 8
+
+
+def fingerprint_directory(path: str) -> List[int]:
+    """
+    Walks a directory tree and returns its fingerprint: the latest
+    modification time (in nanoseconds), the number of files, and their total
+    size.
+
+    Parameters
+    ----------
+    path : str
+        Directory path
+
+    Returns
+    -------
+    List[int]
+        Directory fingerprint
+    """
+    latest_mtime = os.stat(path).st_mtime_ns
+    n_files = total_size = 0
+    directories = [path]
+    while directories:
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                    latest_mtime = max(latest_mtime, entry.stat().st_mtime_ns)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    latest_mtime = max(latest_mtime, stat.st_mtime_ns)
+                    n_files += 1
+                    total_size += stat.st_size
+    return [latest_mtime, n_files, total_size]
+
 
 class DataDirectory(TitleDescriptionModel, TimeStampedModel):
     """
@@ -22,6 +61,10 @@ class DataDirectory(TitleDescriptionModel, TimeStampedModel):
     )
     known_subdirectories = models.JSONField(default=list, blank=True)
 
+    #: Fingerprints (latest modification time, number of files, and total
+    #: size) of imported subdirectories, used to detect changed trees.
+    subdirectory_fingerprints = models.JSONField(default=dict, blank=True)
+
     class Meta:
         verbose_name_plural = "Data Directories"
 
@@ -56,7 +99,9 @@ class DataDirectory(TitleDescriptionModel, TimeStampedModel):
         self, progressbar: bool = False, report: bool = False
     ) -> list:
         """
-        Imports any new subdirectories under the root data directory path.
+        Imports any new subdirectories under the root data directory path,
+        recording their fingerprints (see :func:`fingerprint_directory`) for
+        later incremental imports.
 
         Parameters
         ----------
@@ -75,24 +120,114 @@ class DataDirectory(TitleDescriptionModel, TimeStampedModel):
         new_subdirectories = []
         for path in root.iterdir():
             if path.is_dir() and path.name not in self.known_subdirectories:
+                fingerprint = fingerprint_directory(str(path))
                 Scan.objects.import_path(
                     path, progressbar=progressbar, report=report
                 )
                 self.known_subdirectories.append(path.name)
+                self.subdirectory_fingerprints[path.name] = fingerprint
                 new_subdirectories.append(path.name)
         return new_subdirectories
 
+    def get_subdirectory_fingerprints(
+        self, max_workers: int = DEFAULT_WALK_WORKERS
+    ) -> Dict[str, List[int]]:
+        """
+        Returns the current fingerprints of the subdirectories under the root
+        data directory path. Directory trees are walked concurrently.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            Number of concurrent directory walks, by default
+            DEFAULT_WALK_WORKERS
+
+        Returns
+        -------
+        Dict[str, List[int]]
+            Fingerprints by subdirectory name
+        """
+        with os.scandir(self.path) as entries:
+            paths = [entry.path for entry in entries if entry.is_dir()]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            fingerprints = executor.map(fingerprint_directory, paths)
+            return {
+                Path(path).name: fingerprint
+                for path, fingerprint in zip(paths, fingerprints)
+            }
+
+    def import_changed_subdirectories(
+        self,
+        progressbar: bool = False,
+        report: bool = False,
+        max_workers: int = DEFAULT_WALK_WORKERS,
+    ) -> list:
+        """
+        Imports any new subdirectories under the root data directory path, as
+        well as any subdirectories that changed since they were last
+        imported.
+
+        Parameters
+        ----------
+        progressbar : bool
+            Whether to display a progressbar or not, default is False
+        report : bool
+            Whether to display a sumamry report or not, default is False
+        max_workers : int, optional
+            Number of concurrent directory walks, by default
+            DEFAULT_WALK_WORKERS
+
+        Returns
+        -------
+        list
+            Imported subdirectory names
+        """
+        root = Path(self.path)
+        fingerprints = self.get_subdirectory_fingerprints(
+            max_workers=max_workers
+        )
+        imported_subdirectories = []
+        for name, fingerprint in sorted(fingerprints.items()):
+            previous = self.subdirectory_fingerprints.get(name)
+            if previous == fingerprint:
+                continue
+            # Subdirectories imported before fingerprints were recorded are
+            # assumed to be up to date.
+            if previous is None and name in self.known_subdirectories:
+                self.subdirectory_fingerprints[name] = fingerprint
+                continue
+            Scan.objects.import_path(
+                root / name, progressbar=progressbar, report=report
+            )
+            self.subdirectory_fingerprints[name] = fingerprint
+            if name not in self.known_subdirectories:
+                self.known_subdirectories.append(name)
+            imported_subdirectories.append(name)
+        return imported_subdirectories
+
     def remove_old_subdirectories(self) -> None:
         """
         Removes any old subdirectories under the root data directory path.
         """
 
         root = Path(self.path)
-        for name in self.known_subdirectories:
-            if not (root / name).is_dir():
-                self.known_subdirectories.pop(name)
+        self.known_subdirectories = [
+            name
+            for name in self.known_subdirectories
+            if (root / name).is_dir()
+        ]
+        self.subdirectory_fingerprints = {
+            name: fingerprint
+            for name, fingerprint in self.subdirectory_fingerprints.items()
+            if (root / name).is_dir()
+        }
 
-    def sync(self, progressbar: bool = False, report: bool = False) -> list:
+    def sync(
+        self,
+        progressbar: bool = False,
+        report: bool = False,
+        incremental: bool = False,
+    ) -> list:
         """
         Imports new subdirectories and removes old subdirectories from the root
         data directory.
@@ -103,14 +238,22 @@ class DataDirectory(TitleDescriptionModel, TimeStampedModel):
             Whether to display a progressbar or not, default is False
         report : bool
             Whether to display a sumamry report or not, default is False
+        incremental : bool
+            Whether to also re-import subdirectories that changed since they
+            were last imported (see :meth:`import_changed_subdirectories`),
+            default is False
 
         Returns
         -------
         list
             Imported subdirectory names
         """
-
-        new_subdirectories = self.import_new_subdirectories(
+        import_method = (
+            self.import_changed_subdirectories
+            if incremental
+            else self.import_new_subdirectories
+        )
+        new_subdirectories = import_method(
             progressbar=progressbar, report=report
         )
         self.remove_old_subdirectories()
@@ -36,6 +36,9 @@ SCORE_METRIC: str = "The metric represented by this score."
 SCORE_VALUE: str = "Calculated score value."
 SCORE_RUN: str = "The run from which this score was exrtacted."
 
+SCAN_RUN_SCAN: str = "The scan included in the run's inputs."
+SCAN_RUN_RUN: str = "The run in which the scan was included in the inputs."
+
 METRIC_TITLE: str = "A title for this metric."
 METRIC_DESCRIPTION: str = "A description of this metric's meaning and significance."
 
@@ -0,0 +1,34 @@
+"""
+Definition of the :class:`NIfTIQuerySet` class.
+"""
+from django.db.models import QuerySet
+from django_mri.utils.bids_entities import BIDS_ENTITY_FIELDS
+
+#: Map of BIDS entity keys (including datatype and suffix) to
+#: :class:`~django_mri.models.nifti.NIfTI` fields.
+ENTITY_LOOKUPS = {
+    **BIDS_ENTITY_FIELDS,
+    "datatype": "bids_datatype",
+    "suffix": "bids_suffix",
+}
+
+
+class NIfTIQuerySet(QuerySet):
+    """
+    Custom manager for the :class:`~django_mri.models.nifti.NIfTI` model.
+    """
+
+    def filter_by_bids_entities(self, **entities) -> QuerySet:
+        """
+        Filters the queryset by BIDS entities, e.g.
+        :code:`filter_by_bids_entities(sub="1", datatype="anat", run=2)`.
+
+        Returns
+        -------
+        QuerySet
+            NIfTI instances matching the provided entities
+        """
+        lookups = {
+            ENTITY_LOOKUPS[key]: value for key, value in entities.items()
+        }
+        return self.filter(**lookups)
@@ -2,18 +2,98 @@
 Definition of the :class:`ScanQuerySet` class.
 """
 import logging
+import threading
 import warnings
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from itertools import chain
 from pathlib import Path
-from typing import Iterable, List, Union
+from typing import Dict, Iterable, List, Tuple, Union
 
-from django.db.models import Model, QuerySet
+from django.apps import apps
+from django.db.models import F, Model, Q, QuerySet
+from django_analyses.models.run import Run
 from django_dicom.models.image import Image as DicomImage
+from django_mri.analysis.interfaces.dcm2niix import Dcm2niix
 from django_mri.models.managers import logs
 from django_mri.utils.scan_type import ScanType
+from django_mri.utils.utils import get_bids_manager, get_mri_root
 from tqdm import tqdm
 
 
+class SeriesDirectoryIndex:
+    """
+    Maps DICOM series directories to series IDs, so that input values may be
+    matched to scans by exact directory. The index is built on first use and
+    then extended incrementally with series created since it was last updated
+    (including re-imported series, which replace stale entries), rather than
+    scanning the DICOM image table for each lookup.
+    """
+
+    def __init__(self):
+        self.directories: Dict[str, int] = {}
+        self.max_series_id: int = 0
+        #: Scanned series without images at the time of the last update.
+        self.pending: set = set()
+        self._lock = threading.Lock()
+
+    def update(self) -> None:
+        """
+        Adds series created since the last update to the index.
+        """
+        Scan = apps.get_model("django_mri", "Scan")
+        scans = Scan.objects.filter(
+            Q(dicom_id__gt=self.max_series_id) | Q(dicom_id__in=self.pending)
+        )
+        series_ids = set(
+            scans.filter(dicom__isnull=False).values_list(
+                "dicom_id", flat=True
+            )
+        )
+        if not series_ids:
+            return
+        paths = scans.get_dicom_paths()
+        for series_id in series_ids:
+            path = paths.get(series_id)
+            if path is None:
+                self.pending.add(series_id)
+            else:
+                self.directories[path] = series_id
+                self.pending.discard(series_id)
+        self.max_series_id = max(self.max_series_id, *series_ids)
+
+    def lookup(self, directories: Iterable[str]) -> List[int]:
+        """
+        Returns the IDs of the series stored in the provided directories.
+
+        Parameters
+        ----------
+        directories : Iterable[str]
+            DICOM series directories
+
+        Returns
+        -------
+        List[int]
+            Series IDs
+        """
+        directories = [str(Path(directory)) for directory in directories]
+        with self._lock:
+            self.update()
+            return [
+                self.directories[directory]
+                for directory in directories
+                if directory in self.directories
+            ]
+
+
+#: Process-wide DICOM series directory index.
+series_directory_index = SeriesDirectoryIndex()
+
+#: Number of representations matched against list inputs per query in
+#: :meth:`ScanQuerySet.match_inputs`.
+LIST_INPUT_BATCH_SIZE: int = 1000
+
+
 class ScanQuerySet(QuerySet):
     """
     Custom manager for the :class:`~django_mri.models.scan.Scan` class.
@@ -143,11 +223,187 @@ class ScanQuerySet(QuerySet):
 
     def sync_bids(
         self, progressbar: bool = True, log_level: int = logging.DEBUG
-    ):
-        queryset = self.order_by("number")
-        iterator = tqdm(queryset) if progressbar else queryset
-        for scan in iterator:
-            scan.sync_bids(log_level=log_level)
+    ) -> int:
+        """
+        Moves the NIfTI files associated with the scans in this queryset (and
+        any other runs of the same acquisitions) to their BIDS-compatible
+        paths.
+
+        Parameters
+        ----------
+        progressbar : bool, optional
+            Whether to display a progressbar, by default True
+        log_level : int, optional
+            Logging level, by default logging.DEBUG
+
+        Returns
+        -------
+        int
+            Number of moved NIfTI instances
+        """
+        bids_manager = get_bids_manager()
+        plan = bids_manager.plan_bids_paths(self, log_level=log_level)
+        return bids_manager.apply_bids_plan(
+            plan, progressbar=progressbar, log_level=log_level
+        )
+
+    def plan_nifti_conversion_waves(self) -> List[List[Model]]:
+        """
+        Splits the queryset into "waves" of scans that may be converted to
+        NIfTI concurrently. Scans that share a session and a naive BIDS path
+        compete for the same run labels, and are therefore placed in
+        consecutive waves by scan number.
+
+        Returns
+        -------
+        List[List[Model]]
+            Scans to convert concurrently, in order of execution
+        """
+        queryset = self.select_related("dicom", "session").order_by("number")
+        waves = []
+        label_counts = defaultdict(int)
+        for scan in queryset:
+            if scan.sequence_type == "localizer":
+                continue
+            try:
+                naive_path = scan.dicom.sample_header.build_bids_path()
+            except AttributeError:
+                naive_path = None
+            if naive_path is None:
+                wave_index = 0
+            else:
+                key = scan.session_id, naive_path
+                wave_index = label_counts[key]
+                label_counts[key] += 1
+            if wave_index == len(waves):
+                waves.append([])
+            waves[wave_index].append(scan)
+        return waves
+
+    def _convert_wave_to_nifti(
+        self,
+        wave: List[Model],
+        executor: ThreadPoolExecutor,
+        persistent: bool = True,
+        progressbar=None,
+    ) -> int:
+        """
+        Converts a single wave of scans (see
+        :meth:`plan_nifti_conversion_waves`) using the provided *executor*.
+        Destination allocation and NIfTI registration (including BIDS
+        postprocessing) run serially in the calling thread, only the
+        *dcm2niix* subprocesses run concurrently.
+
+        Parameters
+        ----------
+        wave : List[Model]
+            Scans to convert
+        executor : ThreadPoolExecutor
+            Executor running *dcm2niix* subprocesses
+        persistent : bool, optional
+            Whether to warn rather than raise on conversion failures, by
+            default True
+        progressbar : tqdm, optional
+            Progressbar to update, by default None
+
+        Returns
+        -------
+        int
+            Number of converted scans
+        """
+        # Runs of the wave's acquisitions are planned once for the wave.
+        plan = get_bids_manager().plan_bids_paths(wave)
+        futures = {}
+        for scan in wave:
+            destination, bids = scan.get_nifti_destination(plan=plan)
+            future = executor.submit(
+                Dcm2niix().convert, scan.dicom.path, destination
+            )
+            futures[future] = scan, bids
+        failures = []
+        n_converted = 0
+        for future in as_completed(futures):
+            scan, bids = futures[future]
+            try:
+                nifti_path = future.result()
+            except RuntimeError as e:
+                failures.append(e)
+            else:
+                scan.register_nifti(nifti_path, bids=bids)
+                n_converted += 1
+            if progressbar is not None:
+                progressbar.update()
+        for failure in failures:
+            if not persistent:
+                raise failure
+            warnings.warn(str(failure))
+        return n_converted
+
+    def _convert_to_nifti_concurrently(
+        self,
+        workers: int,
+        persistent: bool = True,
+        progressbar: bool = False,
+        progressbar_position: int = 0,
+        desc: str = "Scans",
+    ) -> int:
+        """
+        Converts the queryset to NIfTI running up to *workers* *dcm2niix*
+        subprocesses at a time.
+
+        Parameters
+        ----------
+        workers : int
+            Maximal number of concurrent conversions
+        persistent : bool, optional
+            Whether to warn rather than raise on conversion failures, by
+            default True
+        progressbar : bool, optional
+            Whether to display a progressbar, by default False
+        progressbar_position : int, optional
+            Progressbar position, by default 0
+        desc : str, optional
+            Progressbar description, by default "Scans"
+
+        Returns
+        -------
+        int
+            Number of converted scans
+        """
+        waves = self.plan_nifti_conversion_waves()
+        if not waves:
+            return 0
+        waves_log = logs.SCAN_SET_NIFTI_CONVERSION_WAVES.format(
+            count=sum(len(wave) for wave in waves),
+            n_waves=len(waves),
+            workers=workers,
+        )
+        self._logger.debug(waves_log)
+        bar = (
+            tqdm(
+                total=sum(len(wave) for wave in waves),
+                unit="scan",
+                desc=desc,
+                position=progressbar_position,
+                leave=not progressbar_position,
+            )
+            if progressbar
+            else None
+        )
+        n_converted = 0
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for wave in waves:
+                    n_converted += self._convert_wave_to_nifti(
+                        wave,
+                        executor,
+                        persistent=persistent,
+                        progressbar=bar,
+                    )
+        finally:
+            if bar is not None:
+                bar.close()
+        return n_converted
 
     def convert_to_nifti(
         self,
@@ -155,7 +411,27 @@ class ScanQuerySet(QuerySet):
         persistent: bool = True,
         progressbar: bool = False,
         progressbar_position: int = 0,
+        workers: int = 1,
     ):
+        """
+        Converts the scans in the queryset from DICOM to NIfTI.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Whether to delete and recreate existing NIfTI instances, by
+            default False
+        persistent : bool, optional
+            Whether to warn rather than raise on conversion failures, by
+            default True
+        progressbar : bool, optional
+            Whether to display a progressbar, by default False
+        progressbar_position : int, optional
+            Progressbar position, by default 0
+        workers : int, optional
+            Maximal number of *dcm2niix* subprocesses to run concurrently, by
+            default 1 (sequential conversion)
+        """
         # Log start.
         start_log = logs.SCAN_SET_NIFTI_CONVERSION_START.format(
             count=self.count()
@@ -168,60 +444,301 @@ class ScanQuerySet(QuerySet):
             )
         # Run by scan order and create progressbar if required.
         queryset = self.filter(_nifti__isnull=True).order_by("number")
-        # Query fieldmaps to convert only after their "IntendedFor" targets
-        # have been converted (required for correct BIDS postprocessing).
-        fieldmaps = queryset.filter(
-            dicom__sequence_type__contains="func_fieldmap"
-        )
-        non_fieldmaps = queryset.exclude(
-            dicom__sequence_type__contains="func_fieldmap"
-        )
-        if fieldmaps.exists():
-            # Log fieldmaps detected and will be converted in the end.
-            fieldmaps_log = logs.SCAN_SET_NIFTI_CONVERSION_FIELDMAPS.format(
-                n_fieldmaps=fieldmaps.count(), n_total=non_fieldmaps.count()
-            )
-            self._logger.debug(fieldmaps_log)
-        non_fieldmaps_iterator = (
-            tqdm(
-                non_fieldmaps,
-                unit="scan",
-                desc="Scans",
-                position=progressbar_position,
-                leave=not progressbar_position,
-            )
-            if progressbar
-            else non_fieldmaps
-        )
-        with warnings.catch_warnings():
+        # Fieldmap "IntendedFor" fields and participants.tsv are updated
+        # once the whole queryset is converted.
+        bids_manager = get_bids_manager()
+        with bids_manager.defer_updates(), warnings.catch_warnings():
             warnings.filterwarnings("ignore", category=UserWarning)
-            # Convert non-fieldmap scans.
-            for scan in non_fieldmaps_iterator:
-                scan.dicom_to_nifti(persistent=persistent)
-            # Convert fieldmaps.
-            if fieldmaps.exists():
-                fieldmap_iterator = (
+            if workers > 1:
+                queryset._convert_to_nifti_concurrently(
+                    workers,
+                    persistent=persistent,
+                    progressbar=progressbar,
+                    progressbar_position=progressbar_position,
+                )
+            else:
+                iterator = (
                     tqdm(
-                        fieldmaps,
+                        queryset,
                         unit="scan",
-                        desc="Fieldmaps",
+                        desc="Scans",
                         position=progressbar_position,
                         leave=not progressbar_position,
                     )
                     if progressbar
-                    else fieldmaps
+                    else queryset
                 )
-                for fieldmap in fieldmap_iterator:
-                    fieldmap.dicom_to_nifti(persistent=persistent)
+                for scan in iterator:
+                    scan.dicom_to_nifti(persistent=persistent)
         # Log conversion succcess.
         success_log = logs.SCAN_SET_NIFTI_CONVERSION_SUCCESS.format(
             count=queryset.count()
         )
         self._logger.debug(success_log)
 
+    def values_by_run(
+        self, runs: Iterable[Run], *fields: str, input_key: str = "path"
+    ) -> Dict[int, dict]:
+        """
+        Returns the values of the scans used as the inputs of the provided
+        runs in a single query. Scans are resolved using their
+        :class:`~django_mri.models.scan_run.ScanRun` links, falling back to
+        matching the runs' *input_key* input value with NIfTI paths.
+
+        Parameters
+        ----------
+        runs : Iterable[Run]
+            Runs to resolve the scans of
+        *fields : str
+            Scan fields to return
+        input_key : str, optional
+            Input key of unlinked runs' NIfTI path, by default "path"
+
+        Returns
+        -------
+        Dict[int, dict]
+            Scan values by run ID (runs without a scan are omitted)
+        """
+        runs = list(runs)
+        ScanRun = apps.get_model("django_mri", "ScanRun")
+        links = dict(
+            ScanRun.objects.filter(run__in=runs).values_list(
+                "run_id", "scan_id"
+            )
+        )
+        paths = {
+            run.id: str(run.get_input(input_key))
+            for run in runs
+            if run.id not in links
+        }
+        scans = self.filter(
+            Q(id__in=list(links.values()))
+            | Q(_nifti__path__in=list(paths.values()))
+        ).values("id", "_nifti__path", *fields)
+        by_id = {scan["id"]: scan for scan in scans}
+        by_path = {scan["_nifti__path"]: scan for scan in by_id.values()}
+        values = {}
+        for run in runs:
+            if run.id in links:
+                scan = by_id.get(links[run.id])
+            else:
+                scan = by_path.get(paths[run.id])
+            if scan is not None:
+                values[run.id] = scan
+        return values
+
+    def with_sequence_type(self) -> QuerySet:
+        """
+        Annotates the scans' DICOM sequence type, so that
+        :attr:`~django_mri.models.scan.Scan.sequence_type` does not query the
+        associated series.
+
+        Returns
+        -------
+        QuerySet
+            Annotated scans
+        """
+        return self.annotate(
+            annotated_sequence_type=F("dicom__sequence_type")
+        )
+
     def filter_by_collaborators(
         self, collaborators: Union[Model, List[Model]]
     ) -> QuerySet:
         return self.filter(
             study_groups__study__collaborators=collaborators
         ).distinct()
+
+    def get_dicom_paths(self) -> Dict[int, str]:
+        """
+        Returns the DICOM directory paths of the scans in the queryset in a
+        single query (rather than a sample image query per series).
+
+        Returns
+        -------
+        Dict[int, str]
+            DICOM series directory by series ID
+        """
+        dicom_ids = self.filter(dicom__isnull=False).values("dicom_id")
+        images = (
+            DicomImage.objects.filter(series_id__in=dicom_ids)
+            .order_by("series_id", "id")
+            .distinct("series_id")
+            .values_list("series_id", "dcm")
+        )
+        storage = DicomImage._meta.get_field("dcm").storage
+        return {
+            series_id: str(Path(storage.path(name)).parent)
+            for series_id, name in images
+        }
+
+    def get_representation_map(self) -> Dict[str, int]:
+        """
+        Returns a mapping of the input value representations of the scans in
+        the queryset (see
+        :attr:`~django_mri.models.scan.Scan.REPRESENTATIONS`) to their IDs.
+        Representations are computed without accessing the file system.
+
+        Returns
+        -------
+        Dict[str, int]
+            Scan ID by representation
+        """
+        dicom_paths = self.get_dicom_paths()
+        representations = {}
+        for scan_id, dicom_id, nifti_path in self.values_list(
+            "id", "dicom_id", "_nifti__path"
+        ):
+            dicom_path = dicom_paths.get(dicom_id)
+            mif_path = self.model(id=scan_id).get_default_mif_path()
+            for value in (dicom_path, nifti_path, mif_path):
+                if value is not None:
+                    representations[str(value)] = scan_id
+        return representations
+
+    def match_inputs(self) -> List[Tuple[int, int, int]]:
+        """
+        Returns the inputs in which the scans in the queryset are represented
+        using a single query per input type, except for list inputs, which
+        are matched by any of their elements in batches of
+        :data:`LIST_INPUT_BATCH_SIZE` representations.
+
+        Returns
+        -------
+        List[Tuple[int, int, int]]
+            Scan ID, input ID, and run ID of each match
+        """
+        representations = self.get_representation_map()
+        if not representations:
+            return []
+        values = list(representations)
+        matches = []
+        for InputClass, filter_key in self.model.DERIVATIVE_QUERY.items():
+            if filter_key.endswith("__contains"):
+                # Match list elements with a single "?|" clause per batch.
+                field_name = filter_key[: -len("__contains")]
+                lookup = f"{field_name}__has_any_keys"
+                queries = [
+                    Q(**{lookup: values[i : i + LIST_INPUT_BATCH_SIZE]})
+                    for i in range(0, len(values), LIST_INPUT_BATCH_SIZE)
+                ]
+            else:
+                queries = [Q(**{f"{filter_key}__in": values})]
+            # Inputs matching several batches are only matched once.
+            inputs = {
+                input_id: (value, run_id)
+                for query in queries
+                for input_id, value, run_id in InputClass.objects.filter(
+                    query
+                ).values_list("id", "value", "run_id")
+            }
+            for input_id, (value, run_id) in inputs.items():
+                items = value if isinstance(value, list) else [value]
+                scan_ids = {
+                    representations[str(item)]
+                    for item in items
+                    if str(item) in representations
+                }
+                matches += [
+                    (scan_id, input_id, run_id) for scan_id in scan_ids
+                ]
+        return matches
+
+    def inputs_by_scan(self) -> Dict[int, List[int]]:
+        """
+        Returns the IDs of the inputs in which each scan is represented.
+
+        Returns
+        -------
+        Dict[int, List[int]]
+            Input IDs by scan ID
+        """
+        inputs = defaultdict(list)
+        for scan_id, input_id, _ in self.match_inputs():
+            inputs[scan_id].append(input_id)
+        return dict(inputs)
+
+    def from_representations(self, values: Iterable[str]) -> QuerySet:
+        """
+        Returns the scans represented by any of the provided input values
+        (see :attr:`~django_mri.models.scan.Scan.REPRESENTATIONS`). DICOM
+        values are matched by exact series directory (see
+        :class:`SeriesDirectoryIndex`), so directories containing several
+        series (e.g. a subject's or a study's) are not matched.
+
+        Parameters
+        ----------
+        values : Iterable[str]
+            Input values
+
+        Returns
+        -------
+        QuerySet
+            Represented scans
+        """
+        values = {str(value) for value in values}
+        mif_dir = get_mri_root() / "mif"
+        storage = DicomImage._meta.get_field("dcm").storage
+        dicom_root = Path(storage.location)
+        query = Q(_nifti__path__in=values)
+        mif_ids, dicom_directories = [], []
+        for value in values:
+            path = Path(value)
+            if path.parent == mif_dir and path.suffix == ".mif":
+                if path.stem.isdigit():
+                    mif_ids.append(int(path.stem))
+            elif dicom_root in path.parents:
+                dicom_directories.append(value)
+        if mif_ids:
+            query |= Q(id__in=mif_ids)
+        if dicom_directories:
+            series_ids = series_directory_index.lookup(dicom_directories)
+            query |= Q(dicom_id__in=series_ids)
+        return self.filter(query)
+
+    def runs_by_scan(self) -> Dict[int, List[Run]]:
+        """
+        Returns the runs in which each scan was included in the inputs.
+
+        Returns
+        -------
+        Dict[int, List[Run]]
+            Runs by scan ID
+        """
+        ScanRun = apps.get_model("django_mri", "ScanRun")
+        links = (
+            ScanRun.objects.filter(scan__in=self)
+            .select_related("run")
+            .order_by("run_id")
+        )
+        runs = defaultdict(list)
+        for link in links:
+            runs[link.scan_id].append(link.run)
+        return dict(runs)
+
+    def query_run_set(self) -> QuerySet:
+        """
+        Returns a queryset of the runs in which any of the scans in the
+        queryset were included in the inputs.
+
+        Returns
+        -------
+        QuerySet
+            Run queryset
+        """
+        ScanRun = apps.get_model("django_mri", "ScanRun")
+        run_ids = ScanRun.objects.filter(scan__in=self).values("run_id")
+        return Run.objects.filter(id__in=run_ids)
+
+    def with_runs(self) -> QuerySet:
+        """
+        Returns the scans in the queryset which were included in the inputs
+        of any run.
+
+        Returns
+        -------
+        QuerySet
+            Scans with runs
+        """
+        ScanRun = apps.get_model("django_mri", "ScanRun")
+        return self.filter(id__in=ScanRun.objects.values("scan_id"))
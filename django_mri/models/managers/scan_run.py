@@ -0,0 +1,103 @@
+"""
+Definition of the :class:`ScanRunQuerySet` class.
+"""
+import logging
+
+from django.apps import apps
+from django.db.models import Model, QuerySet
+from django_mri.models.managers import logs
+
+
+class ScanRunQuerySet(QuerySet):
+    """
+    Custom manager for the :class:`~django_mri.models.scan_run.ScanRun`
+    class.
+    """
+
+    _logger = logging.getLogger("data.mri.scan")
+
+    def link_input(self, input_instance: Model) -> int:
+        """
+        Links the run of the provided input to any scans represented in its
+        value.
+
+        Parameters
+        ----------
+        input_instance : Model
+            :class:`~django_analyses.models.input.input.Input` subclass
+            instance
+
+        Returns
+        -------
+        int
+            Number of linked scans
+        """
+        if input_instance.run_id is None:
+            return 0
+        Scan = apps.get_model("django_mri", "Scan")
+        ScanInput = apps.get_model("django_mri", "ScanInput")
+        NiftiInput = apps.get_model("django_mri", "NiftiInput")
+        if isinstance(input_instance, ScanInput):
+            scan_ids = [input_instance.value_id]
+        elif isinstance(input_instance, NiftiInput):
+            scans = Scan.objects.filter(_nifti_id=input_instance.value_id)
+            scan_ids = scans.values_list("id", flat=True)
+        else:
+            value = input_instance.value
+            values = value if isinstance(value, list) else [value]
+            scans = Scan.objects.from_representations(values)
+            scan_ids = scans.values_list("id", flat=True)
+        links = [
+            self.model(scan_id=scan_id, run_id=input_instance.run_id)
+            for scan_id in scan_ids
+        ]
+        self.bulk_create(links, ignore_conflicts=True)
+        return len(links)
+
+    def backfill(self, scans: QuerySet = None, batch_size: int = 1000) -> int:
+        """
+        Creates any missing links for runs created before links were
+        maintained.
+
+        Parameters
+        ----------
+        scans : QuerySet, optional
+            Scans to link, by default all scans
+        batch_size : int, optional
+            Number of links to create per query, by default 1000
+
+        Returns
+        -------
+        int
+            Number of created links
+        """
+        Scan = apps.get_model("django_mri", "Scan")
+        ScanInput = apps.get_model("django_mri", "ScanInput")
+        NiftiInput = apps.get_model("django_mri", "NiftiInput")
+        scans = Scan.objects.all() if scans is None else scans
+        pairs = {
+            (scan_id, run_id) for scan_id, _, run_id in scans.match_inputs()
+        }
+        pairs |= set(
+            ScanInput.objects.filter(value__in=scans).values_list(
+                "value_id", "run_id"
+            )
+        )
+        pairs |= set(
+            NiftiInput.objects.filter(value__scan__in=scans).values_list(
+                "value__scan__id", "run_id"
+            )
+        )
+        links = [
+            self.model(scan_id=scan_id, run_id=run_id)
+            for scan_id, run_id in pairs
+            if run_id is not None
+        ]
+        n_existing = self.count()
+        self.bulk_create(links, batch_size=batch_size, ignore_conflicts=True)
+        n_created = self.count() - n_existing
+        message = logs.SCAN_RUN_BACKFILL.format(
+            n_created=n_created, n_links=len(links)
+        )
+        self._logger.info(message)
+        return n_created
@@ -1,12 +1,67 @@
 """
 Definition of the :class:`ScoreManager` class.
 """
+from collections import defaultdict
+from typing import Iterator, List, Tuple, Union
+
 import pandas as pd
 from django.db.models import F, Manager, QuerySet
 from django.db.models.aggregates import Avg, StdDev
 from django_analyses.models.run import Run
 from django_mri.analysis.score.scorers import get_scorer
 
+#: Score fields to query by DataFrame column name.
+SCORE_VALUES = {
+    "id": "ID",
+    "run_id": "Run ID",
+    "run__analysis_version__analysis__title": "Analysis",
+    "run__analysis_version__title": "Version",
+    "region__atlas__title": "Atlas",
+    "region__index": "Index",
+    "region__hemisphere": "Hemisphere",
+    "region__title": "Region",
+    "metric__title": "Metric",
+    "value": "Score",
+}
+
+#: Score DataFrame column data types.
+SCORE_DTYPES = {
+    "Analysis": "category",
+    "Version": "category",
+    "Atlas": "category",
+    "Index": "Int64",
+    "Hemisphere": "category",
+    "Region": "category",
+    "Metric": "category",
+    "Score": "float64",
+}
+
+#: Default number of scores per chunk in
+#: :meth:`ScoreQuerySet.iter_dataframes`.
+DEFAULT_CHUNK_SIZE: int = 100000
+
+
+def format_origin(scan_ids: List[int]) -> Union[int, Tuple[int, ...]]:
+    """
+    Returns a score's origin as a single scan ID, or a tuple of scan IDs if
+    the score was derived from multiple scans.
+
+    Parameters
+    ----------
+    scan_ids : List[int]
+        Origin scan IDs
+
+    Returns
+    -------
+    Union[int, Tuple[int, ...]]
+        Origin representation
+    """
+    if not scan_ids:
+        return None
+    if len(scan_ids) == 1:
+        return scan_ids[0]
+    return tuple(sorted(scan_ids))
+
 
 class ScoreManager(Manager):
     """
@@ -36,8 +91,68 @@ class ScoreManager(Manager):
 
 
 class ScoreQuerySet(QuerySet):
+    def to_long_dataframe(self) -> pd.DataFrame:
+        """
+        Returns the scores in the queryset as a DataFrame with a row per
+        score. The DataFrame is constructed from a single query for score
+        fields and one for score origins.
+
+        Returns
+        -------
+        pd.DataFrame
+            Scores
+        """
+        values = self.values_list(*SCORE_VALUES)
+        df = pd.DataFrame.from_records(
+            values, columns=list(SCORE_VALUES.values())
+        )
+        df = df.astype(SCORE_DTYPES).set_index("ID")
+        origins = defaultdict(list)
+        # Filter origins by subquery to avoid sending every score ID back to
+        # the database.
+        through = self.model.origin.through.objects.filter(
+            score__in=self.values("id")
+        )
+        for score_id, scan_id in through.values_list("score_id", "scan_id"):
+            origins[score_id].append(scan_id)
+        df.insert(
+            1,
+            "Origin",
+            [format_origin(origins.get(score_id)) for score_id in df.index],
+        )
+        return df
+
+    def iter_dataframes(
+        self, chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> Iterator[pd.DataFrame]:
+        """
+        Iterates over the scores in the queryset in chunks, each returned as
+        a DataFrame with a row per score (see :meth:`to_long_dataframe`).
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            Number of scores per chunk, by default DEFAULT_CHUNK_SIZE
+
+        Yields
+        -------
+        pd.DataFrame
+            Scores
+        """
+        queryset = self.order_by("id")
+        last_id = None
+        while True:
+            chunk = queryset
+            if last_id is not None:
+                chunk = queryset.filter(id__gt=last_id)
+            df = chunk[:chunk_size].to_long_dataframe()
+            if df.empty:
+                return
+            yield df
+            last_id = int(df.index[-1])
+
     def to_dataframe(self) -> pd.DataFrame:
-        df = pd.concat([score.to_series() for score in self.all()], axis=1).T
+        df = self.to_long_dataframe().reset_index(drop=True)
         df = df.dropna(axis=1, how="all")
         if "Region" in df.columns:
             return df.set_index(["Run ID", "Origin", "Atlas", "Hemisphere", "Region", "Metric"], drop=True)["Score"].unstack("Metric")
@@ -1,15 +1,23 @@
 """
 Definition of the :class:`SessionQuerySet` class.
 """
+import hashlib
 import logging
-from typing import Iterable
+from datetime import datetime
+from typing import Iterable, List, Tuple
 
 import pandas as pd
 from bokeh.plotting import Figure
-from django.db.models import Count, Model, QuerySet
+from django.core.cache import cache
+from django.db.models import Count, Model, Prefetch, QuerySet
+from django.db.models.functions import TruncMonth
 from django_mri.models.managers import logs
 from django_mri.plots.session import plot_measurement_by_month
-from django_mri.utils import get_group_model, get_study_model
+from django_mri.utils import (
+    get_bids_manager,
+    get_group_model,
+    get_study_model,
+)
 from tqdm import tqdm
 
 Group = get_group_model()
@@ -40,6 +48,37 @@ DATAFRAME_COLUMNS = (
     "Scan Count",
 )
 
+#: Cache key of the session statistics version, incremented whenever sessions
+#: are saved or deleted to invalidate any cached statistics.
+STATISTICS_VERSION_KEY = "django_mri.session_statistics_version"
+#: Cache key template of monthly session counts.
+MONTHLY_COUNTS_KEY = "django_mri.session_monthly_counts.{version}.{digest}"
+#: Number of seconds cached statistics are kept for (bounds the staleness of
+#: changes that bypass signals, such as bulk updates).
+STATISTICS_TIMEOUT = 60 * 60
+
+
+def get_statistics_version() -> int:
+    """
+    Returns the current session statistics version.
+
+    Returns
+    -------
+    int
+        Statistics version
+    """
+    return cache.get_or_set(STATISTICS_VERSION_KEY, 0, timeout=None)
+
+
+def invalidate_statistics() -> None:
+    """
+    Invalidates cached session statistics by incrementing their version.
+    """
+    try:
+        cache.incr(STATISTICS_VERSION_KEY)
+    except ValueError:
+        cache.set(STATISTICS_VERSION_KEY, 1, timeout=None)
+
 
 class SessionQuerySet(QuerySet):
     """
@@ -80,6 +119,50 @@ class SessionQuerySet(QuerySet):
         """
         return plot_measurement_by_month(self.all())
 
+    def count_by_month(self) -> List[Tuple[datetime, str, int]]:
+        """
+        Returns session counts by month and measurement definition title,
+        aggregated in the database.
+
+        Returns
+        -------
+        List[Tuple[datetime, str, int]]
+            Month, measurement definition title, and session count
+        """
+        queryset = self.prefetch_related(None).order_by()
+        if queryset.query.group_by is not None:
+            # Aggregate annotations (e.g. scan counts) would be grouped by.
+            queryset = self.model.objects.filter(pk__in=queryset.values("pk"))
+        counts = (
+            queryset.annotate(month=TruncMonth("time"))
+            .values("month", "measurement__title")
+            .annotate(count=Count("id", distinct=True))
+            .values_list("month", "measurement__title", "count")
+            .order_by("month")
+        )
+        return list(counts)
+
+    def get_monthly_counts(self) -> List[Tuple[datetime, str, int]]:
+        """
+        Returns cached session counts by month and measurement definition
+        title (see :meth:`count_by_month`). Cached counts are invalidated
+        whenever a session is saved or deleted.
+
+        Returns
+        -------
+        List[Tuple[datetime, str, int]]
+            Month, measurement definition title, and session count
+        """
+        digest = hashlib.md5(str(self.query).encode()).hexdigest()
+        key = MONTHLY_COUNTS_KEY.format(
+            version=get_statistics_version(), digest=digest
+        )
+        counts = cache.get(key)
+        if counts is None:
+            counts = self.count_by_month()
+            cache.set(key, counts, timeout=STATISTICS_TIMEOUT)
+        return counts
+
     def to_dataframe(self) -> pd.DataFrame:
         """
         Export the queryset as a DataFrame.
@@ -89,7 +172,9 @@ class SessionQuerySet(QuerySet):
         pd.DataFrame
             Queryset information
         """
-        queryset = self.annotate(scan_count=Count("scan"))
+        queryset = self.prefetch_related(None)
+        if "scan_count" not in queryset.query.annotations:
+            queryset = queryset.with_scan_count()
         values = queryset.values(*DATAFRAME_FIELDS)
         df = pd.DataFrame(values)
         df.columns = DATAFRAME_COLUMNS
@@ -101,6 +186,7 @@ class SessionQuerySet(QuerySet):
         persistent: bool = True,
         progressbar: bool = True,
         progressbar_position: int = 0,
+        workers: int = 1,
     ):
         # Log and return if the queryset is empty.
         if not self.exists():
@@ -129,14 +215,16 @@ class SessionQuerySet(QuerySet):
         n_converted = 0
         # Convert sessions to NIfTI.
         try:
-            for session in iterator:
-                session.convert_to_nifti(
-                    force=force,
-                    persistent=persistent,
-                    progressbar=progressbar,
-                    progressbar_position=progressbar_position + 1,
-                )
-                n_converted += 1
+            with get_bids_manager().defer_updates():
+                for session in iterator:
+                    session.convert_to_nifti(
+                        force=force,
+                        persistent=persistent,
+                        progressbar=progressbar,
+                        progressbar_position=progressbar_position + 1,
+                        workers=workers,
+                    )
+                    n_converted += 1
         except Exception as e:
             # Log exception and re-raise.
             failure_log = logs.SESSION_SET_NIFTI_CONVERSION_FAILURE.format(
@@ -157,6 +245,31 @@ class SessionQuerySet(QuerySet):
     def filter_by_collaborator(self, user: Model) -> QuerySet:
         return self.filter_by_studies(user.study_set.all())
 
+    def with_scan_count(self) -> QuerySet:
+        """
+        Annotates the number of scans in each session as *scan_count*.
+
+        Returns
+        -------
+        QuerySet
+            Annotated sessions
+        """
+        return self.annotate(scan_count=Count("scan", distinct=True))
+
+    def with_study_groups(self) -> QuerySet:
+        """
+        Prefetches the sessions' scans along with their study groups (and
+        studies), to be used for study group listing.
+
+        Returns
+        -------
+        QuerySet
+            Sessions with prefetched study groups
+        """
+        groups = Group.objects.select_related("study")
+        prefetch = Prefetch("scan_set__study_groups", queryset=groups)
+        return self.prefetch_related(prefetch)
+
     def query_study_groups(self) -> QuerySet:
         group_ids = self.values("scan__study_groups")
         return Group.objects.filter(id__in=group_ids).distinct()
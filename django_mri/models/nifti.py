@@ -5,18 +5,21 @@ import itertools
 import json
 import logging
 from pathlib import Path
-from typing import Dict, Iterable, List, Union
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
 
 import nibabel as nib
 import numpy as np
 from django.db import IntegrityError, models
 from django_analyses.models.input import FileInput, ListInput
 from django_extensions.db.models import TimeStampedModel
+from django_mri.models.managers.nifti import NIfTIQuerySet
 from django_mri.models.messages import (
     NIFTI_FILE_MISSING,
     PROCESSED_SEQUENCE_TYPE,
 )
+from django_mri.utils.bids_entities import parse_bids_entities
 from django_mri.utils.compression import compress, uncompress
+from django_mri.utils.utils import get_bids_manager
 
 REGISTERED_DESCRIPTIONS: Dict[str, str] = {
     "T1w_MPR1": "mprage",
@@ -45,20 +48,106 @@ class NIfTI(TimeStampedModel):
     #: some raw format to NIfTI or of a manipulation of the data.
     is_raw = models.BooleanField(default=False)
 
+    #: File name without extensions, e.g. *sub-1_ses-1_T1w*.
+    stem = models.CharField(max_length=255, blank=True, null=True)
+
+    #: BIDS entities parsed from the file's path, used to query files by
+    #: acquisition parameters without string matching over paths.
+    bids_subject = models.CharField(max_length=255, blank=True, null=True)
+    bids_session = models.CharField(max_length=255, blank=True, null=True)
+    bids_datatype = models.CharField(max_length=255, blank=True, null=True)
+    bids_suffix = models.CharField(max_length=255, blank=True, null=True)
+    bids_task = models.CharField(max_length=255, blank=True, null=True)
+    bids_acquisition = models.CharField(max_length=255, blank=True, null=True)
+    bids_direction = models.CharField(max_length=255, blank=True, null=True)
+    bids_run = models.PositiveIntegerField(blank=True, null=True)
+
+    #: Cached image header information and sidecar metadata (see
+    #: :meth:`read_header`), used to avoid loading voxel data.
+    header_cache = models.JSONField(blank=True, null=True)
+
     APPENDIX_FILES: Iterable[str] = {".json", ".bval", ".bvec"}
     B0_THRESHOLD: int = 10
 
     _instance: nib.nifti1.Nifti1Image = None
 
+    # Image instance used for partial reads (see get_lazy_instance()).
+    _lazy_instance: nib.nifti1.Nifti1Image = None
+
     # Used to cache JSON data to prevent multiple reads.
     _json_data = None
 
     # Logger instance for this model.
     _logger = logging.getLogger("data.mri.nifti")
 
+    objects = NIfTIQuerySet.as_manager()
+
     class Meta:
         verbose_name = "NIfTI"
         ordering = ("-id",)
+        indexes = [
+            models.Index(fields=["stem"], name="nifti_stem_idx"),
+            models.Index(
+                fields=[
+                    "bids_subject",
+                    "bids_session",
+                    "bids_datatype",
+                    "bids_suffix",
+                ],
+                name="nifti_bids_entities_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        Overrides the model's :meth:`~django.db.models.Model.save` method to
+        keep the parsed BIDS entities in sync with the instance's path.
+        """
+        self.update_bids_entities()
+        if self.header_cache is None and Path(self.path).is_file():
+            self.header_cache = self.read_header()
+        super().save(*args, **kwargs)
+
+    def update_bids_entities(self) -> None:
+        """
+        Updates the BIDS entity fields from the instance's path.
+        """
+        for field, value in parse_bids_entities(self.path).items():
+            setattr(self, field, value)
+
+    def read_header(self) -> dict:
+        """
+        Reads the image header and sidecar files without loading any voxel
+        data.
+
+        Returns
+        -------
+        dict
+            Header information
+        """
+        instance = self.get_instance()
+        header = instance.header
+        shape = [int(size) for size in instance.shape]
+        return {
+            "shape": shape,
+            "zooms": [float(zoom) for zoom in header.get_zooms()],
+            "affine": instance.affine.tolist(),
+            "dtype": str(header.get_data_dtype()),
+            "datatype": int(header["datatype"]),
+            "n_volumes": shape[3] if len(shape) > 3 else 1,
+            "b_value": self.get_b_value(),
+            "json_keys": sorted(self.read_json()),
+        }
+
+    def invalidate_header_cache(self) -> None:
+        """
+        Clears cached header information, to be read again on the next save or
+        header query.
+        """
+        self.header_cache = None
+        self._instance = None
+        self._lazy_instance = None
+        self._json_data = None
 
     def get_instance(self) -> nib.nifti1.Nifti1Image:
         return nib.load(str(self.path))
@@ -70,13 +159,116 @@ class NIfTI(TimeStampedModel):
         .. _NiBabel: https://nipy.org/nibabel/
         .. _NumPy: http://www.numpy.org/
 
+        Parameters
+        ----------
+        dtype : np.dtype, optional
+            Floating point data type to return, by default np.float64. If
+            None, data will be returned in its on-disk data type (unless
+            scaling is defined in the header)
+
         Returns
         -------
         np.ndarray
             Pixel data.
         """
+        if dtype is None:
+            return np.asanyarray(self.instance.dataobj)
         return self.instance.get_fdata(dtype=dtype)
 
+    def get_lazy_instance(self) -> nib.nifti1.Nifti1Image:
+        """
+        Returns an image instance for partial reads. Uncompressed files are
+        memory-mapped, and compressed files are kept open in between reads so
+        that sequential slices are decompressed only once. The instance is
+        created once and reused until the header cache is invalidated (see
+        :meth:`invalidate_header_cache`).
+
+        Returns
+        -------
+        nib.nifti1.Nifti1Image
+            Image instance
+        """
+        if self._lazy_instance is None:
+            self._lazy_instance = nib.load(
+                str(self.path), mmap=True, keep_file_open=True
+            )
+        return self._lazy_instance
+
+    def get_slab(
+        self, start: int, stop: int, dtype: np.dtype = np.float32
+    ) -> np.ndarray:
+        """
+        Reads a range of volumes from a 4D image without loading the rest.
+
+        Parameters
+        ----------
+        start : int
+            First volume index
+        stop : int
+            Volume index to stop before
+        dtype : np.dtype, optional
+            Data type to return, by default np.float32. If None, the on-disk
+            data type is preserved
+
+        Returns
+        -------
+        np.ndarray
+            Volumes in the provided range
+        """
+        slab = self.get_lazy_instance().dataobj[..., start:stop]
+        return np.asarray(slab, dtype=dtype)
+
+    def get_volume(
+        self, index: int, dtype: np.dtype = np.float32
+    ) -> np.ndarray:
+        """
+        Reads a single volume from a 4D image without loading the rest.
+
+        Parameters
+        ----------
+        index : int
+            Volume index
+        dtype : np.dtype, optional
+            Data type to return, by default np.float32. If None, the on-disk
+            data type is preserved
+
+        Returns
+        -------
+        np.ndarray
+            3D volume
+        """
+        volume = self.get_lazy_instance().dataobj[..., index]
+        return np.asarray(volume, dtype=dtype)
+
+    def iter_volumes(
+        self, indices: Iterable[int] = None, dtype: np.dtype = np.float32
+    ) -> Iterator[np.ndarray]:
+        """
+        Iterates over the volumes of the image, reading one at a time. 3D
+        images are returned as a single volume.
+
+        Parameters
+        ----------
+        indices : Iterable[int], optional
+            Volume indices to read, by default None (all volumes)
+        dtype : np.dtype, optional
+            Data type to return, by default np.float32. If None, the on-disk
+            data type is preserved
+
+        Yields
+        -------
+        np.ndarray
+            3D volume
+        """
+        dataobj = self.get_lazy_instance().dataobj
+        if self.ndim < 4:
+            yield np.asarray(dataobj, dtype=dtype)
+            return
+        if indices is None:
+            indices = range(self.n_volumes)
+        for index in indices:
+            yield np.asarray(dataobj[..., index], dtype=dtype)
+
     def get_b_value(self) -> List[int]:
         """
         Returns the degree of diffusion weighting applied (b-value_) for each
@@ -248,6 +440,7 @@ class NIfTI(TimeStampedModel):
                 uncompressed_path, keep_source=keep_source
             )
             self.path = str(compressed_path)
+            self.invalidate_header_cache()
             self.save()
         return Path(self.path)
 
@@ -272,6 +465,7 @@ class NIfTI(TimeStampedModel):
                 compressed_path, keep_source=keep_source
             )
             self.path = str(uncompressed_path)
+            self.invalidate_header_cache()
             self.save()
         return Path(self.path)
 
@@ -294,9 +488,11 @@ class NIfTI(TimeStampedModel):
         valid_uncompressed = uncompressed_path.exists() and not is_compressed
         if not valid_compressed and uncompressed_path.exists():
             self.path = str(path.with_suffix(""))
+            self.invalidate_header_cache()
             self.save()
         elif not valid_uncompressed and compressed_path.exists():
             self.path = str(path.with_suffix(".gz"))
+            self.invalidate_header_cache()
             self.save()
         elif valid_compressed or valid_uncompressed:
             return
@@ -368,6 +564,11 @@ class NIfTI(TimeStampedModel):
                     input_instance.save()
                     self._logger.log(log_level, "done!")
         self.path = str(destination)
+        self.invalidate_header_cache()
+        bids_manager = get_bids_manager()
+        moved_paths = source.parents, destination.parents
+        if any(bids_manager.bids_dir in parents for parents in moved_paths):
+            bids_manager.mark_layout_stale()
         self._logger.log(
             log_level, f"NIfTI {self.id} file successfully moved."
         )
@@ -392,16 +593,22 @@ class NIfTI(TimeStampedModel):
         return files
 
     def get_mean_volume(self, axis: int = -1) -> np.ndarray:
-        data = self.get_data()
-        if data.ndim == 4:
-            if (
-                hasattr(self, "scan")
-                and self.scan.sequence_type == "dwi_fieldmap"
-            ):
-                mask = np.array(self.b_value) < self.B0_THRESHOLD
-                data = data[..., mask]
-            return data.mean(axis=axis)
-        return data
+        if self.ndim != 4:
+            return self.get_data()
+        if axis not in (-1, 3):
+            return self.get_data().mean(axis=axis)
+        indices = range(self.n_volumes)
+        is_dwi_fieldmap = (
+            hasattr(self, "scan") and self.scan.sequence_type == "dwi_fieldmap"
+        )
+        if is_dwi_fieldmap:
+            mask = np.array(self.b_value) < self.B0_THRESHOLD
+            indices = np.flatnonzero(mask)
+        # Accumulate volumes one at a time to keep memory usage bounded.
+        total = np.zeros(self.shape[:3], dtype=np.float64)
+        for volume in self.iter_volumes(indices=indices, dtype=np.float64):
+            total += volume
+        return total / len(indices)
 
     def infer_sequence_type(self) -> str:
         if not self.is_raw:
@@ -481,13 +688,14 @@ class NIfTI(TimeStampedModel):
         See Also
         --------
         * :meth:`get_b_value`
+        * :attr:`header_data`
 
         Returns
         -------
         List[int]
             B-value
         """
-        return self.get_b_value()
+        return self.header_data.get("b_value")
 
     @property
     def b_vector(self) -> List[List[float]]:
@@ -546,6 +754,111 @@ class NIfTI(TimeStampedModel):
         """
         return self.uncompress()
 
+    @property
+    def header_data(self) -> dict:
+        """
+        Returns cached header information, reading and persisting it first if
+        required.
+
+        See Also
+        --------
+        * :meth:`read_header`
+
+        Returns
+        -------
+        dict
+            Header information
+        """
+        if self.header_cache is None:
+            self.header_cache = self.read_header()
+            if self.id is not None:
+                self.save(update_fields=["header_cache"])
+        return self.header_cache
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """
+        Returns the image's shape.
+
+        Returns
+        -------
+        Tuple[int, ...]
+            Image shape
+        """
+        return tuple(self.header_data["shape"])
+
+    @property
+    def ndim(self) -> int:
+        """
+        Returns the image's number of dimensions.
+
+        Returns
+        -------
+        int
+            Number of dimensions
+        """
+        return len(self.header_data["shape"])
+
+    @property
+    def zooms(self) -> Tuple[float, ...]:
+        """
+        Returns the image's voxel sizes (and repetition time for 4D images).
+
+        Returns
+        -------
+        Tuple[float, ...]
+            Voxel sizes
+        """
+        return tuple(self.header_data["zooms"])
+
+    @property
+    def affine(self) -> np.ndarray:
+        """
+        Returns the image's affine transformation matrix.
+
+        Returns
+        -------
+        np.ndarray
+            Affine matrix
+        """
+        return np.array(self.header_data["affine"])
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        Returns the image's on-disk data type.
+
+        Returns
+        -------
+        np.dtype
+            Data type
+        """
+        return np.dtype(self.header_data["dtype"])
+
+    @property
+    def n_volumes(self) -> int:
+        """
+        Returns the number of volumes in the image (1 for 3D images).
+
+        Returns
+        -------
+        int
+            Number of volumes
+        """
+        return self.header_data["n_volumes"]
+
+    @property
+    def json_keys(self) -> List[str]:
+        """
+        Returns the keys available in the JSON sidecar.
+
+        Returns
+        -------
+        List[str]
+            Sidecar keys
+        """
+        return self.header_data["json_keys"]
+
     @property
     def instance(self) -> nib.nifti1.Nifti1Image:
         if self._instance is None:
@@ -4,8 +4,9 @@ Definition of the :class:`Scan` model.
 import logging
 import warnings
 from pathlib import Path
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Tuple, Union
 
+import nibabel as nib
 from django.contrib.auth import get_user_model
 from django.contrib.postgres.fields import ArrayField
 from django.core.validators import MinValueValidator
@@ -20,9 +21,10 @@ from django_mri.models.managers.scan import ScanQuerySet
 from django_mri.models.messages import SCAN_UPDATE_NO_DICOM
 from django_mri.models.nifti import NIfTI
 from django_mri.utils.bids import BidsManager
+from django_mri.utils.preview import (generate_previews_on_conversion,
+                                     schedule_previews)
 from django_mri.utils.utils import (get_bids_manager, get_group_model,
                                     get_mri_root)
-from nilearn.image import mean_img
 from nilearn.plotting import cm, view_img
 
 FLAG_3D = "mprage", "spgr", "flair", "t1", "t2"
@@ -305,16 +307,7 @@ class Scan(TimeStampedModel):
         if self.sequence_type == "localizer":
             warnings.warn(messages.NO_LOCALIZER_NIFTI)
         elif self.dicom:
-            bids = False
-            if destination is None:
-                destination = self.bids_manager.build_bids_path(self)
-                if destination is None:
-                    destination = self.get_default_nifti_destination()
-                else:
-                    bids = True
-            elif not isinstance(destination, Path):
-                destination = Path(destination)
-            destination.parent.mkdir(exist_ok=True, parents=True)
+            destination, bids = self.get_nifti_destination(destination)
             try:
                 nifti_path = Dcm2niix().convert(
                     self.dicom.path,
@@ -328,16 +321,74 @@ class Scan(TimeStampedModel):
                 else:
                     raise
             else:
-                nifti = NIfTI.objects.create(path=nifti_path, is_raw=True)
-                self._nifti = nifti
-                self.save()
-                if bids:
-                    self.bids_manager.postprocess(nifti)
-                return nifti
+                return self.register_nifti(nifti_path, bids=bids)
         else:
             message = messages.DICOM_TO_NIFTI_NO_DICOM.format(scan_id=self.id)
             raise AttributeError(message)
 
+    def get_nifti_destination(
+        self, destination: Path = None, plan: Dict[Any, Path] = None
+    ) -> Tuple[Path, bool]:
+        """
+        Returns the destination of a NIfTI version of this scan, allocating a
+        BIDS-compatible path if possible, and makes sure its parent directory
+        exists.
+
+        Parameters
+        ----------
+        destination : Path, optional
+            The desired path for conversion output (the default is None, which
+            will try to build a BIDS path and fall back to some default
+            location)
+        plan : Dict[Any, Path], optional
+            BIDS paths plan including this scan (see
+            :meth:`~django_mri.utils.bids.BidsManager.plan_bids_paths`), by
+            default None
+
+        Returns
+        -------
+        Tuple[Path, bool]
+            Conversion destination and whether it is a BIDS path
+        """
+        bids = False
+        if destination is None:
+            destination = self.bids_manager.build_bids_path(self, plan=plan)
+            if destination is None:
+                destination = self.get_default_nifti_destination()
+            else:
+                bids = True
+        elif not isinstance(destination, Path):
+            destination = Path(destination)
+        destination.parent.mkdir(exist_ok=True, parents=True)
+        return destination, bids
+
+    def register_nifti(self, path: Path, bids: bool = False) -> NIfTI:
+        """
+        Creates a :class:`~django_mri.models.nifti.NIfTI` instance for a
+        conversion output and associates it with this scan.
+
+        Parameters
+        ----------
+        path : Path
+            Conversion output path
+        bids : bool, optional
+            Whether the output was created in the BIDS directory and requires
+            BIDS postprocessing, by default False
+
+        Returns
+        -------
+        NIfTI
+            Created NIfTI instance
+        """
+        nifti = NIfTI.objects.create(path=path, is_raw=True)
+        self._nifti = nifti
+        self.save()
+        if bids:
+            self.bids_manager.postprocess(nifti)
+        if generate_previews_on_conversion():
+            schedule_previews(nifti.id)
+        return nifti
+
     def sync_bids(self, log_level: int = logging.DEBUG):
         self._logger.log(log_level, f"Checking scan #{self.id} BIDS status...")
         mri_root = get_mri_root()
@@ -516,17 +567,9 @@ class Scan(TimeStampedModel):
         models.QuerySet
             Input queryset
         """
-        all_input_ids = []
-        for InputClass, filter_key in self.DERIVATIVE_QUERY.items():
-            query = models.Q()
-            for representation in self.REPRESENTATIONS:
-                value = getattr(self, representation, None)
-                if value is not None:
-                    query |= models.Q(**{filter_key: value})
-                inputs = InputClass.objects.filter(query)
-                input_ids = list(inputs.values_list("id", flat=True))
-                all_input_ids += input_ids
-        return Input.objects.filter(id__in=all_input_ids).select_subclasses()
+        scans = Scan.objects.filter(id=self.id)
+        input_ids = scans.inputs_by_scan().get(self.id, [])
+        return Input.objects.filter(id__in=input_ids).select_subclasses()
 
     def query_run_set(self) -> models.QuerySet:
         """
@@ -537,9 +580,12 @@ class Scan(TimeStampedModel):
         -------
         models.QuerySet
             Input queryset
+
+        See Also
+        --------
+        :meth:`~django_mri.models.managers.scan.ScanQuerySet.query_run_set`
         """
-        run_ids = self.input_set.values_list("run", flat=True)
-        return Run.objects.filter(id__in=run_ids)
+        return Scan.objects.filter(id=self.id).query_run_set()
 
     def query_derivatives(self) -> Dict[Run, Dict[str, Any]]:
         """
@@ -578,8 +624,7 @@ class Scan(TimeStampedModel):
             [flag in self.description.lower() for flag in FLAG_4D]
         )
         if not (has_3d_flag or has_4d_flag):
-            data = self.nifti.get_data()
-            ndim = data.ndim
+            ndim = self.nifti.ndim
         else:
             ndim = 3 if has_3d_flag else 4
         # 3D parameters.
@@ -588,7 +633,8 @@ class Scan(TimeStampedModel):
             title = self.description
         # 4D parameters.
         elif ndim == 4:
-            image = mean_img(str(self.nifti.path))
+            mean_volume = self.nifti.get_mean_volume()
+            image = nib.Nifti1Image(mean_volume, self.nifti.affine)
             title = f"{self.description} (Mean Image)"
         return view_img(
             image,
@@ -680,6 +726,10 @@ class Scan(TimeStampedModel):
         str
             Inferred sequence type
         """
+        # Annotated by ScanQuerySet.with_sequence_type().
+        annotated = getattr(self, "annotated_sequence_type", None)
+        if annotated is not None:
+            return annotated
         return self.infer_sequence_type()
 
     @property
@@ -0,0 +1,45 @@
+"""
+Definition of the :class:`ScanRun` model.
+"""
+from django.db import models
+from django_mri.models import help_text
+from django_mri.models.managers.scan_run import ScanRunQuerySet
+
+
+class ScanRun(models.Model):
+    """
+    Links a :class:`~django_mri.models.scan.Scan` to a
+    :class:`~django_analyses.models.run.Run` in which it was included in the
+    inputs (in any representation). Links are created along with the run's
+    inputs, so that run lookups for scans, sessions, and subjects are indexed
+    joins rather than input value matching.
+    """
+
+    scan = models.ForeignKey(
+        "django_mri.Scan",
+        on_delete=models.CASCADE,
+        related_name="run_links",
+        help_text=help_text.SCAN_RUN_SCAN,
+    )
+    run = models.ForeignKey(
+        "django_analyses.Run",
+        on_delete=models.CASCADE,
+        related_name="scan_links",
+        help_text=help_text.SCAN_RUN_RUN,
+    )
+
+    objects = ScanRunQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ("scan", "run")
+
+    def __str__(self) -> str:
+        """
+        Returns the string representation of this instance.
+
+        Returns
+        -------
+        str
+            Scan run link string representation
+        """
+        return f"Scan #{self.scan_id} -> Run #{self.run_id}"
@@ -196,9 +196,7 @@ class Session(TimeStampedModel):
         run_ids = set(list_inputs.values_list("run", flat=True)) | set(
             integer_inputs.values_list("run", flat=True)
         )
-        runs = Run.objects.none()
-        for scan in self.scan_set.all():
-            runs |= scan.query_run_set()
+        runs = self.scan_set.all().query_run_set()
         return Run.objects.filter(id__in=run_ids) | runs
 
     def get_bids_dir(self) -> Path:
@@ -243,6 +241,7 @@ class Session(TimeStampedModel):
         persistent: bool = True,
         progressbar: bool = False,
         progressbar_position: int = 0,
+        workers: int = 1,
     ):
         # Log session data conversion start.
         start_log = logs.SESSION_NIFTI_CONVERSION_START.format(pk=self.id)
@@ -258,6 +257,7 @@ class Session(TimeStampedModel):
                 persistent=persistent,
                 progressbar=progressbar,
                 progressbar_position=progressbar_position,
+                workers=workers,
             )
         except Exception as e:
             # Log exception and re-raise.
@@ -22,8 +22,7 @@ FIGURE_KWARGS = {
     "plot_width": 1500,
     "toolbar_location": "above",
 }
-QUERYSET_FIELDS = "time", "measurement__title"
-COLUMN_NAMES = "Time", "Measurement"
+COLUMN_NAMES = "Time", "Measurement", "Count"
 CUMULATIVE_AXIS_KWARGS = {
     "axis_label": "Cumulative Sum",
     "y_range_name": "cumulative_y_range",
@@ -76,21 +75,22 @@ LEGEND_KWARGS = {
 }
 
 
-def parse_dataframe(values: List[Tuple[datetime, str]]) -> QuerySet:
+def parse_dataframe(values: List[Tuple[datetime, str, int]]) -> pd.DataFrame:
     df = pd.DataFrame(values, columns=COLUMN_NAMES)
     # Convert None to string so that they will be kept in count.
     df["Measurement"] = df["Measurement"].astype(str)
     # Remove 'MRI Acquisition' from definition titles.
     df["Measurement"] = df["Measurement"].str.replace(ACQUISITION_SUFFIX, "")
     # Create Year and Month columns convenience.
-    df["Year"] = df["Time"].dt.year
-    df["Month"] = df["Time"].dt.month
+    time = pd.to_datetime(df["Time"])
+    df["Year"] = time.dt.year
+    df["Month"] = time.dt.month
     return df
 
 
 def calculate_counts(df: pd.DataFrame) -> pd.Series:
-    # Calculate monthly counts per measurement definition.
-    counts = df.groupby(GROUPING).count()
+    # Sum monthly counts per (suffix stripped) measurement definition.
+    counts = df.groupby(GROUPING)["Count"].sum()
     # Create a MultiIndex to reindex counts by.
     year_range = range(df["Year"].min(), df["Year"].max() + 1)
     month_range = range(1, 13)
@@ -98,7 +98,7 @@ def calculate_counts(df: pd.DataFrame) -> pd.Series:
     index = pd.MultiIndex.from_product(
         [year_range, month_range, measurements], names=GROUPING,
     )
-    return counts.reindex(index, fill_value=0).squeeze()
+    return counts.reindex(index, fill_value=0)
 
 
 def parse_x_range(counts: pd.Series) -> List[Tuple[str, str]]:
@@ -178,7 +178,7 @@ def customize_figure(p: Figure):
 
 def plot_measurement_by_month(queryset: QuerySet) -> Figure:
     # Calculate measurement counts by month.
-    values = list(queryset.values_list(*QUERYSET_FIELDS))
+    values = queryset.get_monthly_counts()
     df = parse_dataframe(values)
     counts = calculate_counts(df)
     source = create_source(counts)
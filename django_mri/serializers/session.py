@@ -2,7 +2,7 @@
 Definition of the :class:`SessionReadSerializer` and `SessionWriteSerializer`
 classes.
 """
-from typing import Tuple
+from typing import List, Tuple
 
 from django.urls import reverse
 from rest_framework import serializers
@@ -57,7 +57,7 @@ class SessionReadSerializer(SessionSerializer):
     dicom_zip = serializers.SerializerMethodField()
     nifti_zip = serializers.SerializerMethodField()
     n_scans = serializers.SerializerMethodField()
-    study_groups = MiniGroupSerializer(many=True)
+    study_groups = serializers.SerializerMethodField()
 
     class Meta:
         model = Session
@@ -72,7 +72,27 @@ class SessionReadSerializer(SessionSerializer):
         return reverse("mri:session_nifti_zip", args=(instance.id,))
 
     def get_n_scans(self, instance: Session) -> int:
-        return instance.scan_set.count()
+        # Annotated by SessionQuerySet.with_scan_count().
+        scan_count = getattr(instance, "scan_count", None)
+        if scan_count is None:
+            return instance.scan_set.count()
+        return scan_count
+
+    def get_study_groups(self, instance: Session) -> List[dict]:
+        # Prefetched by SessionQuerySet.with_study_groups().
+        if "scan_set" in getattr(instance, "_prefetched_objects_cache", {}):
+            groups = {
+                group.id: group
+                for scan in instance.scan_set.all()
+                for group in scan.study_groups.all()
+            }
+            groups = [groups[group_id] for group_id in sorted(groups)]
+        else:
+            groups = instance.study_groups
+        serializer = MiniGroupSerializer(
+            groups, many=True, context=self.context
+        )
+        return serializer.data
 
 
 class AdminSessionReadSerializer(SessionReadSerializer):
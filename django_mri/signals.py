@@ -15,10 +15,15 @@ from django.db import IntegrityError
 from django.db.models import Model
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django_analyses.models.input import DirectoryInput, FileInput, ListInput
 from django_dicom.models.series import Series
 
+from django_mri.models.inputs.nifti_input import NiftiInput
+from django_mri.models.inputs.scan_input import ScanInput
+from django_mri.models.managers.session import invalidate_statistics
 from django_mri.models.nifti import NIfTI
 from django_mri.models.scan import Scan
+from django_mri.models.scan_run import ScanRun
 from django_mri.models.session import Session
 from django_mri.utils import get_session_by_series, get_subject_model
 
@@ -57,6 +62,25 @@ def session_post_save_receiver(
             instance.save()
 
 
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+def session_statistics_receiver(
+    sender: Model, instance: Session, **kwargs
+) -> None:
+    """
+    Invalidates cached session statistics whenever a session is saved or
+    deleted.
+
+    Parameters
+    ----------
+    sender : ~django.db.models.Model
+        The :class:`~django_mri.models.session.Session` model
+    instance : ~django_mri.models.session.Session
+        Session instance
+    """
+    invalidate_statistics()
+
+
 @receiver(post_save, sender=Series)
 def series_post_save_receiver(
     sender: Model, instance: Series, created: bool, **kwargs
@@ -125,3 +149,28 @@ def nifti_post_delete_receiver(
         empty_subject = not any(subject_dir.iterdir())
         if empty_subject:
             subject_dir.rmdir()
+
+
+@receiver(post_save, sender=FileInput)
+@receiver(post_save, sender=ListInput)
+@receiver(post_save, sender=DirectoryInput)
+@receiver(post_save, sender=ScanInput)
+@receiver(post_save, sender=NiftiInput)
+def input_post_save_receiver(
+    sender: Model, instance: Model, created: bool, **kwargs
+) -> None:
+    """
+    Links created run inputs to the scans they represent (see
+    :class:`~django_mri.models.scan_run.ScanRun`).
+
+    Parameters
+    ----------
+    sender : ~django.db.models.Model
+        Input model
+    instance : ~django.db.models.Model
+        Input instance
+    created : bool
+        Whether the input instance was created or not
+    """
+    if created:
+        ScanRun.objects.link_input(instance)
@@ -5,13 +5,16 @@ from datetime import datetime
 from pathlib import Path
 from typing import Iterable, Union
 
-from celery import shared_task
+from celery import group, shared_task
 from django_analyses.models.run import Run
 
 from django_mri.models.data_directory import DataDirectory
+from django_mri.models.nifti import NIfTI
 from django_mri.models.scan import Scan
 from django_mri.models.score import Score
-from django_mri.utils.utils import get_subject_model
+from django_mri.models.session import Session
+from django_mri.utils.preview import create_previews
+from django_mri.utils.utils import get_bids_manager, get_subject_model
 
 
 @shared_task(name="django_mri.create-scores")
@@ -22,7 +25,9 @@ def create_scores(run_id: int):
 
 @shared_task(name="django_mri.import-data")
 def import_data(
-    data_directory: Union[int, str, Path], today_only: bool = False
+    data_directory: Union[int, str, Path],
+    today_only: bool = False,
+    incremental: bool = False,
 ) -> list:
     """
     Imports new data (unfamiliar subdirectories) from the provided
@@ -35,6 +40,9 @@ def import_data(
     today_only : bool
         Whether to look for a '<year>/<month>/<day>' subdirectory to import,
         default is False
+    incremental : bool
+        Whether to also re-import changed subdirectories of a DataDirectory
+        instance, default is False
 
     Returns
     -------
@@ -45,7 +53,9 @@ def import_data(
 
     if isinstance(data_directory, int):
         source = DataDirectory.objects.get(id=data_directory)
-        imported_subdirectories = source.sync(progressbar=False, report=True)
+        imported_subdirectories = source.sync(
+            progressbar=False, report=True, incremental=incremental
+        )
         return imported_subdirectories
     else:
         if today_only:
@@ -70,3 +80,111 @@ def build_bids_directory(
     subjects.build_bids_directory(
         progressbar=False, force=force, persistent=persistent
     )
+
+
+@shared_task(name="django_mri.convert-session-to-nifti")
+def convert_session_to_nifti(
+    session_id: int,
+    force: bool = False,
+    persistent: bool = True,
+    workers: int = 1,
+):
+    """
+    Converts a single session's scans from DICOM to NIfTI.
+
+    Parameters
+    ----------
+    session_id : int
+        :class:`~django_mri.models.session.Session` instance ID
+    force : bool, optional
+        Whether to delete and recreate existing NIfTI instances, by default
+        False
+    persistent : bool, optional
+        Whether to warn rather than raise on conversion failures, by default
+        True
+    workers : int, optional
+        Maximal number of *dcm2niix* subprocesses to run concurrently, by
+        default 1
+    """
+    session = Session.objects.get(id=session_id)
+    session.convert_to_nifti(
+        force=force, persistent=persistent, progressbar=False, workers=workers
+    )
+
+
+@shared_task(name="django_mri.convert-sessions-to-nifti")
+def convert_sessions_to_nifti(
+    session_ids: Iterable[int],
+    force: bool = False,
+    persistent: bool = True,
+    workers: int = 1,
+):
+    """
+    Fans out NIfTI conversion to a :func:`convert_session_to_nifti` task per
+    session. Sessions are written to separate BIDS directories, so their
+    conversions may safely run on different workers.
+
+    Parameters
+    ----------
+    session_ids : Iterable[int]
+        :class:`~django_mri.models.session.Session` instance IDs
+    force : bool, optional
+        Whether to delete and recreate existing NIfTI instances, by default
+        False
+    persistent : bool, optional
+        Whether to warn rather than raise on conversion failures, by default
+        True
+    workers : int, optional
+        Maximal number of *dcm2niix* subprocesses to run concurrently within
+        each session, by default 1
+    """
+    tasks = group(
+        convert_session_to_nifti.s(
+            session_id, force=force, persistent=persistent, workers=workers
+        )
+        for session_id in session_ids
+    )
+    return tasks.apply_async()
+
+
+@shared_task(name="django_mri.update-bids-layout-database")
+def update_bids_layout_database(force: bool = False) -> str:
+    """
+    Re-indexes the BIDS directory into its PyBIDS layout database if any
+    files were created or moved since it was last updated.
+
+    Parameters
+    ----------
+    force : bool, optional
+        Whether to re-index an up to date database, by default False
+
+    Returns
+    -------
+    str
+        Layout database directory
+    """
+    bids_manager = get_bids_manager()
+    return str(bids_manager.update_layout_database(force=force))
+
+
+@shared_task(name="django_mri.create-nifti-previews")
+def create_nifti_previews(nifti_id: int, force: bool = False) -> str:
+    """
+    Creates the downsampled preview artifacts of a NIfTI instance.
+
+    Parameters
+    ----------
+    nifti_id : int
+        :class:`~django_mri.models.nifti.NIfTI` instance ID
+    force : bool, optional
+        Whether to recreate existing previews, by default False
+
+    Returns
+    -------
+    str
+        Preview directory
+    """
+    nifti = NIfTI.objects.select_related("scan").get(id=nifti_id)
+    scan = getattr(nifti, "scan", None)
+    title = scan.description if scan else None
+    return str(create_previews(nifti, title=title, force=force))
@@ -0,0 +1,81 @@
+"""
+Definition of the :func:`~django_mri.utils.archive.stream_zip` utility
+function, used to generate ZIP archives with bounded memory usage.
+"""
+import io
+import zipfile
+from pathlib import Path
+from typing import Iterable, Iterator, Tuple, Union
+
+#: Size of chunks read from archived files.
+CHUNK_SIZE: int = 1024 * 1024
+
+#: Suffixes of files that are already compressed and should be stored as is.
+COMPRESSED_SUFFIXES: Tuple[str] = (".gz", ".zip", ".bz2", ".xz")
+
+
+class _StreamBuffer(io.RawIOBase):
+    """
+    A write-only, non-seekable buffer collecting archive bytes until they are
+    consumed.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(
+    files: Iterable[Tuple[Union[Path, str], Union[Path, str]]],
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """
+    Generates a ZIP archive of the provided files chunk by chunk. Files that
+    are already compressed (e.g. *.nii.gz*) are stored, and any other files
+    are deflated.
+
+    Parameters
+    ----------
+    files : Iterable[Tuple[Union[Path, str], Union[Path, str]]]
+        Pairs of file paths and their names within the archive
+    chunk_size : int, optional
+        Size of chunks read from archived files, by default CHUNK_SIZE
+
+    Yields
+    -------
+    bytes
+        Archive content
+    """
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, "w", allowZip64=True) as archive:
+        for path, name in files:
+            path = Path(path)
+            info = zipfile.ZipInfo.from_file(path, str(name))
+            info.compress_type = (
+                zipfile.ZIP_STORED
+                if path.suffix in COMPRESSED_SUFFIXES
+                else zipfile.ZIP_DEFLATED
+            )
+            with open(path, "rb") as source:
+                with archive.open(info, "w") as destination:
+                    for chunk in iter(lambda: source.read(chunk_size), b""):
+                        destination.write(chunk)
+                        yield buffer.pop()
+            yield buffer.pop()
+    yield buffer.pop()
@@ -1,27 +1,62 @@
 """
 Definition of the :class:`Bids` class.
 """
+import csv
+import fcntl
 import json
 import logging
-import re
+import os
 import shutil
+import threading
+import time
 import warnings
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import date
 from pathlib import Path
-from typing import Union
+from typing import Any, Dict, Iterable, List, Union
+from uuid import uuid4
 
 import nibabel as nib
-import pandas as pd
+from bids import BIDSLayout
 from django.apps import apps
-from django.db.models import Q
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
 from django_mri.utils import logs
 from django_mri.utils.utils import get_bids_dir
+from tqdm import tqdm
 
 BASE_DIR = Path(__file__).parent
 TEMPLATES_DIR = BASE_DIR / "bids_templates"
 NIfTI = apps.get_model("django_mri", "NIfTI", require_ready=False)
 
 
+class BatchState(threading.local):
+    """
+    Per-thread state of deferred BIDS postprocessing (see
+    :meth:`BidsManager.defer_updates`), so that batches run by different
+    threads sharing a :class:`BidsManager` do not affect each other.
+    """
+
+    def __init__(self):
+        #: Number of nested deferral contexts.
+        self.deferral = 0
+
+        #: Participants to be listed in "participants.tsv".
+        self.participants = {}
+
+        #: Sessions with fieldmaps to be updated.
+        self.fieldmap_sessions = set()
+
+        #: Single run BIDS paths by scan ID.
+        self.single_run_paths = {}
+
+        #: Whether a layout database update is pending.
+        self.layout_update = False
+
+
 class BidsManager:
     """
     A class to compose BIDS-appropriate paths for usage by dcm2niix
@@ -43,12 +78,24 @@ class BidsManager:
     RUN_LABEL_TEMPLATE: str = "run-{index}"
     NA_LABEL: str = "n/a"
     EPI_DATATYPES = ["func", "dwi"]
+    FIELDMAP_DATATYPE: str = "fmap"
+    NIFTI_EXTENSION: str = ".nii.gz"
+    LAYOUT_DATABASE_DIR_NAME: str = "bids_db"
+    LAYOUT_DATABASE_FILE_NAME: str = "layout_index.sqlite"
+
+    #: Cache key marking a layout database update as queued.
+    LAYOUT_UPDATE_KEY: str = "django_mri.bids.layout_update"
+
+    #: Number of seconds changes are collected for before a queued layout
+    #: database update may be queued again.
+    LAYOUT_UPDATE_DELAY: int = 60
 
     _logger = logging.getLogger("data.mri.bids")
 
     def __init__(self, bids_dir: Union[Path, str] = None) -> None:
         self.bids_dir = bids_dir or get_bids_dir()
         self.bids_dir.mkdir(exist_ok=True, parents=True)
+        self._batch = BatchState()
 
     def calculate_age(self, born: date) -> float:
         """
@@ -99,30 +146,43 @@ class BidsManager:
         }
         return subject_dict
 
-    def build_bids_path(self, scan, log_level: int = logging.DEBUG):
+    def get_single_run_bids_path(
+        self, scan, log_level: int = logging.DEBUG
+    ) -> Path:
         """
-        Uses parameters extracted by :func:`get_subject_data` to update BIDS-
-        compatible file path derived from *dicom_parser*
+        Returns the BIDS-compatible path of a scan, disregarding any other
+        runs with the same acquisition parameters. While updates are deferred
+        (see :meth:`defer_updates`), paths are cached by scan ID, so that
+        each scan's header is only read once during a conversion batch.
+
+        Parameters
+        ----------
+        scan : ~django_mri.models.scan.Scan
+            Scan to generate a BIDS path for
+        log_level : int, optional
+            Logging level, by default logging.DEBUG
 
         Returns
         -------
         pathlib.Path
-            Full path to an updated BIDS-compatible file, according to scan's
-            parameters.
+            Single run BIDS path, or None if the scan's parameters are not
+            BIDS-compatible
         """
-        # Log start.
-        start_log = logs.BUILD_BIDS_PATH_START.format(scan_id=scan.id)
-        self._logger.log(log_level, start_log)
-
+        batch = self._batch
+        if scan.id in batch.single_run_paths:
+            return batch.single_run_paths[scan.id]
+        bids_path = self._build_single_run_bids_path(scan, log_level)
+        if batch.deferral > 0:
+            batch.single_run_paths[scan.id] = bids_path
+        return bids_path
+
+    def _build_single_run_bids_path(
+        self, scan, log_level: int = logging.DEBUG
+    ) -> Path:
         # Query naive relative BIDS path, as returned by dicom_parser.
         sample_header = scan.dicom.sample_header
         default_bids_path = sample_header.build_bids_path()
-        # If no naive BIDS path could be generated, show warning.
         if default_bids_path is None:
-            no_bids_log = logs.NO_BIDS_PATH.format(
-                scan_id=scan.id, description=scan.description
-            )
-            warnings.warn(no_bids_log)
             return
         # Log the returned naive BIDS path.
         naive_bids_log = logs.NAIVE_BIDS.format(
@@ -131,7 +191,7 @@ class BidsManager:
         self._logger.log(log_level, naive_bids_log)
 
         # Replace patient ID with subject primary key.
-        subject_id = scan.session.subject.id
+        subject_id = scan.session.subject_id
         patient_id = sample_header.get("PatientID")
         subject_fix_log = logs.SUBJECT_FIX.format(
             patient_id=patient_id, subject_id=subject_id
@@ -140,123 +200,307 @@ class BidsManager:
         fixed_relative_path = default_bids_path.replace(
             f"sub-{patient_id}", f"sub-{subject_id}"
         )
-        bids_path = get_bids_dir() / fixed_relative_path
+        bids_path = self.bids_dir / fixed_relative_path
         single_run_destination_log = logs.SINGLE_RUN_DESTINATION.format(
             scan_id=scan.id, destination=bids_path
         )
         self._logger.log(log_level, single_run_destination_log)
+        return bids_path
 
-        # Check for existing runs with the same acquisition parameters.
-        acquisition_labels = bids_path.name.split("_")
-        datatype = bids_path.parent.name
-        existing_query = Q(path__contains=f"/{datatype}/")
-        for i, label in enumerate(acquisition_labels):
-            if i == 0:
-                label = label + "_"
-            elif i + 1 == len(acquisition_labels):
-                label = "_" + label
-            else:
-                label = f"_{label}_"
-            existing_query &= Q(path__contains=label)
-        self._logger.log(
-            log_level,
-            f"Checking for an existing NIfTI files with identical labels ({acquisition_labels})",  # noqa: E501
+    def insert_run_label(self, path: Path, index: int) -> Path:
+        """
+        Inserts a run label into a BIDS-compatible path.
+
+        Parameters
+        ----------
+        path : pathlib.Path
+            Single run BIDS path
+        index : int
+            Run index
+
+        Returns
+        -------
+        pathlib.Path
+            BIDS path including the run label
+        """
+        run_label = self.RUN_LABEL_TEMPLATE.format(index=index)
+        name_parts = path.name.split("_")
+        insert_position = -2 if "inv" in path.name else -1
+        name_parts.insert(insert_position, run_label)
+        return path.parent / "_".join(name_parts)
+
+    def get_run_candidates(self, scan) -> QuerySet:
+        """
+        Returns the scans that may be other runs of the provided *scan*'s
+        acquisition, i.e. scans from the same session with the same DICOM
+        sequence type, so that the headers of unrelated scans are not read.
+
+        Parameters
+        ----------
+        scan : ~django_mri.models.scan.Scan
+            Scan to find other runs of
+
+        Returns
+        -------
+        QuerySet
+            Scans possibly sharing the scan's single run BIDS path
+        """
+        Scan = apps.get_model("django_mri", "Scan", require_ready=False)
+        if scan.dicom is None:
+            return Scan.objects.none()
+        return Scan.objects.filter(
+            session_id=scan.session_id,
+            dicom__isnull=False,
+            dicom__sequence_type=scan.dicom.sequence_type,
         )
-        existing = NIfTI.objects.filter(existing_query)
-        if not existing.exists():
-            self._logger.log(
-                log_level, "No existing NIfTI file found! All done."
+
+    def group_bids_runs(
+        self,
+        scans: Iterable,
+        log_level: int = logging.DEBUG,
+        session_scans: QuerySet = None,
+    ) -> Dict[Path, list]:
+        """
+        Groups all scans from the sessions of the provided *scans* by their
+        single run BIDS path. Scans within the same session sharing a single
+        run BIDS path are different runs of the same acquisition.
+
+        Parameters
+        ----------
+        scans : Iterable
+            Scans to group the sessions of
+        log_level : int, optional
+            Logging level, by default logging.DEBUG
+        session_scans : QuerySet, optional
+            Scans to group instead of the sessions' scans (e.g. see
+            :meth:`get_run_candidates`), by default None
+
+        Returns
+        -------
+        Dict[Path, list]
+            Scans by single run BIDS path, ordered by scan number
+        """
+        Scan = apps.get_model("django_mri", "Scan", require_ready=False)
+        if isinstance(scans, QuerySet):
+            session_ids = set(scans.values_list("session_id", flat=True))
+        else:
+            session_ids = {scan.session_id for scan in scans}
+        plan_log = logs.BIDS_PLAN_START.format(n_sessions=len(session_ids))
+        self._logger.log(log_level, plan_log)
+        if session_scans is None:
+            session_scans = Scan.objects.filter(
+                session_id__in=session_ids, dicom__isnull=False
             )
-            return bids_path
+        session_scans = session_scans.select_related(
+            "dicom", "session", "_nifti"
+        ).order_by("number")
+        groups = defaultdict(list)
+        for scan in session_scans:
+            bids_path = self.get_single_run_bids_path(
+                scan, log_level=log_level
+            )
+            if bids_path is not None:
+                groups[bids_path].append(scan)
+        return groups
+
+    def plan_bids_paths(
+        self,
+        scans: Iterable,
+        log_level: int = logging.DEBUG,
+        session_scans: QuerySet = None,
+    ) -> Dict[Any, Path]:
+        """
+        Computes the BIDS-compatible paths of the provided *scans* and any
+        other runs of the same acquisitions in a single pass. Run indices are
+        assigned by scan number.
+
+        Parameters
+        ----------
+        scans : Iterable
+            Scans to plan BIDS paths for
+        log_level : int, optional
+            Logging level, by default logging.DEBUG
+        session_scans : QuerySet, optional
+            Scans to plan other runs from (see :meth:`group_bids_runs`), by
+            default None
+
+        Returns
+        -------
+        Dict[Any, Path]
+            BIDS path (without file extensions) by scan
+        """
+        if isinstance(scans, QuerySet):
+            scan_ids = set(scans.values_list("id", flat=True))
         else:
-            if existing.count() == 1:
-                existing = existing.first()
-                existing_path = Path(existing.path.split(".")[0])
-                self._logger.log(
-                    log_level,
-                    f"Existing NIfTI (#{existing.id}) found at {existing.path}!",  # noqa: E501
-                )
-                if scan._nifti == existing:
-                    self._logger.log(
-                        log_level,
-                        "Existing NIfTI instance belongs to queried scan!",
-                    )
-                    return bids_path
-                self._logger.log(
-                    log_level,
-                    f"Checking for an existing run label in scan #{scan.id}.",
-                )
-                try:
-                    existing_run_label = re.findall(
-                        self.RUN_LABEL_PATTERN, str(existing_path)
-                    )[0]
-                except IndexError:
-                    self._logger.log(log_level, "No existing run label found.")
-                    self._logger.log(
-                        log_level,
-                        f"Renaming existing NIfTI (#{existing.id}) to include run label.",  # noqa: E501
-                    )
-                    existing_run_label = self.RUN_LABEL_TEMPLATE.format(
-                        index=1
-                    )
-                    name_parts = Path(existing.path).name.split("_")
-                    insert_position = -2 if "inv" in existing_path.name else -1
-                    name_parts.insert(insert_position, existing_run_label)
-                    name_with_run = "_".join(name_parts)
-                    updated_path = existing_path.parent / name_with_run
-                    existing.rename(updated_path)
-                    self._logger.log(
-                        log_level,
-                        f"Scan #{scan.id} successfully moved to {updated_path}",  # noqa: E501
-                    )
-                    new_run_label = self.RUN_LABEL_TEMPLATE.format(index=2)
-                    bids_path = (
-                        updated_path.parent / updated_path.name.split(".")[0]
-                    )
-                else:
-                    self._logger.log(
-                        log_level,
-                        f"Existing run label found: {existing_run_label}",
-                    )
-                    existing_run_index = int(existing_run_label.split("-")[-1])
-                    index = existing_run_index + 1
-                    new_run_label = self.RUN_LABEL_TEMPLATE.format(index=index)
-                    self._logger.log(
-                        log_level, f"New run label: {new_run_label}"
-                    )
-            else:
-                self._logger.log(
-                    log_level,
-                    "Multiple existing NIfTI files found with the queried parameters.",  # noqa: E501
-                )
-                scan_numbers = list(
-                    existing.values_list("scan__number", flat=True)
-                )
-                self._logger.log(
-                    log_level, f"Found existing scan numbers: {scan_numbers}"
-                )
-                scan_numbers.append(scan.number)
-                scan_numbers = sorted(scan_numbers)
-                self._logger.log(
-                    log_level, f"Current scan's scan number: {scan.number}"
-                )
-                index = scan_numbers.index(scan.number) + 1
-                self._logger.log(
-                    log_level,
-                    f"Scan run index by scan number found to be {index}.",
+            scan_ids = {scan.id for scan in scans}
+        plan = {}
+        groups = self.group_bids_runs(
+            scans, log_level=log_level, session_scans=session_scans
+        )
+        for bids_path, runs in groups.items():
+            if not any(run.id in scan_ids for run in runs):
+                continue
+            if len(runs) == 1:
+                plan[runs[0]] = bids_path
+                continue
+            runs_log = logs.BIDS_PLAN_RUNS.format(
+                n_runs=len(runs), destination=bids_path
+            )
+            self._logger.log(log_level, runs_log)
+            for index, run in enumerate(runs, start=1):
+                plan[run] = self.insert_run_label(bids_path, index)
+        return plan
+
+    def apply_bids_plan(
+        self,
+        plan: Dict[Any, Path],
+        progressbar: bool = False,
+        log_level: int = logging.DEBUG,
+    ) -> int:
+        """
+        Moves any existing NIfTI files associated with the planned scans (see
+        :meth:`plan_bids_paths`) to their planned location. Database updates
+        are applied in a single transaction, and files occupying another
+        file's destination are first moved to a temporary path.
+
+        Parameters
+        ----------
+        plan : Dict[Any, Path]
+            BIDS path by scan
+        progressbar : bool, optional
+            Whether to display a progressbar, by default False
+        log_level : int, optional
+            Logging level, by default logging.DEBUG
+
+        Returns
+        -------
+        int
+            Number of moved NIfTI instances
+        """
+        moves = {}
+        for scan, bids_path in plan.items():
+            nifti = scan._nifti
+            if nifti is None:
+                continue
+            current_path = Path(nifti.path)
+            expected_path = bids_path.with_suffix(
+                "".join(current_path.suffixes)
+            )
+            if expected_path != current_path:
+                moves[nifti] = expected_path
+        if not moves:
+            return 0
+        start_log = logs.BIDS_RENAME_START.format(count=len(moves))
+        self._logger.log(log_level, start_log)
+        destinations = set(moves.values())
+        renames = []
+        try:
+            with transaction.atomic():
+                for nifti in moves:
+                    current_path = Path(nifti.path)
+                    if current_path in destinations:
+                        tmp_destination = current_path.parent / (
+                            "_" + current_path.name
+                        )
+                        renames.append((nifti, current_path, tmp_destination))
+                        nifti.rename(tmp_destination, log_level=log_level)
+                iterator = (
+                    tqdm(moves.items(), unit="file", desc="BIDS")
+                    if progressbar
+                    else moves.items()
                 )
-                new_run_label = self.RUN_LABEL_TEMPLATE.format(index=index)
-                name_parts = Path(bids_path).name.split("_")
-                insert_position = -2 if "inv" in Path(bids_path).name else -1
-                name_parts.insert(insert_position, new_run_label)
-                name_with_run = "_".join(name_parts)
-                self._logger.log(
-                    log_level, f"Updated current file name to: {name_with_run}"
+                for nifti, expected_path in iterator:
+                    renames.append((nifti, Path(nifti.path), expected_path))
+                    nifti.rename(expected_path, log_level=log_level)
+        except Exception:
+            self.undo_renames(renames, log_level=log_level)
+            raise
+        return len(moves)
+
+    def undo_renames(
+        self, renames: List[tuple], log_level: int = logging.DEBUG
+    ) -> None:
+        """
+        Moves files back to their original paths after a failed
+        :meth:`apply_bids_plan` transaction was rolled back, in reverse
+        order, so that the files match the restored database paths.
+
+        Parameters
+        ----------
+        renames : List[tuple]
+            NIfTI instance, source path, and destination path of each
+            attempted rename
+        log_level : int, optional
+            Logging level, by default logging.DEBUG
+        """
+        for nifti, source, destination in reversed(renames):
+            if not destination.exists() or source.exists():
+                continue
+            undo_log = logs.BIDS_RENAME_UNDO.format(
+                nifti_id=nifti.id, source=source, destination=destination
+            )
+            self._logger.log(log_level, undo_log)
+            nifti.path = str(destination)
+            try:
+                nifti.rename(source, log_level=log_level)
+            except Exception as exception:
+                failure_log = logs.BIDS_RENAME_UNDO_FAILURE.format(
+                    nifti_id=nifti.id, path=destination, exception=exception
                 )
-                return bids_path.parent / name_with_run
-            return Path(
-                str(bids_path).replace(existing_run_label, new_run_label)
+                self._logger.warning(failure_log)
+
+    def build_bids_path(
+        self,
+        scan,
+        plan: Dict[Any, Path] = None,
+        log_level: int = logging.DEBUG,
+    ):
+        """
+        Returns a BIDS-compatible file path for the provided *scan*, including
+        a run label if its session contains other runs of the same
+        acquisition. Existing NIfTI files of other runs are moved to their
+        run-labeled paths if required.
+
+        Parameters
+        ----------
+        scan : ~django_mri.models.scan.Scan
+            Scan to generate a BIDS path for
+        plan : Dict[Any, Path], optional
+            A plan including the scan (see :meth:`plan_bids_paths`), by
+            default None (plans the scan's acquisition runs among its run
+            candidates, see :meth:`get_run_candidates`)
+        log_level : int, optional
+            Logging level, by default logging.DEBUG
+
+        Returns
+        -------
+        pathlib.Path
+            Full path to an updated BIDS-compatible file, according to scan's
+            parameters.
+        """
+        # Log start.
+        start_log = logs.BUILD_BIDS_PATH_START.format(scan_id=scan.id)
+        self._logger.log(log_level, start_log)
+        if plan is None:
+            plan = self.plan_bids_paths(
+                [scan],
+                log_level=log_level,
+                session_scans=self.get_run_candidates(scan),
+            )
+        bids_path = plan.get(scan)
+        # If no BIDS path could be generated, show warning.
+        if bids_path is None:
+            no_bids_log = logs.NO_BIDS_PATH.format(
+                scan_id=scan.id, description=scan.description
             )
+            warnings.warn(no_bids_log)
+            return
+        # Move any existing runs of the same acquisition.
+        other_runs = {
+            other: path for other, path in plan.items() if other != scan
+        }
+        self.apply_bids_plan(other_runs, log_level=log_level)
+        return bids_path
 
     def fix_functional_json(self, nifti: NIfTI):
         """
@@ -284,16 +528,53 @@ class BidsManager:
             f.seek(0)
             json.dump(data, f, indent=4)
             f.truncate()
+        # Cached sidecar keys are read again with the updated file.
+        nifti.invalidate_header_cache()
+        nifti.save(update_fields=["header_cache"])
 
-    def modify_fieldmaps(self, nifti: NIfTI):
+    def get_fieldmap_targets(self, plan: Dict[Any, Path]) -> List[Path]:
         """
-        Add required "IntendedFor" field to fieldmaps, as stated in BIDS
-        stucture.
+        Returns the paths of a session's "IntendedFor" targets, as computed
+        from its planned BIDS paths (see :meth:`plan_bids_paths`). Scans that
+        have not been converted yet are included by their planned path.
 
         Parameters
         ----------
-        bids_path : Path
-            Path to the BIDS-compatible directory
+        plan : Dict[Any, Path]
+            BIDS path by scan for all of the session's scans
+
+        Returns
+        -------
+        List[Path]
+            Target NIfTI paths
+        """
+        targets = []
+        for scan, bids_path in plan.items():
+            if bids_path.parent.name not in self.EPI_DATATYPES:
+                continue
+            nifti = scan._nifti
+            if nifti is not None and self.bids_dir in Path(nifti.path).parents:
+                targets.append(Path(nifti.path))
+            else:
+                targets.append(bids_path.with_suffix(self.NIFTI_EXTENSION))
+        return sorted(targets)
+
+    def update_fieldmaps(self, session_id: int) -> int:
+        """
+        Writes the required "IntendedFor" field of a session's converted
+        fieldmaps, as stated in BIDS stucture. Targets are computed from the
+        database (see :meth:`get_fieldmap_targets`), so fieldmaps do not
+        depend on their targets' conversion order.
+
+        Parameters
+        ----------
+        session_id : int
+            Session primary key
+
+        Returns
+        -------
+        int
+            Number of updated fieldmaps
 
         References
         ----------
@@ -302,28 +583,72 @@ class BidsManager:
         .. _BIDS MRI specification:
             https://bids-specification.readthedocs.io/en/stable/04-modality-specific-files/01-magnetic-resonance-imaging-data.html
         """
-        bids_path = Path(nifti.path)
-        base_name = bids_path.name.split(".")[0]
-        json_path = bids_path.parent / f"{base_name}.json"
-        session_dir = json_path.parent.parent
-        for data_type_target in self.EPI_DATATYPES:
-            target_pattern = f"{data_type_target}/*.nii*"
-            targets = [p for p in session_dir.glob(target_pattern)]
-            if targets:
-                targets = [
-                    str(t.relative_to(session_dir.parent)) for t in targets
-                ]
-                with open(json_path, "r") as json_file:
-                    data = json.load(json_file)
-                intended_for = data.get("IntendedFor", [])
-                intended_for += [t for t in targets if t not in intended_for]
-                data["IntendedFor"] = intended_for
-                with open(json_path, "w") as json_file:
-                    json.dump(data, json_file, indent=4)
-            else:
+        Scan = apps.get_model("django_mri", "Scan", require_ready=False)
+        scans = Scan.objects.filter(session_id=session_id).select_related(
+            "_nifti"
+        )
+        plan = self.plan_bids_paths(scans)
+        targets = self.get_fieldmap_targets(plan)
+        fieldmaps = [
+            scan._nifti
+            for scan, bids_path in plan.items()
+            if bids_path.parent.name == self.FIELDMAP_DATATYPE
+            and scan._nifti is not None
+        ]
+        for nifti in fieldmaps:
+            fieldmap = Path(nifti.path)
+            if not targets:
                 warnings.warn(
-                    f"No target file for {bids_path} could be found!"
+                    f"No target file for {fieldmap} could be found!"
                 )
+                continue
+            subject_dir = next(
+                parent
+                for parent in fieldmap.parents
+                if parent.name.startswith("sub-")
+            )
+            base_name = fieldmap.name.split(".")[0]
+            json_path = fieldmap.parent / f"{base_name}.json"
+            with open(json_path, "r") as json_file:
+                data = json.load(json_file)
+            data["IntendedFor"] = [
+                str(target.relative_to(subject_dir)) for target in targets
+            ]
+            with open(json_path, "w") as json_file:
+                json.dump(data, json_file, indent=4)
+            nifti.invalidate_header_cache()
+            nifti.save(update_fields=["header_cache"])
+        return len(fieldmaps)
+
+    def modify_fieldmaps(self, nifti: NIfTI):
+        """
+        Registers the fieldmap's session for an "IntendedFor" update (see
+        :meth:`update_fieldmaps`). Unless updates are deferred (see
+        :meth:`defer_updates`), the session is updated immediately.
+
+        Parameters
+        ----------
+        nifti : NIfTI
+            Converted fieldmap
+        """
+        self._batch.fieldmap_sessions.add(nifti.scan.session_id)
+        if not self._batch.deferral:
+            self.flush_fieldmaps()
+
+    def flush_fieldmaps(self) -> int:
+        """
+        Updates the fieldmaps of any registered sessions, once per session.
+
+        Returns
+        -------
+        int
+            Number of updated fieldmaps
+        """
+        session_ids = self._batch.fieldmap_sessions
+        self._batch.fieldmap_sessions = set()
+        return sum(
+            self.update_fieldmaps(session_id) for session_id in session_ids
+        )
 
     def postprocess(self, nifti: NIfTI):
         """
@@ -345,20 +670,19 @@ class BidsManager:
         if sequence_type in ["func_fieldmap"]:
             self.modify_fieldmaps(nifti)
         self.set_participant_tsv_and_json(nifti.scan)
+        self.mark_layout_stale()
 
     def set_participant_tsv_and_json(self, scan):
         """
-        Generates recommended "participants.tsv" by either copying the
-        template from TEMPLATES_DiR or editing an existing one under {parent}
-        directory.
+        Registers the scan's subject to be listed in the "participants.tsv"
+        file (created by copying the template from TEMPLATES_DIR if missing).
+        Unless updates are deferred (see :meth:`defer_updates`), the file is
+        updated immediately.
 
         Parameters
         ----------
-        parent : Path
-            BIDS-compatible directory, underwhich there are "sub-x" directories
-        subject_dict : dict
-            Subject's parameters dictionary, containing "participant_id",
-            "handedness","age","sex" fields
+        scan : ~django_mri.models.scan.Scan
+            Converted scan
 
         References
         ----------
@@ -367,29 +691,81 @@ class BidsManager:
         .. _BIDS complementary files:
             https://bids-specification.readthedocs.io/en/stable/03-modality-agnostic-files.html
         """
-
         subject_dict = self.get_subject_data(scan)
+        participant_id = f"sub-{subject_dict['participant_id']}"
+        subject_dict["participant_id"] = participant_id
+        self._batch.participants[participant_id] = subject_dict
+        if not self._batch.deferral:
+            self.flush_participants()
+
+    @contextmanager
+    def defer_updates(self):
+        """
+        Defers dataset-level postprocessing ("participants.tsv", fieldmap
+        "IntendedFor" and layout database updates) until the context exits,
+        so that batch conversions update each file once. Single run BIDS
+        paths are cached within the context (see
+        :meth:`get_single_run_bids_path`). Updates are only deferred for the
+        calling thread (see :class:`BatchState`).
+        """
+        batch = self._batch
+        batch.deferral += 1
+        try:
+            yield
+        finally:
+            batch.deferral -= 1
+            if not batch.deferral:
+                try:
+                    self.flush_fieldmaps()
+                    self.flush_participants()
+                    self.flush_layout_update()
+                finally:
+                    batch.single_run_paths = {}
+
+    def flush_participants(self) -> int:
+        """
+        Appends any registered participants missing from "participants.tsv".
+        The file is locked while being updated and is replaced atomically.
 
+        Returns
+        -------
+        int
+            Number of added participants
+        """
+        pending = self._batch.participants
+        self._batch.participants = {}
+        if not pending:
+            return 0
         participants_tsv = self.bids_dir / self.PARTICIPANTS_FILE_NAME
         participants_json = participants_tsv.with_suffix(".json")
-        for participants_file in [participants_tsv, participants_json]:
-            if not participants_file.is_file():
-                participants_template = TEMPLATES_DIR / participants_file.name
-                shutil.copy(str(participants_template), str(participants_file))
-        participants_df = pd.read_csv(participants_tsv, sep="\t")
-        subject_dict[
-            "participant_id"
-        ] = f"sub-{subject_dict['participant_id']}"
-        if (
-            not subject_dict["participant_id"]
-            in participants_df["participant_id"].values
-        ):
-            participants_df = participants_df.append(
-                pd.DataFrame(subject_dict, index=[0]), ignore_index=True
-            )
-            participants_df.to_csv(participants_tsv, sep="\t", index=False)
-        else:
-            pass
+        lock_name = f".{participants_tsv.name}.lock"
+        lock_path = participants_tsv.with_name(lock_name)
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            for participants_file in [participants_tsv, participants_json]:
+                if not participants_file.is_file():
+                    template = TEMPLATES_DIR / participants_file.name
+                    shutil.copy(str(template), str(participants_file))
+            with open(participants_tsv, newline="") as tsv_file:
+                rows = list(csv.reader(tsv_file, delimiter="\t"))
+            columns = rows[0]
+            existing = {row[0] for row in rows[1:] if row}
+            new_rows = [
+                [str(data.get(column, self.NA_LABEL)) for column in columns]
+                for participant_id, data in pending.items()
+                if participant_id not in existing
+            ]
+            if new_rows:
+                temporary_path = participants_tsv.with_name(
+                    f".{participants_tsv.name}.{uuid4().hex[:8]}"
+                )
+                with open(temporary_path, "w", newline="") as tsv_file:
+                    writer = csv.writer(
+                        tsv_file, delimiter="\t", lineterminator="\n"
+                    )
+                    writer.writerows(rows + new_rows)
+                os.replace(temporary_path, participants_tsv)
+        return len(new_rows)
 
     def set_description_json(self):
         """
@@ -442,3 +818,169 @@ class BidsManager:
         self.set_description_json()
         self.generate_bidsignore()
         self.generate_readme()
+
+    def get_layout_database_dir(self) -> Path:
+        """
+        Returns the directory of the dataset's PyBIDS layout database, set by
+        the *BIDS_DATABASE_DIR* setting (by default a *bids_db* directory
+        next to the BIDS directory). The directory must be accessible to BIDS
+        apps at the same path.
+
+        Returns
+        -------
+        Path
+            Layout database directory
+        """
+        default = self.bids_dir.parent / self.LAYOUT_DATABASE_DIR_NAME
+        return Path(getattr(settings, "BIDS_DATABASE_DIR", default))
+
+    def get_layout_stale_marker(self) -> Path:
+        """
+        Returns the path of the file marking the layout database as stale.
+
+        Returns
+        -------
+        Path
+            Stale marker path
+        """
+        database_dir = self.get_layout_database_dir()
+        return database_dir.with_name(f"{database_dir.name}.stale")
+
+    def mark_layout_stale(self) -> None:
+        """
+        Marks the layout database as stale after files in the BIDS directory
+        were created or moved, and queues its update (see
+        :meth:`schedule_layout_update`). Unless updates are deferred (see
+        :meth:`defer_updates`), the update is queued immediately.
+        """
+        marker = self.get_layout_stale_marker()
+        marker.parent.mkdir(parents=True, exist_ok=True)
+        marker.touch()
+        self._batch.layout_update = True
+        if not self._batch.deferral:
+            self.flush_layout_update()
+
+    def flush_layout_update(self) -> bool:
+        """
+        Queues a layout database update if the layout was marked stale since
+        the last flush.
+
+        Returns
+        -------
+        bool
+            Whether an update was queued
+        """
+        pending = self._batch.layout_update
+        self._batch.layout_update = False
+        return self.schedule_layout_update() if pending else False
+
+    def schedule_layout_update(self) -> bool:
+        """
+        Queues the :func:`~django_mri.tasks.update_bids_layout_database` task
+        once the current transaction is committed, unless layout databases
+        are disabled (see :meth:`get_layout_database`) or an update was
+        queued in the last :attr:`LAYOUT_UPDATE_DELAY` seconds. The task is
+        delayed beyond that period, so that it indexes any changes made in
+        the meantime. Failures to reach the task broker are logged rather
+        than raised.
+
+        Returns
+        -------
+        bool
+            Whether an update was queued
+        """
+        if not getattr(settings, "USE_BIDS_DATABASE", True):
+            return False
+        timeout = self.LAYOUT_UPDATE_DELAY
+        if not cache.add(self.LAYOUT_UPDATE_KEY, True, timeout=timeout):
+            return False
+        transaction.on_commit(self._queue_layout_update)
+        return True
+
+    def _queue_layout_update(self) -> None:
+        from django_mri.tasks import update_bids_layout_database
+
+        countdown = self.LAYOUT_UPDATE_DELAY + 1
+        try:
+            update_bids_layout_database.apply_async(countdown=countdown)
+        except Exception as exception:
+            cache.delete(self.LAYOUT_UPDATE_KEY)
+            message = logs.BIDS_LAYOUT_SCHEDULE_FAILURE.format(
+                exception=exception
+            )
+            self._logger.warning(message)
+
+    def get_layout_database(self) -> Path:
+        """
+        Returns the layout database directory if it is up to date, to be
+        passed to BIDS apps (e.g. using *--bids-database-dir*). Layout
+        databases may be disabled by setting *USE_BIDS_DATABASE* to False.
+
+        Returns
+        -------
+        Path
+            Layout database directory, or None if unavailable
+        """
+        if not getattr(settings, "USE_BIDS_DATABASE", True):
+            return None
+        database_dir = self.get_layout_database_dir()
+        database_file = database_dir / self.LAYOUT_DATABASE_FILE_NAME
+        is_stale = self.get_layout_stale_marker().exists()
+        if database_file.exists() and not is_stale:
+            return database_dir
+        return None
+
+    def update_layout_database(
+        self, force: bool = False, log_level: int = logging.DEBUG
+    ) -> Path:
+        """
+        Re-indexes the BIDS directory into the layout database if it is
+        stale. The new database is created in a temporary directory and then
+        replaces the existing one, so that running jobs are not affected.
+
+        Parameters
+        ----------
+        force : bool, optional
+            Whether to re-index an up to date database, by default False
+        log_level : int, optional
+            Logging level, by default logging.DEBUG
+
+        Returns
+        -------
+        Path
+            Layout database directory
+        """
+        database_dir = self.get_layout_database_dir()
+        database_dir.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = database_dir.with_name(f"{database_dir.name}.lock")
+        with open(lock_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            if not force and self.get_layout_database():
+                return database_dir
+            start_log = logs.BIDS_LAYOUT_UPDATE_START.format(
+                bids_dir=self.bids_dir, database_dir=database_dir
+            )
+            self._logger.log(log_level, start_log)
+            started = time.time()
+            name = database_dir.name
+            temporary_dir = database_dir.with_name(f"{name}.{uuid4().hex[:8]}")
+            BIDSLayout(
+                str(self.bids_dir),
+                validate=False,
+                database_path=str(temporary_dir),
+                reset_database=True,
+            )
+            previous_dir = database_dir.with_name(f"{name}.previous")
+            if database_dir.exists():
+                database_dir.rename(previous_dir)
+            temporary_dir.rename(database_dir)
+            shutil.rmtree(previous_dir, ignore_errors=True)
+            # Changes made while indexing leave the database stale.
+            marker = self.get_layout_stale_marker()
+            if marker.exists() and marker.stat().st_mtime < started:
+                marker.unlink()
+            end_log = logs.BIDS_LAYOUT_UPDATE_END.format(
+                duration=time.time() - started
+            )
+            self._logger.log(log_level, end_log)
+        return database_dir
@@ -0,0 +1,74 @@
+"""
+Utilities for parsing BIDS entities from file paths.
+
+References
+----------
+* `BIDS entities`_
+
+.. _BIDS entities:
+   https://bids-specification.readthedocs.io/en/stable/appendices/entities.html
+"""
+from pathlib import Path
+from typing import Dict, Union
+
+#: BIDS datatype directory names.
+BIDS_DATATYPES = {
+    "anat",
+    "beh",
+    "dwi",
+    "eeg",
+    "fmap",
+    "func",
+    "ieeg",
+    "meg",
+    "perf",
+    "pet",
+}
+
+#: Map of BIDS entity keys to the :class:`~django_mri.models.nifti.NIfTI`
+#: fields in which they are stored.
+BIDS_ENTITY_FIELDS: Dict[str, str] = {
+    "sub": "bids_subject",
+    "ses": "bids_session",
+    "task": "bids_task",
+    "acq": "bids_acquisition",
+    "dir": "bids_direction",
+    "run": "bids_run",
+}
+
+
+def parse_bids_entities(path: Union[Path, str]) -> dict:
+    """
+    Parses the BIDS entities of the provided file path into a dictionary
+    keyed by :class:`~django_mri.models.nifti.NIfTI` field names. Entities
+    missing from the path are returned as None.
+
+    Parameters
+    ----------
+    path : Union[Path, str]
+        File path
+
+    Returns
+    -------
+    dict
+        Parsed entities
+    """
+    path = Path(path)
+    stem = path.name.split(".")[0]
+    entities = {field: None for field in BIDS_ENTITY_FIELDS.values()}
+    entities["stem"] = stem
+    datatype = path.parent.name
+    is_datatype = datatype in BIDS_DATATYPES
+    entities["bids_datatype"] = datatype if is_datatype else None
+    entities["bids_suffix"] = None
+    parts = stem.split("_")
+    for part in parts:
+        key, separator, value = part.partition("-")
+        field = BIDS_ENTITY_FIELDS.get(key)
+        if separator and field:
+            if field == "bids_run":
+                value = int(value) if value.isdigit() else None
+            entities[field] = value
+    if len(parts) > 1 and "-" not in parts[-1]:
+        entities["bids_suffix"] = parts[-1]
+    return entities
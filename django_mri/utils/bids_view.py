@@ -0,0 +1,136 @@
+"""
+Definition of the :class:`BidsView` class, used to materialize lightweight
+per-job BIDS datasets containing only the processed participants.
+"""
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, List
+from uuid import uuid4
+
+from django.apps import apps
+from django.conf import settings
+from django_mri.utils import logs
+from django_mri.utils.utils import get_bids_dir, get_mri_root
+
+#: Name of the directory (under the MRI root) containing BIDS views.
+BIDS_VIEWS_DIR_NAME: str = "bids_views"
+
+#: Sidecar files linked alongside each NIfTI file.
+SIDECAR_EXTENSIONS: Iterable[str] = (".json", ".bval", ".bvec")
+
+
+class BidsView:
+    """
+    A temporary BIDS dataset of symbolic links to the registered NIfTI files
+    (and their sidecars) of the provided participants, as well as the
+    top-level files of the full dataset (e.g. *dataset_description.json* and
+    *participants.tsv*). The view is built from the database, so that BIDS
+    apps index only the processed participants rather than the whole archive.
+
+    The original dataset must be accessible at its original path for the
+    links to resolve (e.g. bound at the same path within containers).
+    Views may be disabled by setting *USE_BIDS_VIEWS* to False, in which case
+    the full dataset is used.
+    """
+
+    _logger = logging.getLogger("data.mri.bids")
+
+    def __init__(
+        self,
+        subject_ids: Iterable[str],
+        bids_dir: Path = None,
+        root: Path = None,
+    ):
+        """
+        Initializes a new :class:`BidsView` instance.
+
+        Parameters
+        ----------
+        subject_ids : Iterable[str]
+            Participant labels (without the "sub-" prefix)
+        bids_dir : Path, optional
+            Full BIDS dataset, by default the MRI root's *rawdata* directory
+        root : Path, optional
+            Directory to create views in, by default the MRI root's
+            *bids_views* directory
+        """
+        self.subject_ids = [str(subject_id) for subject_id in subject_ids]
+        self.bids_dir = Path(bids_dir or get_bids_dir())
+        root = Path(root or get_mri_root() / BIDS_VIEWS_DIR_NAME)
+        self.path = root / f"view-{uuid4().hex[:8]}"
+        self.enabled = getattr(settings, "USE_BIDS_VIEWS", True)
+
+    def get_nifti_paths(self) -> List[Path]:
+        """
+        Returns the paths of the participants' NIfTI files within the full
+        dataset.
+
+        Returns
+        -------
+        List[Path]
+            NIfTI file paths
+        """
+        NIfTI = apps.get_model("django_mri", "NIfTI")
+        paths = NIfTI.objects.filter(
+            bids_subject__in=self.subject_ids,
+            path__startswith=str(self.bids_dir),
+        ).values_list("path", flat=True)
+        return [Path(path) for path in paths]
+
+    def get_linked_paths(self) -> List[Path]:
+        """
+        Returns the paths of all files to be linked into the view.
+
+        Returns
+        -------
+        List[Path]
+            Linked file paths
+        """
+        with os.scandir(self.bids_dir) as entries:
+            paths = [Path(entry.path) for entry in entries if entry.is_file()]
+        for path in self.get_nifti_paths():
+            paths.append(path)
+            stem = path.name.split(".")[0]
+            for extension in SIDECAR_EXTENSIONS:
+                sidecar = path.with_name(stem + extension)
+                if sidecar.exists():
+                    paths.append(sidecar)
+        return paths
+
+    def materialize(self) -> Path:
+        """
+        Creates the view.
+
+        Returns
+        -------
+        Path
+            View directory
+        """
+        if not self.enabled:
+            return self.bids_dir
+        paths = self.get_linked_paths()
+        for path in paths:
+            link = self.path / path.relative_to(self.bids_dir)
+            link.parent.mkdir(parents=True, exist_ok=True)
+            link.symlink_to(path)
+        message = logs.BIDS_VIEW_CREATED.format(
+            n_files=len(paths),
+            n_subjects=len(self.subject_ids),
+            path=self.path,
+        )
+        self._logger.debug(message)
+        return self.path
+
+    def cleanup(self) -> None:
+        """
+        Removes the view (the linked files are not affected).
+        """
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self) -> Path:
+        return self.materialize()
+
+    def __exit__(self, *args) -> None:
+        self.cleanup()
@@ -6,4 +6,15 @@ NO_BIDS_PATH: str = "BIDS path could not be derived from scan #{scan_id}'s ({des
 NAIVE_BIDS: str = "Naive relative path generated by dicom_parser based on DICOM metadata: {relative_path}"
 SUBJECT_FIX: str = "Replacing Patient ID ({patient_id}) with subject primary key ({subject_id})..."
 SINGLE_RUN_DESTINATION: str = "BIDS destination for scan #{scan_id} is: {destination}"
+BIDS_PLAN_START: str = "Planning BIDS paths for the scans of {n_sessions} sessions..."
+BIDS_PLAN_RUNS: str = "{n_runs} runs found for {destination}, assigning run labels by scan number."
+BIDS_RENAME_START: str = "Moving {count} NIfTI instances to their planned BIDS paths..."
+BIDS_RENAME_UNDO: str = "Moving NIfTI #{nifti_id} back from {destination} to {source}..."
+BIDS_RENAME_UNDO_FAILURE: str = "Failed to move NIfTI #{nifti_id} back, the file remains at {path}!\n{exception}"
+BIDS_VIEW_CREATED: str = "Linked {n_files} files of {n_subjects} participants into BIDS view at {path}."
+BIDS_LAYOUT_UPDATE_START: str = "Indexing {bids_dir} into the PyBIDS layout database at {database_dir}..."
+BIDS_LAYOUT_UPDATE_END: str = "PyBIDS layout database updated in {duration:.1f} seconds."
+BIDS_LAYOUT_SCHEDULE_FAILURE: str = "Failed to queue a PyBIDS layout database update!\n{exception}"
+PREVIEW_CREATED: str = "Created NIfTI #{nifti_id} previews in {preview_dir}."
+PREVIEW_SCHEDULE_FAILURE: str = "Failed to queue NIfTI #{nifti_id} preview creation!\n{exception}"
 # flake8: noqa: E501
@@ -4,5 +4,7 @@ A module storing strings used to display messages.
 
 BIDS_NO_SEQUENCE_TYPE: str = "Given scan doesn't have a sequence type definition, which makes it impossible to determine its BIDS-compatible destination."
 BIDS_NO_ACQ_LABEL: str = "Data type target (acq) could not be found in: {base_name}!"
+PREVIEW_NO_NIFTI: str = "Scan #{scan_id} has not been converted to NIfTI yet, a preview will be available once it is."
+PREVIEW_PENDING: str = "Scan #{scan_id}'s preview is being generated, please try again shortly."
 
 # flake8: noqa: E501
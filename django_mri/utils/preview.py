@@ -0,0 +1,320 @@
+"""
+Generation and caching of downsampled scan preview artifacts.
+
+Previews are created once per NIfTI file (asynchronously, when first
+requested or after conversion if the *GENERATE_PREVIEWS* setting is enabled)
+and stored under the preview root, keyed by the NIfTI instance's ID and the
+file's modification time, so that requests only ever serve files from disk.
+"""
+import fcntl
+import logging
+import math
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Tuple
+
+import nibabel as nib
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from matplotlib.figure import Figure
+from nilearn.plotting import cm, view_img
+
+from django_mri.utils import logs
+from django_mri.utils.utils import get_mri_root
+
+#: The name of the subdirectory under the MRI data root in which previews
+#: will be saved.
+DEFAULT_PREVIEW_DIR_NAME: str = "previews"
+
+#: Mid-slices image artifact name.
+SLICES: str = "slices.png"
+
+#: Downsampled volume (mean volume for 4D images) artifact name.
+THUMBNAIL: str = "thumbnail.nii.gz"
+
+#: Interactive viewer HTML document artifact name.
+VIEWER: str = "viewer.html"
+
+#: Preview artifact names by requested kind.
+PREVIEW_ARTIFACTS = {
+    "slices": SLICES,
+    "thumbnail": THUMBNAIL,
+    "viewer": VIEWER,
+}
+
+#: Maximal number of voxels along each axis of the thumbnail volume.
+MAX_THUMBNAIL_SIZE: int = 96
+
+#: Percentiles used to window the intensities of the slices image.
+SLICES_WINDOW: Tuple[float, float] = (1, 99)
+
+#: Name of the lock file serializing preview creation of a NIfTI instance.
+LOCK_FILE_NAME: str = ".lock"
+
+#: Cache key template marking a NIfTI instance's preview creation as queued.
+SCHEDULED_KEY_TEMPLATE: str = "django_mri.preview.{nifti_id}"
+
+#: Number of seconds before a queued preview creation may be queued again
+#: (e.g. if the task was lost or failed).
+SCHEDULED_TIMEOUT: int = 60 * 10
+
+_logger = logging.getLogger("data.mri.preview")
+
+
+def get_preview_root() -> Path:
+    """
+    Returns the path of the directory in which previews should be saved.
+    """
+    default = get_mri_root() / DEFAULT_PREVIEW_DIR_NAME
+    path = getattr(settings, "PREVIEW_ROOT", default)
+    return Path(path)
+
+
+def get_preview_key(nifti) -> str:
+    """
+    Returns the cache key of a NIfTI instance's previews, derived from the
+    instance's ID and its file's modification time.
+
+    Parameters
+    ----------
+    nifti : ~django_mri.models.nifti.NIfTI
+        NIfTI instance
+
+    Returns
+    -------
+    str
+        Preview cache key
+
+    Raises
+    ------
+    FileNotFoundError
+        If the NIfTI file does not exist
+    """
+    mtime = os.stat(nifti.path).st_mtime_ns
+    return f"{nifti.id}-{mtime}"
+
+
+def get_preview_dir(nifti) -> Path:
+    """
+    Returns the preview directory of the provided NIfTI instance's current
+    file.
+
+    Parameters
+    ----------
+    nifti : ~django_mri.models.nifti.NIfTI
+        NIfTI instance
+
+    Returns
+    -------
+    Path
+        Preview directory
+    """
+    return get_preview_root() / str(nifti.id) / get_preview_key(nifti)
+
+
+def get_preview_path(nifti, artifact: str) -> Path:
+    """
+    Returns the path of an existing preview artifact, or None if it was not
+    created yet.
+
+    Parameters
+    ----------
+    nifti : ~django_mri.models.nifti.NIfTI
+        NIfTI instance
+    artifact : str
+        Artifact name
+
+    Returns
+    -------
+    Path
+        Preview artifact path
+    """
+    try:
+        path = get_preview_dir(nifti) / artifact
+    except FileNotFoundError:
+        return None
+    return path if path.exists() else None
+
+
+def downsample(
+    volume: np.ndarray,
+    affine: np.ndarray,
+    max_size: int = MAX_THUMBNAIL_SIZE,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Downsamples a volume by a uniform integer stride, so that no axis is
+    longer than *max_size* voxels, and adjusts its affine accordingly.
+
+    Parameters
+    ----------
+    volume : np.ndarray
+        3D volume
+    affine : np.ndarray
+        Volume affine
+    max_size : int, optional
+        Maximal number of voxels per axis, by default
+        :data:`MAX_THUMBNAIL_SIZE`
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray]
+        Downsampled volume and affine
+    """
+    step = max(1, math.ceil(max(volume.shape) / max_size))
+    data = np.ascontiguousarray(volume[::step, ::step, ::step])
+    affine = np.array(affine, dtype=np.float64)
+    affine[:3, :3] *= step
+    return data, affine
+
+
+def render_slices(volume: np.ndarray, destination: Path) -> Path:
+    """
+    Saves an image of the volume's mid-slices along each axis.
+
+    Parameters
+    ----------
+    volume : np.ndarray
+        3D volume
+    destination : Path
+        Image path
+
+    Returns
+    -------
+    Path
+        Image path
+    """
+    low, high = np.percentile(volume, SLICES_WINDOW)
+    slices = [
+        np.take(volume, volume.shape[axis] // 2, axis=axis)
+        for axis in range(3)
+    ]
+    # Pyplot is avoided to keep rendering independent of any global state.
+    figure = Figure(figsize=(6, 2), facecolor="black")
+    for axes, data in zip(figure.subplots(1, 3), slices):
+        axes.imshow(np.rot90(data), cmap="gray", vmin=low, vmax=high)
+        axes.axis("off")
+    figure.subplots_adjust(left=0, right=1, bottom=0, top=1, wspace=0)
+    figure.savefig(destination, dpi=100, facecolor="black")
+    return destination
+
+
+def create_previews(nifti, title: str = None, force: bool = False) -> Path:
+    """
+    Creates the preview artifacts of a NIfTI instance (see
+    :data:`PREVIEW_ARTIFACTS`). 4D images are previewed by their mean volume.
+    Artifacts are written to a temporary directory and moved into place
+    once complete, and previews of previous versions of the file are removed.
+    Concurrent creation for the same instance is serialized by a lock file,
+    and previews published in the meantime are not recreated.
+
+    Parameters
+    ----------
+    nifti : ~django_mri.models.nifti.NIfTI
+        NIfTI instance
+    title : str, optional
+        Viewer title, by default None
+    force : bool, optional
+        Whether to recreate existing previews, by default False
+
+    Returns
+    -------
+    Path
+        Preview directory
+    """
+    preview_dir = get_preview_dir(nifti)
+    if preview_dir.exists() and not force:
+        return preview_dir
+    preview_dir.parent.mkdir(parents=True, exist_ok=True)
+    lock_path = preview_dir.parent / LOCK_FILE_NAME
+    with open(lock_path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if preview_dir.exists() and not force:
+            return preview_dir
+        _write_previews(nifti, preview_dir, title=title)
+    message = logs.PREVIEW_CREATED.format(
+        nifti_id=nifti.id, preview_dir=preview_dir
+    )
+    _logger.debug(message)
+    return preview_dir
+
+
+def _write_previews(nifti, preview_dir: Path, title: str = None) -> None:
+    volume = nifti.get_mean_volume().astype(np.float32, copy=False)
+    volume = np.nan_to_num(volume, copy=False)
+    data, affine = downsample(volume, nifti.affine)
+    del volume
+    temp_dir = Path(tempfile.mkdtemp(dir=preview_dir.parent))
+    try:
+        render_slices(data, temp_dir / SLICES)
+        thumbnail = nib.Nifti1Image(data, affine)
+        nib.save(thumbnail, str(temp_dir / THUMBNAIL))
+        viewer = view_img(
+            thumbnail,
+            bg_img=False,
+            cmap=cm.black_blue,
+            symmetric_cmap=False,
+            title=title,
+        )
+        viewer.save_as_html(str(temp_dir / VIEWER))
+        shutil.rmtree(preview_dir, ignore_errors=True)
+        os.replace(temp_dir, preview_dir)
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    for stale_dir in preview_dir.parent.glob(f"{nifti.id}-*"):
+        if stale_dir != preview_dir:
+            shutil.rmtree(stale_dir, ignore_errors=True)
+
+
+def generate_previews_on_conversion() -> bool:
+    """
+    Returns whether previews should be queued once NIfTI files are created,
+    as set by the *GENERATE_PREVIEWS* setting (disabled by default, in which
+    case previews are queued when first requested).
+
+    Returns
+    -------
+    bool
+        Whether to queue previews after conversion
+    """
+    return getattr(settings, "GENERATE_PREVIEWS", False)
+
+
+def schedule_previews(nifti_id: int) -> bool:
+    """
+    Queues preview creation for a NIfTI instance once the current
+    transaction is committed, unless it was already queued recently (see
+    :data:`SCHEDULED_TIMEOUT`). Failures to reach the task broker are logged
+    rather than raised.
+
+    Parameters
+    ----------
+    nifti_id : int
+        NIfTI instance ID
+
+    Returns
+    -------
+    bool
+        Whether preview creation was queued
+    """
+    key = SCHEDULED_KEY_TEMPLATE.format(nifti_id=nifti_id)
+    if not cache.add(key, True, timeout=SCHEDULED_TIMEOUT):
+        return False
+    transaction.on_commit(lambda: _queue_previews(nifti_id, key))
+    return True
+
+
+def _queue_previews(nifti_id: int, key: str) -> None:
+    from django_mri.tasks import create_nifti_previews
+
+    try:
+        create_nifti_previews.delay(nifti_id)
+    except Exception as exception:
+        cache.delete(key)
+        message = logs.PREVIEW_SCHEDULE_FAILURE.format(
+            nifti_id=nifti_id, exception=exception
+        )
+        _logger.warning(message)
@@ -1,5 +1,3 @@
-import io
-import zipfile
 from pathlib import Path
 
 from django.http import HttpResponse
@@ -11,9 +9,9 @@ from django_mri.models import NIfTI
 from django_mri.serializers import NiftiSerializer
 from django_mri.views.defaults import DefaultsMixin
 from django_mri.views.pagination import StandardResultsSetPagination
+from django_mri.views.utils import get_zip_response
 
 CONTENT_DISPOSITION = "attachment; filename={instance_id}.zip"
-ZIP_CONTENT_TYPE = "application/x-zip-compressed"
 
 
 class NiftiViewSet(DefaultsMixin, viewsets.ModelViewSet):
@@ -24,18 +22,10 @@ class NiftiViewSet(DefaultsMixin, viewsets.ModelViewSet):
     @action(detail=True, methods=["get"])
     def to_zip(self, request: Request, pk: int) -> HttpResponse:
         instance = NIfTI.objects.get(id=pk)
-        buffer = io.BytesIO()
-        with zipfile.ZipFile(buffer, "w") as zip_file:
-            nii_name = Path(instance.path).name
-            zip_file.write(instance.path, nii_name)
-            if instance.json_file.exists():
-                json_name = Path(instance.json_file).name
-                zip_file.write(instance.json_file, json_name)
-        response = HttpResponse(
-            buffer.getvalue(), content_type=ZIP_CONTENT_TYPE
-        )
+        files = [(Path(instance.path), Path(instance.path).name)]
+        if instance.json_file.exists():
+            files.append((instance.json_file, instance.json_file.name))
         content_disposition = CONTENT_DISPOSITION.format(
             instance_id=instance.id
         )
-        response["Content-Disposition"] = content_disposition
-        return response
+        return get_zip_response(files, content_disposition)
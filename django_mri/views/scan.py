@@ -1,8 +1,6 @@
 """
 Definition of the :class:`ScanViewSet` class.
 """
-import io
-import zipfile
 from pathlib import Path
 from typing import Tuple
 
@@ -11,15 +9,29 @@ from bokeh.embed import server_session
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models.query import QuerySet
-from django.http import HttpResponse, JsonResponse
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    JsonResponse,
+)
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
 from django_analyses.serializers.run import RunSerializer
 from django_dicom.models import Series
 from django_mri.filters.scan_filter import ScanFilter
 from django_mri.models import Scan
 from django_mri.serializers import ScanSerializer
+from django_mri.utils import messages
+from django_mri.utils.preview import (
+    PREVIEW_ARTIFACTS,
+    VIEWER,
+    get_preview_path,
+    schedule_previews,
+)
 from django_mri.views.defaults import DefaultsMixin
 from django_mri.views.pagination import StandardResultsSetPagination
-from django_mri.views.utils import fix_bokeh_script
+from django_mri.views.utils import fix_bokeh_script, get_zip_response
 from nilearn.plotting.html_document import HTMLDocument
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
@@ -29,7 +41,7 @@ from rest_framework.response import Response
 HOST_NAME: str = getattr(settings, "APP_IP", "localhost")
 BOKEH_URL: str = f"http://{HOST_NAME}:5006/series_viewer"
 CONTENT_DISPOSITION: str = "attachment; filename={instance_id}.zip"
-ZIP_CONTENT_TYPE: str = "application/x-zip-compressed"
+PREVIEW_MAX_AGE: int = 60 * 60 * 24
 SCAN_SEARCH_FIELDS: Tuple[str] = (
     "id",
     "description",
@@ -69,7 +81,12 @@ class ScanViewSet(DefaultsMixin, viewsets.ModelViewSet):
     """
 
     pagination_class = StandardResultsSetPagination
-    queryset = Scan.objects.order_by("-time__date", "time__time")
+    queryset = (
+        Scan.objects.select_related("session__subject")
+        .prefetch_related("study_groups")
+        .with_sequence_type()
+        .order_by("-time__date", "time__time")
+    )
     serializer_class = ScanSerializer
     filter_class = ScanFilter
     search_fields = SCAN_SEARCH_FIELDS
@@ -193,18 +210,104 @@ class ScanViewSet(DefaultsMixin, viewsets.ModelViewSet):
             script = fix_bokeh_script(html, destination_id=destination_id)
         return HttpResponse(script, content_type="text/javascript")
 
-    @action(detail=True, methods=["GET"])
-    def nilearn_plot(self, request: Request, pk: int = None) -> Response:
-        scan = Scan.objects.get(id=pk)
-        try:
-            content = scan.html_plot()
-        except RuntimeError as e:
-            content = f"Failed to generate scan preview with the following exception:\n{e}"
+    def find_preview(self, scan: Scan, artifact: str) -> Tuple[Path, str]:
+        """
+        Returns the path of a scan's preview artifact, if it exists. Preview
+        creation is queued for converted scans that were not previewed yet,
+        but NIfTI conversion is never triggered.
+
+        Parameters
+        ----------
+        scan : Scan
+            Scan instance
+        artifact : str
+            Preview artifact name
+
+        Returns
+        -------
+        Tuple[Path, str]
+            Preview artifact path (or None) and a message explaining why it
+            is unavailable
+        """
+        if not scan._nifti:
+            return None, messages.PREVIEW_NO_NIFTI.format(scan_id=scan.id)
+        path = get_preview_path(scan._nifti, artifact)
+        if path is None:
+            schedule_previews(scan._nifti.id)
+            return None, messages.PREVIEW_PENDING.format(scan_id=scan.id)
+        return path, None
+
+    def get_cached_response(
+        self, request: Request, path: Path, response_class, *args, **kwargs
+    ) -> HttpResponse:
+        """
+        Returns a response for a preview artifact with HTTP caching headers,
+        or a *304 Not Modified* response if the client's copy is current.
+
+        Parameters
+        ----------
+        request : Request
+            Preview request
+        path : Path
+            Preview artifact path
+        response_class : type
+            Response class used if the artifact was modified
+
+        Returns
+        -------
+        HttpResponse
+            Preview response
+        """
+        etag = quote_etag(path.parent.name)
+        if etag in parse_etags(request.META.get("HTTP_IF_NONE_MATCH", "")):
+            response = HttpResponseNotModified()
         else:
-            if isinstance(content, HTMLDocument):
-                content = content.get_iframe(width=1000, height=500)
+            response = response_class(*args, **kwargs)
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, max_age=PREVIEW_MAX_AGE)
+        return response
+
+    @action(detail=True, methods=["GET"])
+    def nilearn_plot(
+        self, request: Request, pk: int = None, scan_id: int = None
+    ) -> Response:
+        scan = Scan.objects.select_related("_nifti").get(id=pk or scan_id)
+        path, message = self.find_preview(scan, VIEWER)
+        if path is None:
+            return JsonResponse(
+                {"content": message}, status=status.HTTP_202_ACCEPTED
+            )
+        return self.get_cached_response(
+            request, path, self._get_viewer_response, path
+        )
+
+    @staticmethod
+    def _get_viewer_response(path: Path) -> JsonResponse:
+        document = HTMLDocument(path.read_text())
+        content = document.get_iframe(width=1000, height=500)
         return JsonResponse({"content": content})
 
+    @staticmethod
+    def _get_file_response(path: Path) -> FileResponse:
+        return FileResponse(open(path, "rb"), filename=path.name)
+
+    @action(detail=True, methods=["GET"])
+    def preview(self, request: Request, pk: int = None) -> HttpResponse:
+        kind = request.GET.get("kind", "slices")
+        artifact = PREVIEW_ARTIFACTS.get(kind)
+        if artifact is None:
+            return HttpResponse(
+                f"Invalid preview kind: {kind}!",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        scan = Scan.objects.select_related("_nifti").get(id=pk)
+        path, message = self.find_preview(scan, artifact)
+        if path is None:
+            return HttpResponse(message, status=status.HTTP_202_ACCEPTED)
+        return self.get_cached_response(
+            request, path, self._get_file_response, path
+        )
+
     @action(detail=True, methods=["get"])
     def nifti_zip(self, request: Request, pk: int) -> HttpResponse:
         instance = Scan.objects.get(id=pk)
@@ -214,46 +317,35 @@ class ScanViewSet(DefaultsMixin, viewsets.ModelViewSet):
             return HttpResponse(
                 f"Could not create NIfTI format version of scan #{pk}"
             )
-        buffer = io.BytesIO()
-        with zipfile.ZipFile(buffer, "w") as zip_file:
-            nii_name = nii_path.name
-            zip_file.write(nii_path, nii_name)
-            json_file = Path(instance.nifti.json_file)
-            if json_file.exists():
-                zip_file.write(json_file, json_file.name)
-        response = HttpResponse(
-            buffer.getvalue(), content_type=ZIP_CONTENT_TYPE
-        )
+        files = [(nii_path, nii_path.name)]
+        json_file = Path(instance.nifti.json_file)
+        if json_file.exists():
+            files.append((json_file, json_file.name))
         content_disposition = CONTENT_DISPOSITION.format(instance_id=pk)
-        response["Content-Disposition"] = content_disposition
-        return response
+        return get_zip_response(files, content_disposition)
 
     @action(detail=False, methods=["get"])
     def listed_nifti_zip(
         self, request: Request, scan_ids: str
     ) -> HttpResponse:
         scan_ids = [int(pk) for pk in scan_ids.split(",")]
-        queryset = Scan.objects.filter(id__in=scan_ids)
-        buffer = io.BytesIO()
-        with zipfile.ZipFile(buffer, "w") as zip_file:
-            for instance in queryset:
-                try:
-                    nii_path = Path(instance.nifti.path)
-                except (AttributeError, RuntimeError):
-                    return HttpResponse(
-                        f"Could not create NIfTI format version of scan #{instance.id}"
-                    )
-                nii_name = nii_path.name
-                zip_file.write(nii_path, nii_name)
-                json_file = Path(instance.nifti.json_file)
-                if json_file.exists():
-                    zip_file.write(json_file, json_file.name)
-        response = HttpResponse(
-            buffer.getvalue(), content_type=ZIP_CONTENT_TYPE
+        queryset = Scan.objects.filter(id__in=scan_ids).select_related(
+            "_nifti"
         )
+        files = []
+        for instance in queryset:
+            try:
+                nii_path = Path(instance.nifti.path)
+            except (AttributeError, RuntimeError):
+                return HttpResponse(
+                    f"Could not create NIfTI format version of scan #{instance.id}"
+                )
+            files.append((nii_path, nii_path.name))
+            json_file = Path(instance.nifti.json_file)
+            if json_file.exists():
+                files.append((json_file, json_file.name))
         content_disposition = CONTENT_DISPOSITION.format(instance_id="scans")
-        response["Content-Disposition"] = content_disposition
-        return response
+        return get_zip_response(files, content_disposition)
 
     @action(detail=False, methods=["get"])
     def to_zip(
@@ -262,18 +354,13 @@ class ScanViewSet(DefaultsMixin, viewsets.ModelViewSet):
         file_formats = file_formats.split(",")
         scan_ids = [int(pk) for pk in scan_ids.split(",")]
         queryset = Scan.objects.filter(id__in=scan_ids)
-        buffer = io.BytesIO()
-        with zipfile.ZipFile(buffer, "w") as zip_file:
-            for scan in queryset:
-                file_paths = scan.get_file_paths(file_format=file_formats)
-                for path in file_paths:
-                    zip_file.write(path, path.relative_to(settings.MEDIA_ROOT))
-        response = HttpResponse(
-            buffer.getvalue(), content_type=ZIP_CONTENT_TYPE
+        files = (
+            (path, path.relative_to(settings.MEDIA_ROOT))
+            for scan in queryset
+            for path in scan.get_file_paths(file_format=file_formats)
         )
         content_disposition = CONTENT_DISPOSITION.format(instance_id="scans")
-        response["Content-Disposition"] = content_disposition
-        return response
+        return get_zip_response(files, content_disposition)
 
     @action(detail=True, methods=["GET"])
     def query_scan_run_set(
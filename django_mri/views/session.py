@@ -1,13 +1,11 @@
 """
 Definition of the :class:`SessionViewSet` class.
 """
-import io
-import zipfile
 from pathlib import Path
 from typing import List, Tuple
 
 from django.http import HttpResponse
-from django_dicom.views.utils import CONTENT_DISPOSITION, ZIP_CONTENT_TYPE
+from django_dicom.views.utils import CONTENT_DISPOSITION
 from django_mri.filters.session_filter import SessionFilter
 from django_mri.models.session import Session
 from django_mri.serializers import (
@@ -22,6 +20,7 @@ from django_mri.views.utils import (
     CSV_CONTENT_TYPE,
     SESSIONS_CSV_HEADERS,
     ReadWriteSerializerMixin,
+    get_zip_response,
 )
 from rest_framework import viewsets
 from rest_framework.decorators import action
@@ -53,7 +52,12 @@ class SessionViewSet(
     """
 
     pagination_class = StandardResultsSetPagination
-    queryset = Session.objects.order_by("-time__date", "-time__time")
+    queryset = (
+        Session.objects.select_related("subject", "measurement", "irb")
+        .with_scan_count()
+        .with_study_groups()
+        .order_by("-time__date", "-time__time")
+    )
     write_serializer_class = SessionWriteSerializer
     filter_class = SessionFilter
     search_fields = SEARCH_FIELDS
@@ -73,45 +77,33 @@ class SessionViewSet(
 
     @action(detail=True, methods=["get"])
     def dicom_zip(self, request: Request, pk: int) -> HttpResponse:
-        instance = Session.objects.get(id=pk)
+        instance = Session.objects.select_related("subject").get(id=pk)
         subject = instance.subject.id_number
         date = instance.time.date().strftime("%Y%m%d")
         name = f"{date}_{subject}_{instance.id}"
-        buffer = io.BytesIO()
         base_dir = Path(f"{date}_{instance.id}")
-        with zipfile.ZipFile(buffer, "w") as zip_file:
-            for scan in instance.scan_set.all():
-                scan_base_dir = base_dir / f"{scan.number}_{scan.description}"
-                for dcm in Path(scan.dicom.path).iterdir():
-                    dcm_path = scan_base_dir / dcm.name
-                    zip_file.write(dcm, dcm_path)
-        response = HttpResponse(
-            buffer.getvalue(), content_type=ZIP_CONTENT_TYPE
+        files = (
+            (dcm, base_dir / f"{scan.number}_{scan.description}" / dcm.name)
+            for scan in instance.scan_set.select_related("dicom")
+            for dcm in Path(scan.dicom.path).iterdir()
         )
         content_disposition = CONTENT_DISPOSITION.format(name=name)
-        response["Content-Disposition"] = content_disposition
-        return response
+        return get_zip_response(files, content_disposition)
 
     @action(detail=True, methods=["get"])
     def nifti_zip(self, request: Request, pk: int) -> HttpResponse:
         instance = Session.objects.get(id=pk)
-        buffer = io.BytesIO()
         nifti_root = get_mri_root() / "NIfTI"
-        with zipfile.ZipFile(buffer, "w") as zip_file:
-            for scan in instance.scan_set.all():
-                try:
-                    path = str(scan.nifti.path)
-                except AttributeError:
-                    continue
-                relative_path = Path(path).relative_to(nifti_root)
-                zip_file.write(path, relative_path)
-        response = HttpResponse(
-            buffer.getvalue(), content_type=ZIP_CONTENT_TYPE
-        )
+        files = []
+        for scan in instance.scan_set.select_related("_nifti"):
+            try:
+                path = Path(scan.nifti.path)
+            except AttributeError:
+                continue
+            files.append((path, path.relative_to(nifti_root)))
         name = str(instance.id)
         content_disposition = CONTENT_DISPOSITION.format(name=name)
-        response["Content-Disposition"] = content_disposition
-        return response
+        return get_zip_response(files, content_disposition)
 
     @action(detail=False, methods=["GET"])
     def to_csv(self, request, *args, **kwargs):
@@ -1,9 +1,13 @@
-from typing import Dict
+from pathlib import Path
+from typing import Dict, Iterable, Tuple
 
 from bs4 import BeautifulSoup
+from django.http import StreamingHttpResponse
+from django_mri.utils.archive import stream_zip
 
 DEFAULT_DESTINATION_ID: str = "bk-app"
 CSV_CONTENT_TYPE: str = "text/csv"
+ZIP_CONTENT_TYPE: str = "application/x-zip-compressed"
 SESSIONS_CSV_HEADERS: Dict[str, str] = {
     "Content-Disposition": 'attachment; filename="sessions.csv"'
 }
@@ -19,6 +23,31 @@ def fix_bokeh_script(
     return script.replace(random_id, destination_id)
 
 
+def get_zip_response(
+    files: Iterable[Tuple[Path, str]], content_disposition: str
+) -> StreamingHttpResponse:
+    """
+    Returns a response streaming a ZIP archive of the provided files.
+
+    Parameters
+    ----------
+    files : Iterable[Tuple[Path, str]]
+        Pairs of file paths and their names within the archive
+    content_disposition : str
+        Content-Disposition header value
+
+    Returns
+    -------
+    StreamingHttpResponse
+        ZIP archive response
+    """
+    response = StreamingHttpResponse(
+        stream_zip(files), content_type=ZIP_CONTENT_TYPE
+    )
+    response["Content-Disposition"] = content_disposition
+    return response
+
+
 class ReadWriteSerializerMixin(object):
     """
     Overrides get_serializer_class to choose the read serializer
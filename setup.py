@@ -22,6 +22,10 @@ with open("requirements.txt") as fh:
 with open("requirements-dev.txt") as fh:
     dev_requirements = fh.read().splitlines()
 
+# CAT12 segmentation results export (see
+# django_mri.analysis.automation.cat12_segmentation.export).
+export_requirements = ["dask~=2021.3", "xarray~=0.17", "zarr~=2.6"]
+
 
 setup(
     name="django_mri",
@@ -39,7 +43,7 @@ setup(
     python_requires=">=3.6",
     install_requires=install_requires,
     dependency_links=dependency_links,
-    extras_require={"dev": dev_requirements},
+    extras_require={"dev": dev_requirements, "export": export_requirements},
     classifiers=[
         "Development Status :: 2 - Pre-Alpha",
         "Environment :: Web Environment",
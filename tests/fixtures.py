@@ -51,6 +51,10 @@ NIFTI_FILES_PATH = os.path.join(TEST_FILES_PATH, "NIfTI")
 # NIfTI test file
 NIFTI_TEST_FILE_PATH = os.path.join(NIFTI_FILES_PATH, "001.nii.gz")
 
+# FreeSurfer recon-all run directory with left and right hemisphere
+# Desikan-Killiany stats files
+RECON_ALL_RUN_PATH = os.path.join(TEST_FILES_PATH, "FreeSurfer")
+
 # Siemens
 SIEMENS_DWI_SERIES_PATH = os.path.join(DICOM_FILES_PATH, "DWI", "Siemens")
 SIEMENS_DWI_SERIES = {
@@ -0,0 +1,89 @@
+import os
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.test import TestCase
+
+from django_mri.models import Scan
+from django_mri.models.data_directory import (
+    DataDirectory,
+    fingerprint_directory,
+)
+
+
+class DataDirectoryTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        for name in ("a", "b"):
+            self.write_file(name, "1.dcm", b"0" * 10)
+        self.data_directory = DataDirectory.objects.create(
+            title="Test", path=str(self.root)
+        )
+        patcher = mock.patch.object(Scan.objects, "import_path")
+        self.import_path = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_file(self, subdirectory: str, name: str, content: bytes):
+        path = self.root / subdirectory / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+        # Make sure modifications are detected regardless of the file
+        # system's timestamp resolution.
+        mtime = path.stat().st_mtime_ns + 10 ** 9
+        os.utime(path, ns=(mtime, mtime))
+        return path
+
+    def imported_paths(self) -> list:
+        return [call.args[0] for call in self.import_path.call_args_list]
+
+    def test_fingerprint_directory(self):
+        self.write_file("a/nested", "2.dcm", b"0" * 5)
+        latest_mtime, n_files, total_size = fingerprint_directory(
+            str(self.root / "a")
+        )
+        nested_file = self.root / "a" / "nested" / "2.dcm"
+        self.assertEqual(latest_mtime, nested_file.stat().st_mtime_ns)
+        self.assertEqual(n_files, 2)
+        self.assertEqual(total_size, 15)
+
+    def test_import_changed_subdirectories(self):
+        imported = self.data_directory.import_changed_subdirectories()
+        self.assertListEqual(imported, ["a", "b"])
+        self.assertEqual(self.import_path.call_count, 2)
+        self.import_path.reset_mock()
+        self.assertListEqual(
+            self.data_directory.import_changed_subdirectories(), []
+        )
+        self.write_file("b", "2.dcm", b"0")
+        imported = self.data_directory.import_changed_subdirectories()
+        self.assertListEqual(imported, ["b"])
+        self.assertListEqual(self.imported_paths(), [self.root / "b"])
+
+    def test_incremental_sync_after_full_sync(self):
+        imported = self.data_directory.sync()
+        self.assertListEqual(sorted(imported), ["a", "b"])
+        self.data_directory.refresh_from_db()
+        self.assertSetEqual(
+            set(self.data_directory.subdirectory_fingerprints), {"a", "b"}
+        )
+        self.import_path.reset_mock()
+        self.write_file("a", "2.dcm", b"0")
+        imported = self.data_directory.sync(incremental=True)
+        self.assertListEqual(imported, ["a"])
+        self.assertListEqual(self.imported_paths(), [self.root / "a"])
+
+    def test_incremental_sync_removes_old_subdirectories(self):
+        self.data_directory.sync(incremental=True)
+        (self.root / "b" / "1.dcm").unlink()
+        (self.root / "b").rmdir()
+        self.data_directory.sync(incremental=True)
+        self.data_directory.refresh_from_db()
+        self.assertListEqual(self.data_directory.known_subdirectories, ["a"])
+        self.assertListEqual(
+            list(self.data_directory.subdirectory_fingerprints), ["a"]
+        )
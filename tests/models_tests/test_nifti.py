@@ -82,6 +82,33 @@ class NIfTIModelTestCase(TestCase):
         data = self.dwi_nifti.get_data()
         self.assertIsInstance(data, np.ndarray)
 
+    def test_get_data_native_dtype(self):
+        result = self.dwi_nifti.get_data(dtype=None)
+        self.assertEqual(result.dtype, self.dwi_nifti.dtype)
+
+    def test_get_volume(self):
+        expected = self.dwi_nifti.get_data(dtype=np.float32)[..., 1]
+        result = self.dwi_nifti.get_volume(1)
+        self.assertTrue(np.array_equal(result, expected))
+
+    def test_lazy_instance_reused(self):
+        instance = self.dwi_nifti.get_lazy_instance()
+        self.dwi_nifti.get_volume(0)
+        self.dwi_nifti.get_slab(0, 2)
+        self.assertIs(self.dwi_nifti.get_lazy_instance(), instance)
+        self.dwi_nifti.invalidate_header_cache()
+        self.assertIsNot(self.dwi_nifti.get_lazy_instance(), instance)
+
+    def test_iter_volumes(self):
+        volumes = list(self.dwi_nifti.iter_volumes())
+        self.assertEqual(len(volumes), self.dwi_nifti.n_volumes)
+        self.assertTupleEqual(volumes[0].shape, self.dwi_nifti.shape[:3])
+
+    def test_get_mean_volume(self):
+        expected = self.dwi_nifti.get_data().mean(axis=-1)
+        result = self.dwi_nifti.get_mean_volume()
+        self.assertTrue(np.allclose(result, expected))
+
     def test_get_b_value(self):
         result = self.dwi_nifti.get_b_value()
         self.assertListEqual(result, SIEMENS_DWI_SERIES["b_value"])
@@ -159,6 +186,21 @@ class NIfTIModelTestCase(TestCase):
         result = self.simple_nifti.get_phase_encoding_direction()
         self.assertEqual(result, expected)
 
+    def test_update_bids_entities(self):
+        nifti = NIfTI(
+            path="/bids/sub-1/ses-2/func/sub-1_ses-2_task-rest_dir-AP_run-3_bold.nii.gz"  # noqa: E501
+        )
+        nifti.update_bids_entities()
+        self.assertEqual(nifti.stem, "sub-1_ses-2_task-rest_dir-AP_run-3_bold")
+        self.assertEqual(nifti.bids_subject, "1")
+        self.assertEqual(nifti.bids_session, "2")
+        self.assertEqual(nifti.bids_datatype, "func")
+        self.assertEqual(nifti.bids_suffix, "bold")
+        self.assertEqual(nifti.bids_task, "rest")
+        self.assertEqual(nifti.bids_direction, "AP")
+        self.assertEqual(nifti.bids_run, 3)
+        self.assertIsNone(nifti.bids_acquisition)
+
     ##############
     # Properties #
     ##############
@@ -168,6 +210,24 @@ class NIfTIModelTestCase(TestCase):
         expected = self.dwi_nifti.get_b_value()
         self.assertEqual(result, expected)
 
+    def test_header_data(self):
+        instance = self.dwi_nifti.get_instance()
+        self.assertTupleEqual(self.dwi_nifti.shape, instance.shape)
+        self.assertEqual(self.dwi_nifti.n_volumes, instance.shape[-1])
+        self.assertEqual(self.dwi_nifti.dtype, instance.get_data_dtype())
+        self.assertTrue(np.allclose(self.dwi_nifti.affine, instance.affine))
+
+    def test_header_cache_invalidated_on_compression_change(self):
+        self.simple_nifti._resolve_compression_state()
+        stale = {"shape": []}
+        self.simple_nifti.header_cache = stale
+        if self.simple_nifti.is_compressed:
+            self.simple_nifti.uncompress()
+        else:
+            self.simple_nifti.compress()
+        self.assertNotEqual(self.simple_nifti.header_cache, stale)
+        self.assertEqual(self.simple_nifti.ndim, 3)
+
     def test_b_value_for_non_DWI_returns_none(self):
         self.assertIsNone(self.simple_nifti.b_value)
 
@@ -0,0 +1,173 @@
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from unittest import mock
+
+import factory
+import pytz
+from django.db.models import signals
+from django.test import TestCase
+from django_dicom.models import Image, Series
+from django_mri.analysis.interfaces.dcm2niix import Dcm2niix
+from django_mri.models import Scan, Session
+from django_mri.models.managers import scan as scan_managers
+from tests.fixtures import (
+    DICOM_FMAP_PATH,
+    DICOM_FMRI_BOLD_PATH,
+    DICOM_IREPI_PATH,
+    DICOM_MPRAGE_PATH,
+)
+from tests.models import Subject
+
+NAIVE_BIDS_PATH = Path("sub-1", "ses-1", "anat", "sub-1_ses-1_T1w.nii.gz")
+
+
+class ScanConversionTestCase(TestCase):
+    @classmethod
+    @factory.django.mute_signals(signals.post_save)
+    def setUpTestData(cls):
+        for path in (
+            DICOM_MPRAGE_PATH,
+            DICOM_IREPI_PATH,
+            DICOM_FMAP_PATH,
+            DICOM_FMRI_BOLD_PATH,
+        ):
+            Image.objects.import_path(path, progressbar=False, report=False)
+        series = list(Series.objects.order_by("number"))
+        subject, _ = Subject.objects.from_dicom_patient(series[0].patient)
+        time = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+        sessions = [
+            Session.objects.create(subject=subject, time=time),
+            Session.objects.create(
+                subject=subject, time=time + timedelta(days=1)
+            ),
+        ]
+        for index, dicom in enumerate(series):
+            Scan.objects.create(dicom=dicom, session=sessions[index % 2])
+        cls.header_class = type(series[0].sample_header)
+
+    def setUp(self):
+        self.converted = []
+        self.registered = []
+        patchers = [
+            mock.patch.object(
+                Dcm2niix, "convert", autospec=True, side_effect=self.convert
+            ),
+            mock.patch.object(
+                Scan,
+                "get_nifti_destination",
+                autospec=True,
+                side_effect=self.get_nifti_destination,
+            ),
+            mock.patch.object(
+                Scan,
+                "register_nifti",
+                autospec=True,
+                side_effect=self.register_nifti,
+            ),
+            mock.patch.object(scan_managers, "get_bids_manager"),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def convert(self, interface, path, destination: Path) -> Path:
+        self.converted.append(destination)
+        return destination
+
+    def get_nifti_destination(self, scan, plan: dict = None):
+        return Path(f"{scan.id}.nii.gz"), False
+
+    def register_nifti(self, scan, path: Path, bids: bool = False):
+        self.registered.append(scan.id)
+
+    def patch_naive_path(self, path: Path = NAIVE_BIDS_PATH):
+        return mock.patch.object(
+            self.header_class,
+            "build_bids_path",
+            autospec=True,
+            return_value=path,
+        )
+
+    def test_waves_separate_scans_sharing_a_bids_path(self):
+        with self.patch_naive_path():
+            waves = Scan.objects.all().plan_nifti_conversion_waves()
+        self.assertEqual(len(waves), 2)
+        self.assertEqual(sum(len(wave) for wave in waves), 4)
+        for wave in waves:
+            session_ids = [scan.session_id for scan in wave]
+            self.assertEqual(len(session_ids), len(set(session_ids)))
+        # Scans competing for a path are converted in order of acquisition.
+        numbers_by_session = defaultdict(list)
+        for wave in waves:
+            for scan in wave:
+                numbers_by_session[scan.session_id].append(scan.number)
+        for numbers in numbers_by_session.values():
+            self.assertListEqual(numbers, sorted(numbers))
+
+    def test_waves_without_bids_paths(self):
+        with self.patch_naive_path(None):
+            waves = Scan.objects.all().plan_nifti_conversion_waves()
+        self.assertEqual(len(waves), 1)
+        self.assertEqual(len(waves[0]), 4)
+
+    def test_convert_concurrently(self):
+        # Each conversion waits for all others, which only completes if all
+        # of the wave's scans are converted at the same time.
+        barrier = threading.Barrier(4, timeout=10)
+
+        def convert(interface, path, destination: Path) -> Path:
+            barrier.wait()
+            return destination
+
+        with self.patch_naive_path(None), mock.patch.object(
+            Dcm2niix, "convert", autospec=True, side_effect=convert
+        ):
+            n_converted = Scan.objects.all()._convert_to_nifti_concurrently(4)
+        self.assertEqual(n_converted, 4)
+        scan_ids = Scan.objects.values_list("id", flat=True)
+        self.assertSetEqual(set(self.registered), set(scan_ids))
+
+    def test_convert_concurrently_by_waves(self):
+        with self.patch_naive_path():
+            waves = Scan.objects.all().plan_nifti_conversion_waves()
+            n_converted = Scan.objects.all()._convert_to_nifti_concurrently(2)
+        self.assertEqual(n_converted, 4)
+        first_wave = {Path(f"{scan.id}.nii.gz") for scan in waves[0]}
+        self.assertSetEqual(set(self.converted[:2]), first_wave)
+        self.assertSetEqual(
+            set(self.registered[:2]), {scan.id for scan in waves[0]}
+        )
+        # BIDS runs are planned once per wave.
+        bids_manager = scan_managers.get_bids_manager.return_value
+        self.assertEqual(bids_manager.plan_bids_paths.call_count, 2)
+
+    def test_convert_concurrently_failure(self):
+        first_id = Scan.objects.order_by("number").first().id
+        failing_path = Path(f"{first_id}.nii.gz")
+
+        def convert(interface, path, destination: Path) -> Path:
+            if destination == failing_path:
+                raise RuntimeError("Conversion failed")
+            return destination
+
+        queryset = Scan.objects.all()
+        with self.patch_naive_path(None), mock.patch.object(
+            Dcm2niix, "convert", autospec=True, side_effect=convert
+        ):
+            with self.assertWarns(UserWarning):
+                n_converted = queryset._convert_to_nifti_concurrently(2)
+            self.assertEqual(n_converted, 3)
+            self.assertNotIn(first_id, self.registered)
+            with self.assertRaises(RuntimeError):
+                queryset._convert_to_nifti_concurrently(2, persistent=False)
+
+    def test_convert_to_nifti_with_workers(self):
+        queryset = Scan.objects.all()
+        with mock.patch.object(
+            type(queryset), "_convert_to_nifti_concurrently", autospec=True
+        ) as convert_concurrently:
+            queryset.convert_to_nifti(workers=3)
+        convert_concurrently.assert_called_once()
+        self.assertEqual(convert_concurrently.call_args.args[1], 3)
@@ -0,0 +1,188 @@
+from datetime import datetime
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+import factory
+import pytz
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import signals
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django_analyses.models import AnalysisVersion, Run
+from django_analyses.models.input import DirectoryInput, FileInput, ListInput
+from django_analyses.models.input.definitions import (
+    DirectoryInputDefinition,
+    FileInputDefinition,
+    ListInputDefinition,
+)
+from django_dicom.models import Image, Series
+from django_mri.models import NIfTI, Scan, ScanRun, Session
+from django_mri.models.inputs import (
+    NiftiInput,
+    NiftiInputDefinition,
+    ScanInput,
+    ScanInputDefinition,
+)
+from django_mri.models.managers import scan as scan_managers
+from tests.fixtures import NIFTI_TEST_FILE_PATH, SIEMENS_DWI_SERIES_PATH
+from tests.models import Subject
+
+
+class ScanRunTestCase(TestCase):
+    @classmethod
+    @factory.django.mute_signals(signals.post_save)
+    def setUpTestData(cls):
+        Image.objects.import_path(
+            SIEMENS_DWI_SERIES_PATH, progressbar=False, report=False
+        )
+        series = Series.objects.first()
+        subject, _ = Subject.objects.from_dicom_patient(series.patient)
+        header = series.image_set.first().header.instance
+        session_time = datetime.combine(
+            header.get("StudyDate"), header.get("StudyTime")
+        ).replace(tzinfo=pytz.UTC)
+        session = Session.objects.create(subject=subject, time=session_time)
+        cls.nifti = NIfTI.objects.create(path=NIFTI_TEST_FILE_PATH)
+        cls.scan = Scan.objects.create(
+            dicom=series, session=session, _nifti=cls.nifti
+        )
+        cls.version = AnalysisVersion.objects.create(
+            title="TestVersion", description="desc"
+        )
+
+    def setUp(self):
+        self.run = Run.objects.create(analysis_version=self.version)
+
+    def assert_linked(self):
+        self.assertTrue(
+            ScanRun.objects.filter(scan=self.scan, run=self.run).exists()
+        )
+        self.assertIn(self.run, self.scan.query_run_set())
+        self.assertIn(self.run, self.scan.session.query_run_set())
+
+    def create_file_input(self) -> FileInput:
+        definition = FileInputDefinition.objects.create(key="path")
+        return FileInput.objects.create(
+            value=self.nifti.path, definition=definition, run=self.run
+        )
+
+    def create_list_input(self, *values: str) -> ListInput:
+        definition, _ = ListInputDefinition.objects.get_or_create(
+            key="dicom", element_type="STR"
+        )
+        return ListInput.objects.create(
+            value=[str(self.scan.dicom.path), *values],
+            definition=definition,
+            run=self.run,
+        )
+
+    def count_match_queries(self) -> int:
+        with CaptureQueriesContext(connection) as context:
+            Scan.objects.filter(id=self.scan.id).match_inputs()
+        return len(context.captured_queries)
+
+    def test_string(self):
+        link = ScanRun.objects.create(scan=self.scan, run=self.run)
+        expected = f"Scan #{self.scan.id} -> Run #{self.run.id}"
+        self.assertEqual(str(link), expected)
+
+    def test_scan_input_linked(self):
+        definition = ScanInputDefinition.objects.create(key="scan")
+        ScanInput.objects.create(
+            value=self.scan, definition=definition, run=self.run
+        )
+        self.assert_linked()
+
+    def test_nifti_input_linked(self):
+        definition = NiftiInputDefinition.objects.create(key="nifti")
+        NiftiInput.objects.create(
+            value=self.nifti, definition=definition, run=self.run
+        )
+        self.assert_linked()
+
+    def test_file_input_linked(self):
+        self.create_file_input()
+        self.assert_linked()
+
+    def test_list_input_linked(self):
+        self.create_list_input()
+        self.assert_linked()
+
+    def test_parent_directory_not_linked(self):
+        definition = DirectoryInputDefinition.objects.create(key="source")
+        DirectoryInput.objects.create(
+            value=str(Path(self.scan.dicom.path).parent),
+            definition=definition,
+            run=self.run,
+        )
+        self.assertFalse(ScanRun.objects.filter(run=self.run).exists())
+        self.assertNotIn(self.run, self.scan.query_run_set())
+
+    def test_backfill(self):
+        with factory.django.mute_signals(signals.post_save):
+            definition = ScanInputDefinition.objects.create(key="scan")
+            ScanInput.objects.create(
+                value=self.scan, definition=definition, run=self.run
+            )
+            self.create_file_input()
+        self.assertFalse(ScanRun.objects.filter(run=self.run).exists())
+        self.assertEqual(ScanRun.objects.backfill(), 1)
+        self.assert_linked()
+        self.assertEqual(ScanRun.objects.backfill(), 0)
+
+    def test_backfill_command(self):
+        with factory.django.mute_signals(signals.post_save):
+            self.create_file_input()
+        stdout = StringIO()
+        call_command("backfill_scan_runs", str(self.scan.id), stdout=stdout)
+        self.assertIn("Created 1 scan-run links.", stdout.getvalue())
+        self.assert_linked()
+
+    def test_get_representation_map(self):
+        queryset = Scan.objects.filter(id=self.scan.id)
+        expected = {
+            str(Path(self.scan.dicom.path)): self.scan.id,
+            str(self.nifti.path): self.scan.id,
+            str(self.scan.get_default_mif_path()): self.scan.id,
+        }
+        self.assertDictEqual(queryset.get_representation_map(), expected)
+
+    def test_match_inputs(self):
+        file_input = self.create_file_input()
+        list_input = self.create_list_input("/some/other/path")
+        matches = Scan.objects.filter(id=self.scan.id).match_inputs()
+        expected = {
+            (self.scan.id, file_input.id, self.run.id),
+            (self.scan.id, list_input.id, self.run.id),
+        }
+        self.assertSetEqual(set(matches), expected)
+        self.assertEqual(len(matches), 2)
+
+    def test_inputs_by_scan(self):
+        file_input = self.create_file_input()
+        list_input = self.create_list_input()
+        inputs = Scan.objects.filter(id=self.scan.id).inputs_by_scan()
+        self.assertListEqual(list(inputs), [self.scan.id])
+        self.assertSetEqual(
+            set(inputs[self.scan.id]), {file_input.id, list_input.id}
+        )
+
+    def test_match_inputs_query_count(self):
+        self.create_list_input()
+        n_queries = self.count_match_queries()
+        for index in range(5):
+            self.create_list_input(f"/some/other/path/{index}")
+        self.assertEqual(self.count_match_queries(), n_queries)
+
+    def test_match_inputs_in_batches(self):
+        list_input = self.create_list_input(str(self.nifti.path))
+        queryset = Scan.objects.filter(id=self.scan.id)
+        matches = queryset.match_inputs()
+        n_queries = self.count_match_queries()
+        # Each of the scan's three representations is matched separately.
+        with mock.patch.object(scan_managers, "LIST_INPUT_BATCH_SIZE", 1):
+            self.assertEqual(self.count_match_queries(), n_queries + 2)
+            self.assertListEqual(queryset.match_inputs(), matches)
+        self.assertIn((self.scan.id, list_input.id, self.run.id), matches)
@@ -71,3 +71,21 @@ class SessionModelTestCase(TestCase):
         result = self.session.study_groups
         self.assertEqual(len(result), 0)
         self.assertIsNone(result.first())
+
+    ###########
+    # Manager #
+    ###########
+
+    def test_count_by_month(self):
+        result = Session.objects.with_scan_count().count_by_month()
+        self.assertEqual(len(result), 1)
+        _, measurement, count = result[0]
+        self.assertIsNone(measurement)
+        self.assertEqual(count, 1)
+
+    def test_monthly_counts_invalidation(self):
+        counts = Session.objects.get_monthly_counts()
+        self.assertEqual(counts[0][-1], 1)
+        Session.objects.create(subject=self.subject, time=self.session.time)
+        counts = Session.objects.get_monthly_counts()
+        self.assertEqual(counts[0][-1], 2)
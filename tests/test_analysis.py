@@ -1,13 +1,89 @@
-from django.test import TestCase
+import asyncio
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-from django_analyses.models import Analysis, Pipeline
+import factory
+import nibabel as nib
+import numpy as np
+import pandas as pd
+from django.db import connection
+from django.db.models import signals
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from django_analyses.models import Analysis, AnalysisVersion, Pipeline, Run
 from django_mri.analysis.analysis_definitions import analysis_definitions
+from django_mri.analysis.automation.cat12_segmentation import export
+from django_mri.analysis.interfaces.batch import split_batch_outputs
+from django_mri.analysis.interfaces.local_scheduler import (
+    Job,
+    LocalScheduler,
+    ResourceBudget,
+)
+from django_mri.analysis.interfaces.output_index import OutputIndex
+from django_mri.analysis.interfaces.yalab.mutual_information_score import (
+    _score_pairs,
+    quantize,
+)
+from django_mri.analysis.parsers.recon_all.output_parser import (
+    ReconAllOutputParser,
+)
+from django_mri.analysis.parsers.recon_all.stats import (
+    COLUMN_NAMES,
+    COLUMN_TYPES,
+    ReconAllStats,
+)
+from django_mri.analysis.score.bulk import ScoreRecord, bulk_create_scores
+from django_mri.analysis.score.mriqc import get_scan_ids
+from django_mri.analysis.utils.voxelwise import (
+    VoxelwiseStatistics,
+    get_run_groups,
+)
+from django_mri.models.atlas import Atlas
+from django_mri.models.metric import Metric
 from django_mri.models.nifti import NIfTI
+from django_mri.models.scan import Scan
+from django_mri.models.score import Score
+from django_mri.models.session import Session
+from django_mri.utils.utils import get_bids_manager
+from sklearn.metrics import mutual_info_score
+
+from tests.fixtures import RECON_ALL_RUN_PATH
+from tests.models import Subject
 
 CREATION_FAILURE_MESSAGE = (
     "Failed to create MRI {models} with the following exception:\n{exception}"
 )
 FAKE_MNI = "MNI152_T1_2mm_brain.nii.gz"
+METRIC_DEFINITIONS = [{"title": "Volume"}, {"title": "Thickness"}]
+PREP_OUTPUTS = (
+    "fmriprep/sub-1/ses-a/anat/sub-1_ses-a_desc-preproc_T1w.nii.gz",
+    "fmriprep/sub-1/ses-a/anat/sub-1_ses-a_hemi-L_pial.surf.gii",
+    "fmriprep/sub-1/ses-a/func/sub-1_ses-a_task-rest_bold.nii.gz",
+    "freesurfer/sub-1/surf/lh.pial",
+)
+BATCH_OUTPUTS = (
+    "dataset_description.json",
+    "sub-1.html",
+    "sub-1/anat/sub-1_desc-preproc_T1w.nii.gz",
+    "sub-2.html",
+    "sub-2/anat/sub-2_desc-preproc_T1w.nii.gz",
+    "sourcedata/freesurfer/sub-1/mri/T1.mgz",
+    "sourcedata/freesurfer/sub-2/mri/T1.mgz",
+    "work/fmriprep_wf/graph.json",
+)
+OUTPUT_PATTERNS = (
+    "fmriprep/**/anat/sub-1_*_desc-preproc_T1w.nii.gz",
+    "fmriprep/**/anat/sub-1_*_hemi-*_pial.surf.gii",
+    "freesurfer/**/*lh.pial",
+    "*.nii.gz",
+    "**/*",
+)
 
 
 class AnalysesTestCase(TestCase):
@@ -33,3 +109,450 @@ class AnalysesTestCase(TestCase):
             self.fail(message)
         else:
             self.assertIsInstance(pipelines, list)
+
+
+class BulkScoreIngestionTestCase(TestCase):
+    def setUp(self):
+        Analysis.objects.from_list(analysis_definitions)
+        version = AnalysisVersion.objects.filter(
+            analysis__title="ReconAll"
+        ).first()
+        self.run = Run.objects.create(analysis_version=version)
+
+    def get_records(self, n_regions: int) -> list:
+        return [
+            ScoreRecord(
+                metric=metric,
+                value=float(i),
+                atlas="Atlas",
+                hemisphere=hemisphere,
+                region=f"Region {i}",
+            )
+            for metric in ("Volume", "Thickness")
+            for hemisphere in ("L", "R")
+            for i in range(n_regions)
+        ]
+
+    def create_scores(self, records: list):
+        return bulk_create_scores(
+            self.run, records, metric_definitions=METRIC_DEFINITIONS
+        )
+
+    def count_queries(self, records: list) -> int:
+        with CaptureQueriesContext(connection) as context:
+            self.create_scores(records)
+        return len(context.captured_queries)
+
+    def test_query_count_independent_of_size(self):
+        small = self.count_queries(self.get_records(2))
+        Metric.objects.all().delete()
+        Atlas.objects.all().delete()
+        large = self.count_queries(self.get_records(200))
+        self.assertEqual(small, large)
+
+    def test_existing_scores_reused(self):
+        records = self.get_records(5)
+        first = self.create_scores(records)
+        second = self.create_scores(records)
+        self.assertEqual(first.count(), len(records))
+        self.assertSetEqual(set(first), set(second))
+
+
+class ScoreDataFrameTestCase(TestCase):
+    N_REGIONS = 3
+
+    @classmethod
+    @factory.django.mute_signals(signals.post_save)
+    def setUpTestData(cls):
+        Analysis.objects.from_list(analysis_definitions)
+        version = AnalysisVersion.objects.filter(
+            analysis__title="ReconAll"
+        ).first()
+        cls.run = Run.objects.create(analysis_version=version)
+        subject = Subject.objects.create()
+        session = Session.objects.create(subject=subject, time=timezone.now())
+        cls.scan = Scan.objects.create(session=session, number=1)
+        records = [
+            ScoreRecord(
+                metric=metric,
+                value=float(i),
+                atlas="Atlas",
+                hemisphere=hemisphere,
+                region=f"Region {i}",
+            )
+            for metric in ("Volume", "Thickness")
+            for hemisphere in ("L", "R")
+            for i in range(cls.N_REGIONS)
+        ]
+        bulk_create_scores(
+            cls.run,
+            records,
+            origin=[cls.scan],
+            metric_definitions=METRIC_DEFINITIONS,
+        )
+
+    def test_to_long_dataframe(self):
+        df = Score.objects.all().to_long_dataframe()
+        self.assertEqual(len(df), 4 * self.N_REGIONS)
+        self.assertEqual(df.index.name, "ID")
+        self.assertSetEqual(
+            set(df.index), set(Score.objects.values_list("id", flat=True))
+        )
+        self.assertTrue((df["Origin"] == self.scan.id).all())
+        self.assertTrue((df["Run ID"] == self.run.id).all())
+        self.assertEqual(df["Metric"].dtype, "category")
+
+    def test_to_long_dataframe_query_count(self):
+        with self.assertNumQueries(2):
+            Score.objects.all().to_long_dataframe()
+
+    def test_iter_dataframes(self):
+        chunks = list(Score.objects.all().iter_dataframes(chunk_size=5))
+        self.assertListEqual([len(chunk) for chunk in chunks], [5, 5, 2])
+        ids = [score_id for chunk in chunks for score_id in chunk.index]
+        expected = Score.objects.order_by("id").values_list("id", flat=True)
+        self.assertListEqual(ids, list(expected))
+        self.assertTrue(
+            all((chunk["Origin"] == self.scan.id).all() for chunk in chunks)
+        )
+
+    def test_to_dataframe(self):
+        df = Score.objects.all().to_dataframe()
+        self.assertListEqual(
+            list(df.index.names),
+            ["Run ID", "Origin", "Atlas", "Hemisphere", "Region"],
+        )
+        self.assertSetEqual(set(df.columns), {"Volume", "Thickness"})
+        self.assertEqual(len(df), 2 * self.N_REGIONS)
+        score = df.loc[(self.run.id, self.scan.id, "Atlas", "L", "Region 2")]
+        self.assertEqual(score["Volume"], 2.0)
+
+
+class OutputIndexTestCase(TestCase):
+    def test_rglob_matches_pathlib(self):
+        with tempfile.TemporaryDirectory() as root:
+            root = Path(root)
+            for relative_path in PREP_OUTPUTS:
+                path = root / relative_path
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.touch()
+            index = OutputIndex(root)
+            for pattern in OUTPUT_PATTERNS:
+                expected = sorted(root.rglob(pattern))
+                self.assertListEqual(index.rglob(pattern), expected)
+
+
+class LocalSchedulerTestCase(TestCase):
+    def test_jobs_exceeding_capacity_are_queued(self):
+        budget = ResourceBudget(n_cpus=1, memory_mb=100)
+        with tempfile.TemporaryDirectory() as root:
+            root = Path(root)
+            scheduler = LocalScheduler(
+                root=root / "scheduler", capacity=budget, poll_interval=0.05
+            )
+            jobs = [
+                Job("echo first", budget, root / "logs", "first"),
+                Job("exit 3", budget, root / "logs", "second"),
+            ]
+            returncodes = scheduler.run_all(jobs)
+            self.assertListEqual(returncodes, [0, 3])
+            output = next((root / "logs").glob("first-*.out"))
+            self.assertEqual(output.read_text(), "first\n")
+            self.assertListEqual(list(scheduler.root.glob("*.json")), [])
+
+    def test_cancelled_jobs_are_stopped(self):
+        budget = ResourceBudget(n_cpus=1, memory_mb=100)
+        with tempfile.TemporaryDirectory() as root:
+            root = Path(root)
+            scheduler = LocalScheduler(
+                root=root / "scheduler", capacity=budget, poll_interval=0.05
+            )
+            started, finished = root / "started", root / "finished"
+            # The background subshell is only stopped with the process group.
+            command = f"(touch {started}; sleep 1; touch {finished}) & wait"
+            job = Job(command, budget, root / "logs", "sleeping")
+
+            async def cancel_job():
+                task = asyncio.ensure_future(scheduler.submit(job))
+                while not started.exists():
+                    await asyncio.sleep(0.05)
+                task.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+                self.assertListEqual(list(scheduler.root.glob("*.json")), [])
+                await asyncio.sleep(1.5)
+
+            asyncio.run(cancel_job())
+            self.assertFalse(finished.exists())
+
+
+class BatchOutputsTestCase(TestCase):
+    def test_split_batch_outputs(self):
+        with tempfile.TemporaryDirectory() as root:
+            root = Path(root)
+            batch_dir = root / "batch"
+            for relative_path in BATCH_OUTPUTS:
+                path = batch_dir / relative_path
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.touch()
+            destination = root / "destination"
+            split_batch_outputs(batch_dir, destination, "1")
+            collected = {
+                str(path.relative_to(destination))
+                for path in destination.rglob("*")
+                if path.is_file()
+            }
+            expected = {
+                "dataset_description.json",
+                "sub-1.html",
+                "sub-1/anat/sub-1_desc-preproc_T1w.nii.gz",
+                "sourcedata/freesurfer/sub-1/mri/T1.mgz",
+            }
+            self.assertSetEqual(collected, expected)
+            self.assertTrue((batch_dir / "sub-2.html").exists())
+            self.assertFalse((batch_dir / "sub-1.html").exists())
+
+
+class MriqcScoreTestCase(TestCase):
+    @factory.django.mute_signals(signals.post_save)
+    def test_get_scan_ids(self):
+        subject = Subject.objects.create()
+        session = Session.objects.create(subject=subject, time=timezone.now())
+        anat_dir = get_bids_manager().bids_dir / "sub-1" / "ses-1" / "anat"
+        # Files with the same name outside the BIDS directory (e.g.
+        # derivatives) are not matched.
+        paths = [
+            anat_dir / "sub-1_ses-1_T1w.nii.gz",
+            Path("/derivatives/sub-1/ses-1/anat/sub-1_ses-1_T1w.nii.gz"),
+            anat_dir / "sub-1_ses-1_run-2_T1w.nii.gz",
+        ]
+        scans = [
+            Scan.objects.create(
+                session=session,
+                number=number,
+                _nifti=NIfTI.objects.create(path=str(path)),
+            )
+            for number, path in enumerate(paths, start=1)
+        ]
+        names = ["sub-1_ses-1_T1w", "sub-1_ses-1_run-2_T1w", "sub-2_T1w"]
+        expected = {
+            "sub-1_ses-1_T1w": scans[0].id,
+            "sub-1_ses-1_run-2_T1w": scans[2].id,
+        }
+        self.assertDictEqual(get_scan_ids(names), expected)
+
+
+class MutualInformationScoreTestCase(TestCase):
+    BINS = 10
+
+    def test_vectorized_scores(self):
+        random = np.random.default_rng(0)
+        volumes = [random.normal(size=1000) * i for i in range(1, 6)]
+        volumes.append(np.ones(1000))
+        rows, columns = np.triu_indices(len(volumes), k=1)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = str(Path(temp_dir, "cache.npy"))
+            np.save(path, [quantize(v, self.BINS) for v in volumes])
+            scores = _score_pairs(path, self.BINS, rows, columns)
+        expected = [
+            mutual_info_score(
+                None,
+                None,
+                contingency=np.histogram2d(
+                    volumes[row], volumes[column], self.BINS
+                )[0],
+            )
+            for row, column in zip(rows, columns)
+        ]
+        np.testing.assert_allclose(scores, expected, atol=1e-12)
+
+
+class VoxelwiseStatisticsTestCase(TestCase):
+    def test_merged_statistics(self):
+        random = np.random.default_rng(0)
+        volumes = random.uniform(size=(9, 4, 5, 6)).astype(np.float32)
+        first = VoxelwiseStatistics(histogram_range=(0, 1), bins=100)
+        second = VoxelwiseStatistics(histogram_range=(0, 1), bins=100)
+        for volume in volumes[:4]:
+            first.update(volume)
+        for volume in volumes[4:]:
+            second.update(volume)
+        statistics = first.merge(second)
+        self.assertEqual(statistics.count, len(volumes))
+        np.testing.assert_allclose(statistics.mean, volumes.mean(axis=0))
+        np.testing.assert_allclose(
+            statistics.variance, volumes.var(axis=0, ddof=1), rtol=1e-5
+        )
+        np.testing.assert_array_equal(statistics.minimum, volumes.min(axis=0))
+        np.testing.assert_array_equal(statistics.maximum, volumes.max(axis=0))
+        np.testing.assert_allclose(
+            statistics.quantile(0.5), np.median(volumes, axis=0), atol=0.2
+        )
+
+    def test_age_grouping_requires_bins(self):
+        with self.assertRaisesMessage(ValueError, "age bins"):
+            get_run_groups([], group_by="age")
+
+
+class ReconAllStatsTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_root = Path(self.temp_dir.name, "cache")
+        self.run_dir = Path(self.temp_dir.name, "1")
+        shutil.copytree(RECON_ALL_RUN_PATH, self.run_dir)
+        self.stats_dir = self.run_dir / ReconAllOutputParser.STATS_DIR
+        self.settings = override_settings(STATS_CACHE_ROOT=self.cache_root)
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        self.temp_dir.cleanup()
+
+    def read_csv(self) -> pd.DataFrame:
+        frames = []
+        for hemisphere, code in (("Left", "lh"), ("Right", "rh")):
+            data = pd.read_csv(
+                self.stats_dir / f"{code}.aparc.stats",
+                comment="#",
+                names=COLUMN_NAMES,
+                sep=r"\s+",
+            )
+            data["Region Name"] = data["Region Name"].str.replace(
+                "_and_", "&"
+            )
+            data["Hemisphere"] = hemisphere
+            data["Atlas"] = "Desikan-Killiany"
+            frames.append(data)
+        stats = pd.concat(frames, ignore_index=True).astype(COLUMN_TYPES)
+        return stats.set_index(ReconAllStats.INDICES)
+
+    def test_parse_matches_read_csv(self):
+        stats = ReconAllStats(self.stats_dir).to_dataframe(cache=False)
+        self.assertEqual(len(stats), 8)
+        self.assertIn("parsopercularis&parstriangularis", stats.index[3])
+        pd.testing.assert_frame_equal(stats, self.read_csv())
+
+    def test_cache_hit(self):
+        expected = ReconAllStats(self.stats_dir).to_dataframe()
+        cache_files = list(self.cache_root.rglob("stats_*"))
+        self.assertEqual(len(cache_files), 1)
+        self.assertNotIn(self.stats_dir, cache_files[0].parents)
+        with mock.patch.object(ReconAllStats, "parse") as parse:
+            stats = ReconAllStats(self.stats_dir).to_dataframe()
+        parse.assert_not_called()
+        pd.testing.assert_frame_equal(stats, expected)
+
+    def test_cache_invalidation(self):
+        ReconAllStats(self.stats_dir).to_dataframe()
+        stats_file = self.stats_dir / "lh.aparc.stats"
+        lines = stats_file.read_text().splitlines(keepends=True)
+        stats_file.write_text("".join(lines[:-1]))
+        modified = stats_file.stat().st_mtime_ns + 10 ** 9
+        os.utime(stats_file, ns=(modified, modified))
+        stats = ReconAllStats(self.stats_dir).to_dataframe()
+        self.assertEqual(len(stats), 7)
+        cache_files = list(self.cache_root.rglob("stats_*"))
+        self.assertEqual(len(cache_files), 1)
+
+    def test_extract_stats(self):
+        second_run = Path(self.temp_dir.name, "2")
+        shutil.copytree(self.run_dir, second_run)
+        runs = [self.run_dir, second_run]
+        stats = ReconAllOutputParser.extract_stats(runs)
+        parallel = ReconAllOutputParser.extract_stats(runs, max_workers=2)
+        pd.testing.assert_frame_equal(parallel, stats)
+        self.assertEqual(stats.index.names[0], "Subject ID")
+        self.assertEqual(len(stats.loc["1"]), 8)
+        self.assertEqual(len(stats.loc["2"]), 8)
+
+    def test_extract_stats_without_results(self):
+        missing_run = Path(self.temp_dir.name, "missing")
+        stats = ReconAllOutputParser.extract_stats([missing_run])
+        self.assertTrue(stats.empty)
+        expected = ["Subject ID"] + ReconAllStats.INDICES
+        self.assertListEqual(list(stats.index.names), expected)
+
+
+class Cat12ExportTestCase(TestCase):
+    N_RUNS = 3
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        version = AnalysisVersion.objects.create(
+            title="TestVersion", description="desc"
+        )
+        self.runs = [
+            Run.objects.create(analysis_version=version)
+            for _ in range(self.N_RUNS)
+        ]
+        self.outputs = {}
+        for run in self.runs:
+            for key in export.OUTPUT_KEYS:
+                path = Path(self.temp_dir.name, f"{run.id}_{key}.nii")
+                data = np.full((2, 3, 4), run.id, dtype=np.float32)
+                nib.save(nib.Nifti1Image(data, np.eye(4)), str(path))
+                self.outputs[run.id, key] = path
+        self.destination = Path(self.temp_dir.name, "results.zarr")
+        node = SimpleNamespace(configuration={"spm": "12"})
+        patchers = [
+            mock.patch.object(export, "get_node", return_value=node),
+            mock.patch.object(
+                Run,
+                "get_output",
+                autospec=True,
+                side_effect=lambda run, key: self.outputs[run.id, key],
+            ),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_run_info_aligned_with_runs(self):
+        info = export.extract_run_info(self.runs)
+        self.assertListEqual(
+            info.index.tolist(), [run.id for run in self.runs]
+        )
+        self.assertListEqual(list(info.columns), list(export.INFO_COLUMNS))
+        dataset = export.create_dataset(self.runs)
+        self.assertListEqual(
+            dataset["Run ID"].values.tolist(), [run.id for run in self.runs]
+        )
+        self.assertTupleEqual(
+            dataset["warped_image"].shape, (self.N_RUNS, 2, 3, 4)
+        )
+
+    def test_resume_export(self):
+        failing_path = self.outputs[self.runs[1].id, export.OUTPUT_KEYS[0]]
+        read_volume = export.read_volume
+        read_paths = []
+
+        def failing_read(path, dtype):
+            if path == failing_path:
+                raise OSError("Failed to read volume!")
+            return read_volume(path, dtype)
+
+        def recording_read(path, dtype):
+            read_paths.append(path)
+            return read_volume(path, dtype)
+
+        with mock.patch.object(export, "read_volume", failing_read):
+            with self.assertRaises(OSError):
+                export.write_cat_results(
+                    self.runs, self.destination, batch_size=1
+                )
+        with mock.patch.object(export, "read_volume", recording_read):
+            dataset = export.write_cat_results(
+                [], self.destination, batch_size=1
+            )
+        self.assertEqual(
+            dataset.attrs[export.COMPLETED_RUNS_ATTR], self.N_RUNS
+        )
+        written_run = self.outputs[self.runs[0].id, export.OUTPUT_KEYS[0]]
+        self.assertNotIn(written_run, read_paths)
+        for index, run in enumerate(self.runs):
+            for key in export.OUTPUT_KEYS:
+                volume = dataset[key].isel({"Run ID": index}).values
+                self.assertTrue((volume == run.id).all())
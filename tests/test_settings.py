@@ -117,4 +117,5 @@ MIGRATION_MODULES = {
 KEEP_ORIGINAL_DICOM = True
 DICOM_IMPORT_MODE = "minimal"
 TESTING_MODE = True
+GENERATE_PREVIEWS = False
 APP_IP = env("APP_IP")
@@ -0,0 +1,46 @@
+from datetime import datetime
+from unittest import mock
+
+import factory
+import pytz
+from django.db.models import signals
+from django.test import TestCase
+from django_mri import tasks
+from django_mri.models import Session
+from tests.models import Subject
+
+
+class ConversionTasksTestCase(TestCase):
+    @classmethod
+    @factory.django.mute_signals(signals.post_save)
+    def setUpTestData(cls):
+        subject = Subject.objects.create()
+        time = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+        cls.session = Session.objects.create(subject=subject, time=time)
+
+    def test_convert_session_to_nifti(self):
+        with mock.patch.object(Session, "convert_to_nifti") as convert:
+            tasks.convert_session_to_nifti(self.session.id, workers=4)
+        convert.assert_called_once_with(
+            force=False, persistent=True, progressbar=False, workers=4
+        )
+
+    def test_convert_sessions_to_nifti(self):
+        with mock.patch.object(tasks, "group") as group:
+            result = tasks.convert_sessions_to_nifti(
+                [self.session.id, self.session.id + 1], force=True, workers=4
+            )
+        signatures = list(group.call_args.args[0])
+        self.assertListEqual(
+            [signature.args for signature in signatures],
+            [(self.session.id,), (self.session.id + 1,)],
+        )
+        for signature in signatures:
+            self.assertEqual(
+                signature.task, tasks.convert_session_to_nifti.name
+            )
+            self.assertDictEqual(
+                signature.kwargs,
+                {"force": True, "persistent": True, "workers": 4},
+            )
+        self.assertIs(result, group.return_value.apply_async.return_value)
@@ -1,9 +1,31 @@
+import gzip
+import io
+import json
+import logging
+import tempfile
+import threading
+import zipfile
 from pathlib import Path
+from unittest import mock
 
+import nibabel as nib
+import numpy as np
 from django.conf import settings
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
 import django_mri.utils.utils as utils
+from django_mri.models.nifti import NIfTI
+from django_mri.utils.archive import stream_zip
+from django_mri.utils.bids import BidsManager
+from django_mri.utils.bids_view import BidsView
+from django_mri.utils.preview import (
+    create_previews,
+    downsample,
+    render_slices,
+    schedule_previews,
+)
+from django_mri.utils.utils import get_bids_manager
 
 from .models import Group, Subject
 
@@ -26,3 +48,398 @@ class UtilsTestCase(TestCase):
         expected = Path(settings.MEDIA_ROOT, "MRI", "DICOM")
         result = utils.get_dicom_root()
         self.assertEqual(result, expected)
+
+
+class StreamZipTestCase(TestCase):
+    def test_stream_zip(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            text_file = Path(temp_dir, "file.json")
+            text_file.write_text("{}" * 1000)
+            compressed_file = Path(temp_dir, "file.nii.gz")
+            with gzip.open(compressed_file, "wb") as f:
+                f.write(b"0" * 1000)
+            files = [(text_file, "a/file.json"), (compressed_file, "b.nii.gz")]
+            content = b"".join(stream_zip(files, chunk_size=100))
+        archive = zipfile.ZipFile(io.BytesIO(content))
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.read("a/file.json"), b"{}" * 1000)
+        info = archive.getinfo("b.nii.gz")
+        self.assertEqual(info.compress_type, zipfile.ZIP_STORED)
+
+
+class BidsViewTestCase(TestCase):
+    def test_bids_view(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            bids_dir = Path(temp_dir, "rawdata")
+            image = nib.Nifti1Image(np.zeros((2, 2, 2)), np.eye(4))
+            for subject_id in ("1", "2"):
+                relative_path = f"sub-{subject_id}/anat/sub-{subject_id}_T1w"
+                path = bids_dir / f"{relative_path}.nii.gz"
+                path.parent.mkdir(parents=True)
+                nib.save(image, str(path))
+                path.with_name(path.name.replace(".nii.gz", ".json")).touch()
+                NIfTI.objects.create(path=path)
+            (bids_dir / "dataset_description.json").touch()
+            view = BidsView(["1"], bids_dir=bids_dir, root=Path(temp_dir))
+            with view as view_dir:
+                linked = {
+                    str(path.relative_to(view_dir))
+                    for path in view_dir.rglob("*")
+                    if path.is_symlink()
+                }
+                expected = {
+                    "dataset_description.json",
+                    "sub-1/anat/sub-1_T1w.nii.gz",
+                    "sub-1/anat/sub-1_T1w.json",
+                }
+                self.assertSetEqual(linked, expected)
+            self.assertFalse(view_dir.exists())
+            self.assertTrue(bids_dir.exists())
+
+
+class BidsPlanTestCase(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.bids_dir = Path(self.temp_dir.name, "rawdata")
+        self.bids_manager = BidsManager(bids_dir=self.bids_dir)
+        self.anat_dir = self.bids_dir / "sub-1" / "anat"
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_nifti(self, name: str) -> NIfTI:
+        path = self.anat_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        image = nib.Nifti1Image(np.zeros((2, 2, 2)), np.eye(4))
+        nib.save(image, str(path))
+        return NIfTI.objects.create(path=path)
+
+    def test_insert_run_label(self):
+        path = self.anat_dir / "sub-1_ses-1_T1w"
+        result = self.bids_manager.insert_run_label(path, 2)
+        self.assertEqual(result, self.anat_dir / "sub-1_ses-1_run-2_T1w")
+
+    def test_insert_run_label_with_inversion(self):
+        path = self.anat_dir / "sub-1_inv-1_MP2RAGE"
+        result = self.bids_manager.insert_run_label(path, 1)
+        self.assertEqual(result, self.anat_dir / "sub-1_run-1_inv-1_MP2RAGE")
+
+    def test_plan_bids_paths_run_numbering(self):
+        scans = [mock.Mock(id=scan_id) for scan_id in range(4)]
+        t1w = self.anat_dir / "sub-1_T1w"
+        t2w = self.anat_dir / "sub-1_T2w"
+        flair = self.anat_dir / "sub-1_FLAIR"
+        groups = {t1w: scans[:2], t2w: scans[2:3], flair: scans[3:]}
+        with mock.patch.object(
+            self.bids_manager, "group_bids_runs", return_value=groups
+        ):
+            plan = self.bids_manager.plan_bids_paths(scans[1:3])
+        expected = {
+            scans[0]: self.anat_dir / "sub-1_run-1_T1w",
+            scans[1]: self.anat_dir / "sub-1_run-2_T1w",
+            scans[2]: t2w,
+        }
+        self.assertDictEqual(plan, expected)
+
+    def test_single_run_paths_cached_while_deferred(self):
+        scan = mock.Mock(id=1)
+        path = self.anat_dir / "sub-1_T1w"
+        with mock.patch.object(
+            self.bids_manager, "_build_single_run_bids_path", return_value=path
+        ) as build:
+            with self.bids_manager.defer_updates():
+                for _ in range(3):
+                    result = self.bids_manager.get_single_run_bids_path(scan)
+                    self.assertEqual(result, path)
+            build.assert_called_once()
+            self.bids_manager.get_single_run_bids_path(scan)
+            self.assertEqual(build.call_count, 2)
+
+    def test_deferral_is_per_thread(self):
+        with mock.patch.object(
+            self.bids_manager, "flush_layout_update"
+        ) as flush_layout_update:
+            with self.bids_manager.defer_updates():
+                thread = threading.Thread(
+                    target=self.bids_manager.mark_layout_stale
+                )
+                thread.start()
+                thread.join()
+                flush_layout_update.assert_called_once()
+                self.bids_manager.mark_layout_stale()
+                flush_layout_update.assert_called_once()
+            self.assertEqual(flush_layout_update.call_count, 2)
+
+    def test_build_bids_path_plans_run_candidates(self):
+        scan = mock.Mock(id=1, _nifti=None)
+        path = self.anat_dir / "sub-1_T1w"
+        with mock.patch.object(
+            self.bids_manager, "get_run_candidates"
+        ) as get_run_candidates, mock.patch.object(
+            self.bids_manager, "plan_bids_paths", return_value={scan: path}
+        ) as plan_bids_paths:
+            result = self.bids_manager.build_bids_path(scan)
+        self.assertEqual(result, path)
+        get_run_candidates.assert_called_once_with(scan)
+        plan_bids_paths.assert_called_once_with(
+            [scan],
+            log_level=logging.DEBUG,
+            session_scans=get_run_candidates.return_value,
+        )
+
+    def test_build_bids_path_with_plan(self):
+        scans = [mock.Mock(id=scan_id, _nifti=None) for scan_id in range(2)]
+        plan = {
+            scans[0]: self.anat_dir / "sub-1_run-1_T1w",
+            scans[1]: self.anat_dir / "sub-1_run-2_T1w",
+        }
+        with mock.patch.object(
+            self.bids_manager, "plan_bids_paths"
+        ) as plan_bids_paths:
+            result = self.bids_manager.build_bids_path(scans[1], plan=plan)
+        plan_bids_paths.assert_not_called()
+        self.assertEqual(result, self.anat_dir / "sub-1_run-2_T1w")
+        self.assertEqual(len(plan), 2)
+
+    def test_apply_bids_plan_collision(self):
+        first = self.create_nifti("sub-1_run-1_T1w.nii.gz")
+        second = self.create_nifti("sub-1_T1w.nii.gz")
+        plan = {
+            mock.Mock(_nifti=first): self.anat_dir / "sub-1_run-2_T1w",
+            mock.Mock(_nifti=second): self.anat_dir / "sub-1_run-1_T1w",
+        }
+        n_moved = self.bids_manager.apply_bids_plan(plan)
+        self.assertEqual(n_moved, 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        expected_first = self.anat_dir / "sub-1_run-2_T1w.nii.gz"
+        expected_second = self.anat_dir / "sub-1_run-1_T1w.nii.gz"
+        self.assertEqual(Path(first.path), expected_first)
+        self.assertEqual(Path(second.path), expected_second)
+        self.assertTrue(expected_first.exists())
+        self.assertTrue(expected_second.exists())
+        self.assertFalse((self.anat_dir / "sub-1_T1w.nii.gz").exists())
+        self.assertEqual(self.bids_manager.apply_bids_plan(plan), 0)
+
+    def test_apply_bids_plan_failure_restores_files(self):
+        first = self.create_nifti("sub-1_run-1_T1w.nii.gz")
+        second = self.create_nifti("sub-1_T1w.nii.gz")
+        plan = {
+            mock.Mock(_nifti=first): self.anat_dir / "sub-1_run-2_T1w",
+            mock.Mock(_nifti=second): self.anat_dir / "sub-1_run-1_T1w",
+        }
+        rename = NIfTI.rename
+        calls = []
+
+        def failing_rename(nifti, destination, **kwargs):
+            calls.append(destination)
+            # Fail once both moves of the first instance were applied.
+            if len(calls) == 3:
+                raise OSError("Failed to move file!")
+            return rename(nifti, destination, **kwargs)
+
+        with mock.patch.object(
+            NIfTI, "rename", autospec=True, side_effect=failing_rename
+        ):
+            with self.assertRaises(OSError):
+                self.bids_manager.apply_bids_plan(plan)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        expected_first = self.anat_dir / "sub-1_run-1_T1w.nii.gz"
+        expected_second = self.anat_dir / "sub-1_T1w.nii.gz"
+        self.assertEqual(Path(first.path), expected_first)
+        self.assertEqual(Path(second.path), expected_second)
+        existing = sorted(path.name for path in self.anat_dir.iterdir())
+        self.assertListEqual(
+            existing, ["sub-1_T1w.nii.gz", "sub-1_run-1_T1w.nii.gz"]
+        )
+
+
+class BidsLayoutDatabaseTestCase(TestCase):
+    def test_layout_database_staleness(self):
+        bids_manager = get_bids_manager()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            database_dir = Path(temp_dir, "bids_db")
+            with override_settings(BIDS_DATABASE_DIR=database_dir):
+                self.assertIsNone(bids_manager.get_layout_database())
+                database_dir.mkdir()
+                database_file = bids_manager.LAYOUT_DATABASE_FILE_NAME
+                (database_dir / database_file).touch()
+                self.assertEqual(
+                    bids_manager.get_layout_database(), database_dir
+                )
+                bids_manager.mark_layout_stale()
+                self.assertIsNone(bids_manager.get_layout_database())
+
+    @mock.patch(
+        "django_mri.utils.bids.transaction.on_commit",
+        side_effect=lambda func: func(),
+    )
+    @mock.patch("django_mri.tasks.update_bids_layout_database.apply_async")
+    def test_layout_update_scheduled_once_per_batch(
+        self, apply_async, on_commit
+    ):
+        cache.clear()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            database_dir = Path(temp_dir, "bids_db")
+            bids_manager = BidsManager(bids_dir=Path(temp_dir, "rawdata"))
+            with override_settings(BIDS_DATABASE_DIR=database_dir):
+                with bids_manager.defer_updates():
+                    for _ in range(3):
+                        bids_manager.mark_layout_stale()
+                    apply_async.assert_not_called()
+                apply_async.assert_called_once()
+                bids_manager.mark_layout_stale()
+                apply_async.assert_called_once()
+
+
+class ParticipantsTsvTestCase(TestCase):
+    SUBJECT_DATA = [
+        {"participant_id": 1, "handedness": "n/a", "age": 30, "sex": "F"},
+        {"participant_id": 2, "handedness": "R", "age": 40, "sex": "M"},
+        {"participant_id": 1, "handedness": "n/a", "age": 30, "sex": "F"},
+    ]
+
+    def test_deferred_participants_update(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            bids_manager = BidsManager(bids_dir=Path(temp_dir))
+            participants_tsv = Path(temp_dir, "participants.tsv")
+            with mock.patch.object(
+                bids_manager, "get_subject_data", side_effect=self.SUBJECT_DATA
+            ), mock.patch.object(
+                bids_manager,
+                "flush_participants",
+                wraps=bids_manager.flush_participants,
+            ) as flush:
+                with bids_manager.defer_updates():
+                    for _ in self.SUBJECT_DATA:
+                        bids_manager.set_participant_tsv_and_json(None)
+                    self.assertFalse(participants_tsv.exists())
+                flush.assert_called_once()
+            lines = participants_tsv.read_text().splitlines()
+            self.assertEqual(
+                lines,
+                [
+                    "participant_id\thandedness\tage\tsex",
+                    "sub-1\tn/a\t30\tF",
+                    "sub-2\tR\t40\tM",
+                ],
+            )
+
+
+class FieldmapTargetsTestCase(TestCase):
+    def test_get_fieldmap_targets(self):
+        bids_manager = get_bids_manager()
+        session_dir = bids_manager.bids_dir / "sub-1" / "ses-1"
+        converted = session_dir / "dwi" / "sub-1_ses-1_dwi.nii.gz"
+        plan = {
+            mock.Mock(_nifti=None): session_dir / "anat" / "sub-1_T1w",
+            mock.Mock(_nifti=None): session_dir / "fmap" / "sub-1_epi",
+            mock.Mock(_nifti=NIfTI(path=str(converted))): (
+                session_dir / "dwi" / "sub-1_ses-1_dwi"
+            ),
+            mock.Mock(_nifti=None): (
+                session_dir / "func" / "sub-1_ses-1_task-rest_bold"
+            ),
+        }
+        targets = bids_manager.get_fieldmap_targets(plan)
+        expected = [
+            converted,
+            session_dir / "func" / "sub-1_ses-1_task-rest_bold.nii.gz",
+        ]
+        self.assertListEqual(targets, expected)
+
+    def test_update_fieldmaps_writes_intended_for(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            bids_manager = BidsManager(bids_dir=Path(temp_dir, "rawdata"))
+            session_dir = bids_manager.bids_dir / "sub-1" / "ses-1"
+            fieldmap = session_dir / "fmap" / "sub-1_ses-1_dir-PA_epi.nii.gz"
+            fieldmap.parent.mkdir(parents=True)
+            fieldmap.touch()
+            json_path = fieldmap.parent / "sub-1_ses-1_dir-PA_epi.json"
+            json_path.write_text(json.dumps({"PhaseEncodingDirection": "j"}))
+            plan = {
+                mock.Mock(_nifti=NIfTI(path=str(fieldmap))): (
+                    session_dir / "fmap" / "sub-1_ses-1_dir-PA_epi"
+                ),
+                mock.Mock(_nifti=None): (
+                    session_dir / "dwi" / "sub-1_ses-1_dwi"
+                ),
+                mock.Mock(_nifti=None): (
+                    session_dir / "anat" / "sub-1_ses-1_T1w"
+                ),
+            }
+            with mock.patch.object(
+                bids_manager, "plan_bids_paths", return_value=plan
+            ), mock.patch.object(NIfTI, "save") as save:
+                n_updated = bids_manager.update_fieldmaps(session_id=1)
+            self.assertEqual(n_updated, 1)
+            # Cached sidecar keys are refreshed.
+            save.assert_called_once_with(update_fields=["header_cache"])
+            data = json.loads(json_path.read_text())
+        self.assertEqual(data["PhaseEncodingDirection"], "j")
+        self.assertListEqual(
+            data["IntendedFor"], ["ses-1/dwi/sub-1_ses-1_dwi.nii.gz"]
+        )
+
+
+class PreviewTestCase(TestCase):
+    def test_downsample(self):
+        volume = np.arange(200 * 100 * 50, dtype=np.float32).reshape(
+            200, 100, 50
+        )
+        affine = np.diag([0.5, 0.5, 1, 1])
+        data, downsampled_affine = downsample(volume, affine, max_size=64)
+        self.assertTupleEqual(data.shape, (50, 25, 13))
+        np.testing.assert_array_equal(data, volume[::4, ::4, ::4])
+        np.testing.assert_array_equal(
+            downsampled_affine, np.diag([2, 2, 4, 1])
+        )
+
+    def test_render_slices(self):
+        volume = np.random.default_rng(0).uniform(size=(20, 30, 10))
+        with tempfile.TemporaryDirectory() as temp_dir:
+            destination = Path(temp_dir, "slices.png")
+            render_slices(volume, destination)
+            self.assertTrue(destination.stat().st_size > 0)
+
+    @mock.patch(
+        "django_mri.utils.preview.transaction.on_commit",
+        side_effect=lambda func: func(),
+    )
+    @mock.patch("django_mri.tasks.create_nifti_previews.delay")
+    def test_schedule_previews_once(self, delay, on_commit):
+        cache.clear()
+        self.assertTrue(schedule_previews(1))
+        self.assertFalse(schedule_previews(1))
+        delay.assert_called_once_with(1)
+
+    @mock.patch(
+        "django_mri.utils.preview.transaction.on_commit",
+        side_effect=lambda func: func(),
+    )
+    @mock.patch(
+        "django_mri.tasks.create_nifti_previews.delay",
+        side_effect=ConnectionError("No broker!"),
+    )
+    def test_schedule_previews_broker_failure(self, delay, on_commit):
+        cache.clear()
+        with self.assertLogs("data.mri.preview", level="WARNING"):
+            self.assertTrue(schedule_previews(1))
+        self.assertTrue(schedule_previews(1))
+        self.assertEqual(delay.call_count, 2)
+
+    def test_create_previews_skips_published(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir, "image.nii.gz")
+            image = nib.Nifti1Image(np.zeros((4, 4, 4)), np.eye(4))
+            nib.save(image, str(path))
+            nifti = NIfTI.objects.create(path=path)
+            with override_settings(PREVIEW_ROOT=Path(temp_dir, "previews")):
+                preview_dir = create_previews(nifti)
+                self.assertTrue((preview_dir / "slices.png").exists())
+                with mock.patch(
+                    "django_mri.utils.preview._write_previews"
+                ) as write_previews:
+                    self.assertEqual(create_previews(nifti), preview_dir)
+                write_previews.assert_not_called()
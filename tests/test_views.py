@@ -4,13 +4,15 @@ from datetime import datetime
 import factory
 import pytz
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.db.models import signals
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase
 from tests.fixtures import SIEMENS_DWI_SERIES_PATH
-from tests.models import Subject
+from tests.models import Study, Subject
 
 from django_dicom.models import Image, Series
 from django_dicom.models.utils.utils import get_group_model
@@ -240,3 +242,48 @@ class LoggedInNIfTIViewTestCase(APITestCase):
         url = reverse("mri:nifti-detail", args=(self.test_nifti.id,))
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ListViewQueryCountTestCase(APITestCase):
+    """
+    Makes sure list endpoints run a constant number of queries regardless of
+    the number of listed instances.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            username="test", password="pass"
+        )
+        cls.study = Study.objects.create(title="Study")
+        cls.create_sessions(2)
+
+    @classmethod
+    @factory.django.mute_signals(signals.post_save)
+    def create_sessions(cls, n_sessions: int, n_scans: int = 3):
+        time = datetime(2020, 1, 1, tzinfo=pytz.UTC)
+        for _ in range(n_sessions):
+            subject = Subject.objects.create()
+            session = Session.objects.create(subject=subject, time=time)
+            group = Group.objects.create(title="Group", study=cls.study)
+            for number in range(n_scans):
+                scan = Scan.objects.create(session=session, number=number)
+                scan.study_groups.add(group)
+
+    def count_list_queries(self, url_name: str) -> int:
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def assert_constant_queries(self, url_name: str):
+        n_queries = self.count_list_queries(url_name)
+        self.create_sessions(3)
+        self.assertEqual(self.count_list_queries(url_name), n_queries)
+
+    def test_scan_list_query_count(self):
+        self.assert_constant_queries("mri:scan-list")
+
+    def test_session_list_query_count(self):
+        self.assert_constant_queries("mri:session-list")